@@ -0,0 +1,162 @@
+import time
+import numpy as np
+from typing import Callable, Optional, Tuple
+from genetic import tour_lengths
+
+# MAX-MIN Ant System: probability that the best tour is rebuilt once the
+# pheromone has converged; sets the ratio between the trail limits.
+MMAS_P_BEST = 0.05
+
+
+class AntColony:
+    """
+    Vectorized Ant Colony Optimization.
+
+    All ants advance together: at every construction step the next city of
+    each ant is sampled at once from the rows of the choice matrix
+    (pheromone^alpha * heuristic^beta), which is computed once per
+    iteration. Sampling is restricted to each city's candidate list; an ant
+    whose candidates are all visited falls back to the full row. Pheromone
+    deposits are a single scatter-add over all tour edges.
+
+    ``max_min=True`` switches to the MAX-MIN Ant System: only the best tour
+    deposits, and trails are clamped to [tau_min, tau_max].
+    """
+
+    def __init__(self, distance_matrix: np.ndarray, neighbors: np.ndarray,
+                 alpha: float = 1.0, beta: float = 2.0, evaporation_rate: float = 0.5,
+                 q: float = 100.0, max_min: bool = False, seed: Optional[int] = None):
+        """
+        Args:
+            distance_matrix: (n, n) distances
+            neighbors: (n, k) candidate list per city, nearest first
+            alpha: Pheromone importance factor
+            beta: Heuristic importance factor (1/distance)
+            evaporation_rate: Pheromone evaporation rate (0-1)
+            q: Pheromone deposit factor (Ant System)
+            max_min: Use MAX-MIN pheromone bounds and best-only deposits
+            seed: Seed for numpy.random.Generator
+        """
+        self.distance = np.asarray(distance_matrix, dtype=np.float64)
+        self.n = len(self.distance)
+        self.neighbors = np.asarray(neighbors, dtype=np.intp)
+        self.alpha = alpha
+        self.evaporation_rate = evaporation_rate
+        self.q = q
+        self.max_min = max_min
+        self.rng = np.random.default_rng(seed)
+
+        with np.errstate(divide='ignore'):
+            heuristic = 1.0 / self.distance
+        # Coincident points: make them very attractive instead of infinite
+        finite = heuristic[np.isfinite(heuristic)]
+        heuristic[~np.isfinite(heuristic)] = (finite.max() if finite.size else 1.0) * 1e3
+        np.fill_diagonal(heuristic, 0.0)
+        self.heuristic_beta = heuristic ** beta
+
+        self.pheromone = np.full((self.n, self.n), 0.1)
+        self.tau_min, self.tau_max = 0.0, np.inf
+        self.best_tour: Optional[np.ndarray] = None
+        self.best_length = np.inf
+
+    def initialize_max_min(self, reference_length: float) -> None:
+        """Set MMAS trail limits from a reference tour length and start trails at tau_max."""
+        self.tau_max = 1.0 / (self.evaporation_rate * max(reference_length, 1e-12))
+        root = MMAS_P_BEST ** (1.0 / self.n)
+        average_choices = max(self.n / 2.0, 2.0)
+        self.tau_min = self.tau_max * (1.0 - root) / ((average_choices - 1.0) * root)
+        self.pheromone.fill(self.tau_max)
+
+    def construct(self, num_ants: int) -> np.ndarray:
+        """Build one tour per ant; returns a (num_ants, n) int32 matrix."""
+        n, rng = self.n, self.rng
+        pheromone = self.pheromone if self.alpha == 1.0 else self.pheromone ** self.alpha
+        choice = pheromone * self.heuristic_beta
+
+        ants = np.arange(num_ants)
+        tours = np.empty((num_ants, n), dtype=np.int32)
+        visited = np.zeros((num_ants, n), dtype=bool)
+        current = rng.integers(0, n, size=num_ants)
+        tours[:, 0] = current
+        visited[ants, current] = True
+
+        for step in range(1, n):
+            candidates = self.neighbors[current]
+            weights = choice[current[:, None], candidates]
+            weights[visited[ants[:, None], candidates]] = 0.0
+            totals = weights.sum(axis=1)
+            picked = np.empty(num_ants, dtype=np.intp)
+
+            ok = totals > 0
+            if ok.any():
+                draws = rng.random(int(ok.sum())) * totals[ok]
+                index = (np.cumsum(weights[ok], axis=1) > draws[:, None]).argmax(axis=1)
+                picked[ok] = candidates[ok, index]
+
+            stuck = np.flatnonzero(~ok)
+            if len(stuck):
+                # Candidate list exhausted: sample from the whole row
+                full = choice[current[stuck]] * ~visited[stuck]
+                full_totals = full.sum(axis=1)
+                draws = rng.random(len(stuck)) * full_totals
+                index = (np.cumsum(full, axis=1) > draws[:, None]).argmax(axis=1)
+                # Underflowed rows: take any unvisited city
+                empty = full_totals <= 0
+                index[empty] = np.argmin(visited[stuck[empty]], axis=1)
+                picked[stuck] = index
+
+            current = picked
+            tours[:, step] = current
+            visited[ants, current] = True
+        return tours
+
+    def update(self, tours: np.ndarray, lengths: np.ndarray) -> None:
+        """Evaporate, then deposit pheromone from this iteration's tours."""
+        self.pheromone *= (1.0 - self.evaporation_rate)
+        if self.max_min:
+            tours = self.best_tour[None, :]
+            deposits = np.array([1.0 / max(self.best_length, 1e-12)])
+        else:
+            deposits = self.q / np.maximum(lengths, 1e-12)
+        src = tours
+        dst = np.roll(tours, -1, axis=1)
+        amount = np.broadcast_to(deposits[:, None], src.shape)
+        np.add.at(self.pheromone, (src.ravel(), dst.ravel()), amount.ravel())
+        np.add.at(self.pheromone, (dst.ravel(), src.ravel()), amount.ravel())
+        if self.max_min:
+            self.tau_max = 1.0 / (self.evaporation_rate * max(self.best_length, 1e-12))
+            self.tau_min = min(self.tau_min, self.tau_max)
+            np.clip(self.pheromone, self.tau_min, self.tau_max, out=self.pheromone)
+
+    def run(self, num_ants: int, num_iterations: int, deadline: Optional[float] = None,
+            callback: Optional[Callable[[np.ndarray, float], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> Tuple[np.ndarray, float]:
+        """
+        Args:
+            num_ants: Tours built per iteration
+            num_iterations: Maximum number of iterations
+            deadline: time.perf_counter() value after which no new iteration starts
+            callback: Called as callback(tour, length) whenever the best tour improves
+            should_stop: Polled before every iteration; True stops the search
+
+        Returns:
+            Tuple of (best tour as int array, its length)
+        """
+        for iteration in range(num_iterations):
+            # Always finish one iteration so there is a tour to return
+            if iteration and deadline is not None and time.perf_counter() > deadline:
+                break
+            if iteration and should_stop is not None and should_stop():
+                break
+            tours = self.construct(num_ants)
+            lengths = tour_lengths(tours, self.distance)
+            best = int(np.argmin(lengths))
+            if lengths[best] < self.best_length:
+                self.best_length = float(lengths[best])
+                self.best_tour = tours[best].copy()
+                if callback is not None:
+                    callback(self.best_tour, self.best_length)
+            if self.best_length <= 0.0:
+                break  # all points coincide: nothing shorter exists
+            self.update(tours, lengths)
+        return self.best_tour, self.best_length
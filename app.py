@@ -1,36 +1,347 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, g, render_template, request, jsonify
+import os
+import json
+import logging
+import queue
+import threading
 import time
 import uuid
-import random
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from tsp_heuristics import TSPSolver
+from tsp_heuristics import TSPSolver, ALGORITHMS, IMPROVE_MODES
+from distance_engine import METRICS
+from decomposition import CLUSTER_SIZE, MAX_CLUSTER_SIZE, PARTITIONS
+from jobs import JobQueue, QueueFull, SharedJobStore, StoreFull
+from solution_cache import SolutionCache
+from batch import solve_batch
+from compare import compare_algorithms
+from grid_paths import GRID_ALGORITHMS, occupancy_grid, plan_deliveries
+from mapf import MAPF_METHODS, plan_paths
+from distance_oracle import DistanceOracle, maze_fingerprint
+from storage import Storage
+from route_session import SessionNotFound, SharedRouteSessionStore
+from wire import OUTPUTS, UnsupportedFormat, decode_request, encode_solution, response_format
+from metrics import CONTENT_TYPE, Registry, profile_call, size_bucket
 
-app = Flask(__name__)
+bp = Blueprint('warehouse', __name__)
+logger = logging.getLogger(__name__)
 
-# In-memory storage for maze configurations and simulations
-maze_configs = {}
-simulations = {}
+# Server limits; override with create_app(config) or WAREHOUSE_<NAME> environment variables
+DEFAULT_CONFIG = {
+    # Largest request body in bytes (413 beyond it); 64 MB fits about 4M float32 points
+    'MAX_CONTENT_LENGTH': 64 * 1024 * 1024,
+    # Requests served at once per process (429 beyond it); 0 = no cap
+    'MAX_CONCURRENT_REQUESTS': 32,
+}
 
-@app.route('/')
+# Cheap endpoints that answer even when the concurrency cap is reached
+UNCAPPED_ENDPOINTS = {'warehouse.health_check', 'warehouse.readiness', 'warehouse.prometheus_metrics', 'static'}
+
+# Upper bound on worker processes a single genetic or decomposition request may start
+MAX_ISLANDS = os.cpu_count() or 1
+
+# Minimum seconds between two streamed improvements
+STREAM_MIN_INTERVAL = 0.05
+
+# Longest a job status request may block (?wait=)
+MAX_JOB_WAIT = 30.0
+
+# SQLite database shared by all worker processes: saved mazes, simulations, jobs and route sessions
+DB_PATH = os.environ.get('WAREHOUSE_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warehouse.db'))
+
+# Background solve jobs: bounded store shared by the workers, plus a bounded pool per worker
+job_store = SharedJobStore(DB_PATH, max_jobs=1000, ttl=600.0)
+job_queue = JobQueue(job_store, max_queued=16)
+
+# Live routes edited while the robot drives them
+route_sessions = SharedRouteSessionStore(DB_PATH, max_sessions=1000, ttl=3600.0)
+
+# Largest batch accepted by /solve_tsp/batch
+MAX_BATCH_INSTANCES = 1000
+
+# Process pool for work split up within one request (batch, compare)
+worker_pool = None
+
+worker_pool_pid = None
+
+def _worker_pool():
+    """Shared request-level worker pool, started on first use (once per server process)."""
+    global worker_pool, worker_pool_pid
+    if worker_pool is None or worker_pool_pid != os.getpid():
+        worker_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        worker_pool_pid = os.getpid()
+    return worker_pool
+
+# Routes of recently solved pick lists (64 MB, one hour)
+solution_cache = SolutionCache(max_bytes=64 * 1024 * 1024, ttl=3600.0)
+
+# Grid distance fields of pick locations on saved mazes (256 MB)
+distance_oracle = DistanceOracle(max_bytes=256 * 1024 * 1024)
+
+# Planning budget of /api/mapf when the request sets none, and its upper bound
+MAPF_TIME_LIMIT = 5.0
+MAX_MAPF_TIME_LIMIT = 60.0
+
+# Saved mazes and simulation results, shared by all worker processes (256 MB)
+storage = Storage(DB_PATH, max_bytes=256 * 1024 * 1024)
+
+# Prometheus metrics of this process (GET /metrics)
+metrics = Registry()
+http_requests = metrics.counter('http_requests_total', 'HTTP requests by endpoint, method and status',
+                                ('endpoint', 'method', 'status'))
+solve_requests = metrics.counter('tsp_solve_requests_total', 'Solve requests by algorithm and whether '
+                                 'the route came from the solution cache', ('algorithm', 'cached'))
+solve_seconds = metrics.histogram('tsp_solve_seconds', 'Solve time, distance matrix excluded, by algorithm '
+                                  'and instance size', ('algorithm', 'size'))
+matrix_seconds = metrics.histogram('tsp_distance_matrix_seconds', 'Distance matrix build time by metric '
+                                   "('grid' for saved mazes) and instance size", ('metric', 'size'))
+
+def _collect_gauges():
+    """Queue depth, store sizes and cache counters, read at scrape time."""
+    yield 'tsp_jobs_in_flight', {}, job_queue.depth
+    yield 'tsp_jobs_capacity', {}, job_queue.capacity
+    yield 'tsp_jobs_stored', {}, len(job_store)
+    yield 'tsp_route_sessions', {}, len(route_sessions)
+    for name, stats in (('solution', solution_cache.stats()), ('distance_field', distance_oracle.stats())):
+        yield 'tsp_cache_hits_total', {'cache': name}, stats['hits']
+        yield 'tsp_cache_misses_total', {'cache': name}, stats['misses']
+        yield 'tsp_cache_hit_rate', {'cache': name}, stats['hit_rate']
+        yield 'tsp_cache_bytes', {'cache': name}, stats['bytes']
+
+metrics.collect({
+    'tsp_jobs_in_flight': ('gauge', 'Background jobs queued or running'),
+    'tsp_jobs_capacity': ('gauge', 'Background jobs that can be in flight before submissions are refused'),
+    'tsp_jobs_stored': ('gauge', 'Jobs held in the job store, finished ones included'),
+    'tsp_route_sessions': ('gauge', 'Open route sessions'),
+    'tsp_cache_hits_total': ('counter', 'Cache lookups answered from the cache'),
+    'tsp_cache_misses_total': ('counter', 'Cache lookups that had to compute'),
+    'tsp_cache_hit_rate': ('gauge', 'Share of cache lookups that hit'),
+    'tsp_cache_bytes': ('gauge', 'Memory held by the cache'),
+}, _collect_gauges)
+
+@bp.after_app_request
+def count_request(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@bp.route('/')
 def index():
     """Render the main page"""
     return render_template('index.html')
 
-@app.route('/multi-agent')
+@bp.route('/multi-agent')
 def multiSimulation():
     return render_template('multi.html')
 
-@app.route('/compare')
+@bp.route('/compare')
 def compare():
     """Render the algorithm comparison page"""
     return render_template('comp.html')
 
-@app.route('/robo')
+@bp.route('/compare', methods=['POST'])
+def compare_api():
+    """
+    Run several algorithms on the same points side by side.
+
+    Expected JSON input: a /solve_tsp body with "algorithms" (list, default
+    every algorithm) instead of "algorithm", and optionally
+    "measure_memory": true to also report peak memory (each algorithm then
+    runs a second time, under tracemalloc). The distance matrix is built
+    once and shared; the algorithms run in parallel worker processes.
+
+    Returns:
+    {
+        "results": {
+            "<algorithm>": {
+                "path", "total_distance", ...   (as /solve_tsp),
+                "execution_time": float,     (wall clock seconds)
+                "cpu_time": float,           (CPU seconds of the worker)
+                "peak_memory": int | null    (bytes allocated at peak, with measure_memory)
+            } | {"error": string},
+            ...
+        },
+        "matrix_time": float,
+        "execution_time": float
+    }
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Request body must be a JSON object'}), 400
+        algorithms = data.get('algorithms') or list(ALGORITHMS)
+        if not isinstance(algorithms, list):
+            return jsonify({'error': 'algorithms must be a list'}), 400
+        measure_memory = data.get('measure_memory', False)
+        if not isinstance(measure_memory, bool):
+            return jsonify({'error': 'measure_memory must be true or false'}), 400
+
+        try:
+            specs = {name: _parse_solve_request(dict(data, algorithm=name)) for name in algorithms}
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+
+        first = next(iter(specs.values()))
+        options = {name: dict(spec['params'], improve=spec['improve'], time_limit=spec['time_limit'])
+                   for name, spec in specs.items()}
+
+        start_time = time.time()
+        comparison = compare_algorithms(first['points'], options, metric=first['metric'],
+                                        dtype=first['dtype'], executor=_worker_pool(),
+                                        measure_memory=measure_memory)
+
+        results = {}
+        for name, result in comparison['results'].items():
+            if 'error' in result:
+                results[name] = {'error': result['error']}
+                continue
+            results[name] = _solve_response(result, name, first['metric'], result['wall_time'])
+            results[name]['cpu_time'] = round(result['cpu_time'], 6)
+            results[name]['peak_memory'] = result['peak_memory']
+
+        return jsonify({
+            'results': results,
+            'matrix_time': round(comparison['matrix_time'], 6),
+            'execution_time': round(time.time() - start_time, 6)
+        })
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@bp.route('/robo')
 def robot_maze():
     """Render the robot maze page"""
     return render_template('maze.html')
 
-@app.route('/solve_tsp', methods=['POST'])
+def _parse_solve_request(data, maze=False):
+    """
+    Validate a solve request body.
+
+    Args:
+        data: Decoded request body
+        maze: The endpoint solves on saved mazes ("maze_id"); elsewhere it is refused
+
+    Returns:
+        Dict with 'points', 'metric', 'dtype', 'algorithm', 'improve',
+        'time_limit' and the algorithm-specific 'params'
+
+    Raises:
+        ValueError: With a message suitable for a 400 response
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    if not maze and data.get('maze_id') is not None:
+        raise ValueError('maze_id is only supported by /solve_tsp and /solve_tsp/stream')
+
+    points = data.get('points', [])
+    algorithm = data.get('algorithm', 'nearest_neighbor')
+
+    if len(points) < 2:
+        raise ValueError('At least 2 points are required')
+
+    metric = data.get('metric', 'euclidean')
+    dtype = data.get('dtype', 'float64')
+    if metric not in METRICS:
+        raise ValueError(f'Unknown metric: {metric}')
+    if dtype not in ('float64', 'float32'):
+        raise ValueError(f'Unsupported dtype: {dtype}')
+
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f'Unknown algorithm: {algorithm}')
+
+    improve = data.get('improve', False)
+    if improve not in IMPROVE_MODES:
+        raise ValueError(f'Unknown improve option: {improve}')
+
+    time_limit = data.get('time_limit')
+    if time_limit is not None:
+        time_limit = float(time_limit)
+        if time_limit <= 0:
+            raise ValueError('time_limit must be positive')
+
+    # Algorithm-specific parameters
+    params = {}
+    if algorithm == 'nearest_neighbor':
+        params['num_starts'] = int(data.get('num_starts', 1))
+    elif algorithm == 'genetic':
+        if data.get('seed') is not None:
+            params['seed'] = int(data['seed'])
+        params['islands'] = max(1, min(int(data.get('islands', 1)), MAX_ISLANDS))
+        params['migration_interval'] = int(data.get('migration_interval', 50))
+    elif algorithm == 'aco':
+        if data.get('seed') is not None:
+            params['seed'] = int(data['seed'])
+        params['max_min'] = bool(data.get('max_min', False))
+    elif algorithm == 'decomposition':
+        params['cluster_size'] = int(data.get('cluster_size', CLUSTER_SIZE))
+        if not 2 <= params['cluster_size'] <= MAX_CLUSTER_SIZE:
+            raise ValueError(f'cluster_size must be between 2 and {MAX_CLUSTER_SIZE}')
+        params['partition'] = data.get('partition', 'hilbert')
+        if params['partition'] not in PARTITIONS:
+            raise ValueError(f"Unknown partition: {params['partition']}")
+        params['cluster_algorithm'] = data.get('cluster_algorithm', 'greedy')
+        if params['cluster_algorithm'] not in ALGORITHMS or params['cluster_algorithm'] == 'decomposition':
+            raise ValueError(f"Unknown cluster algorithm: {params['cluster_algorithm']}")
+        params['workers'] = max(1, min(int(data.get('workers', 1)), MAX_ISLANDS))
+
+    return {
+        'points': points,
+        'metric': metric,
+        'dtype': dtype,
+        'algorithm': algorithm,
+        'improve': improve,
+        'time_limit': time_limit,
+        'params': params,
+        'cache': bool(data.get('cache', True)),
+    }
+
+def _maze_distances(data, spec):
+    """
+    Grid travel distances between the request's points on its saved maze.
+
+    Returns:
+        Tuple of (maze, error): maze is None without "maze_id", else a dict
+        with 'id', 'blocked', 'diagonal' and 'matrix', and spec['metric']
+        becomes 'grid'; error is a (response, status) pair to return instead
+    """
+    maze_id = data.get('maze_id')
+    if maze_id is None:
+        return None, None
+    saved = storage.get_maze(maze_id)
+    if saved is None:
+        return None, (jsonify({'error': 'Maze not found'}), 404)
+    diagonal = bool(data.get('diagonal', False))
+    start_time = time.time()
+    try:
+        matrix = distance_oracle.matrix(maze_id, saved['blocked'], spec['points'], diagonal)
+    except (TypeError, ValueError) as e:
+        return None, (jsonify({'error': str(e)}), 400)
+    matrix_seconds.observe(time.time() - start_time, metric='grid', size=size_bucket(len(spec['points'])))
+    spec['metric'] = 'grid'
+    return {'id': maze_id, 'blocked': saved['blocked'], 'diagonal': diagonal, 'matrix': matrix}, None
+
+def _solve_response(result, algorithm, metric, execution_time):
+    """JSON body for a finished solve (shared by /solve_tsp and its stream)."""
+    response = {
+        'path': result['path'],
+        'total_distance': round(result['total_distance'], 3),
+        'execution_time': round(execution_time, 6),
+        'algorithm_used': algorithm,
+        'metric': metric
+    }
+    if 'initial_distance' in result:
+        response['initial_distance'] = round(result['initial_distance'], 3)
+        response['improvement'] = round(result['improvement'], 3)
+        response['improvement_pct'] = round(result['improvement_pct'], 2)
+    if 'lower_bound' in result:
+        response['lower_bound'] = round(result['lower_bound'], 3)
+        response['gap'] = round(result['gap'], 6)
+        response['optimal'] = result['optimal']
+    return response
+
+@bp.route('/solve_tsp', methods=['POST'])
 def solve_tsp():
     """
     Solve TSP problem for warehouse robot path optimization
@@ -38,59 +349,462 @@ def solve_tsp():
     Expected JSON input:
     {
         "points": [[x1, y1], [x2, y2], ...],
-        "algorithm": "nearest_neighbor" | "greedy" | "genetic" | "dynamic" | "aco"
+        "algorithm": "nearest_neighbor" | "greedy" | "genetic" | "dynamic" | "aco" | "branch_and_bound"
+                     | "decomposition" | "space_filling_curve" | "farthest_insertion"
+                     | "cheapest_insertion" | "double_tree" | "christofides",
+        "metric": "euclidean" | "manhattan" | "chebyshev"   (optional),
+        "dtype": "float64" | "float32"                       (optional),
+        "num_starts": int   (optional, nearest_neighbor multi-start),
+        "improve": false | true | "two_opt" | "or_opt"   (optional local search),
+        "time_limit": float (optional, seconds; genetic, aco, branch_and_bound and
+                             the local search return their best route so far),
+        "seed": int         (optional, genetic / aco reproducibility),
+        "islands": int      (optional, genetic island model worker processes),
+        "migration_interval": int (optional, generations between migrations),
+        "max_min": bool     (optional, aco MAX-MIN Ant System),
+        "cluster_size": int (optional, decomposition points per cluster, default 1000),
+        "partition": "hilbert" | "kmeans"  (optional, decomposition clustering),
+        "cluster_algorithm": string  (optional, decomposition per-cluster algorithm, default greedy),
+        "workers": int      (optional, decomposition worker processes),
+        "cache": bool       (optional, default true; reuse routes of identical pick lists),
+        "maze_id": string   (optional, saved maze: points are grid cells and distances
+                             are real travel distances around walls),
+        "diagonal": bool    (optional, with maze_id: allow 8-connected moves),
+        "output": "path" | "tour"  (optional; "tour" returns point indices instead of coordinates),
+        "profile": bool     (optional; run the solve under cProfile, bypassing the cache,
+                             and return the breakdown; JSON / MessagePack responses only)
     }
 
+    Large instances can skip JSON: send raw little-endian float32 x, y pairs
+    (Content-Type: application/octet-stream) or a .npy array
+    (application/x-npy) with the options in the query string, or MessagePack.
+    The response format follows the Accept header (see wire.py).
+
     Returns:
     {
-        "path": [[x1, y1], [x2, y2], ...],
+        "path": [[x1, y1], [x2, y2], ...],   (or "tour": [i0, i1, ..., i0])
         "total_distance": float,
         "execution_time": float,
-        "algorithm_used": string
+        "algorithm_used": string,
+        "initial_distance": float,   (only with improve)
+        "improvement": float,        (only with improve)
+        "improvement_pct": float,    (only with improve)
+        "lower_bound": float,        (only branch_and_bound)
+        "gap": float,                (only branch_and_bound)
+        "optimal": bool,             (only branch_and_bound)
+        "cached": bool,              (route came from the solution cache)
+        "grid_path": [[x, y], ...],  (only with maze_id: every cell the robot drives through)
+        "profile": {...}             (only with profile: see metrics.profile_call)
+    }
+    """
+    try:
+        try:
+            data = decode_request(request)
+            media_type = response_format(request)
+        except UnsupportedFormat as e:
+            return jsonify({'error': str(e)}), e.status
+        except ValueError as e:
+            return jsonify({'error': f'Malformed request body: {str(e)}'}), 400
+        try:
+            spec = _parse_solve_request(data, maze=True)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        logger.debug('Solve request: %d points, algorithm=%s, improve=%s, metric=%s',
+                     len(spec['points']), spec['algorithm'], spec['improve'], spec['metric'])
+        profile = bool(data.get('profile', False))
+        size = size_bucket(len(spec['points']))
+        output = data.get('output', 'path')
+        if output not in OUTPUTS:
+            return jsonify({'error': f'Unknown output: {output}'}), 400
+
+        # Saved maze: optimize travel distance through the aisles, not straight lines
+        start_time = time.time()
+        maze, error = _maze_distances(data, spec)
+        if error is not None:
+            return error
+
+        # Same pick list (in any order) with the same options: reuse the route
+        instance = result = None
+        if spec['cache']:
+            options = {k: v for k, v in spec.items() if k not in ('points', 'cache')}
+            if maze is not None:
+                options.update(maze=maze_fingerprint(maze['blocked']), diagonal=maze['diagonal'])
+            instance = solution_cache.canonicalize(spec['points'], **options)
+            if not profile:
+                result = solution_cache.get(instance)
+        cached = result is not None
+        solve_requests.inc(algorithm=spec['algorithm'], cached='true' if cached else 'false')
+
+        if not cached:
+            # Initialize TSP solver
+            if maze is not None:
+                solver = TSPSolver(spec['points'], dtype=spec['dtype'], distance_matrix=maze['matrix'])
+            else:
+                solver = TSPSolver(spec['points'], metric=spec['metric'], dtype=spec['dtype'])
+            
+            # Start timing
+            start_time = time.time()
+
+            # Solve based on selected algorithm (plus optional local search)
+            solve_args = (spec['algorithm'],)
+            solve_options = dict(improve=spec['improve'], time_limit=spec['time_limit'], **spec['params'])
+            if profile:
+                result, breakdown = profile_call(solver.solve, *solve_args, **solve_options)
+            else:
+                result = solver.solve(*solve_args, **solve_options)
+            if solver.engine.build_time is not None:
+                # Built up front for small instances, on demand by the algorithms that need it
+                matrix_seconds.observe(solver.engine.build_time, metric=spec['metric'], size=size)
+            if instance is not None:
+                solution_cache.put(instance, result)
+
+        # Calculate execution time
+        execution_time = time.time() - start_time
+        if not cached:
+            solve_seconds.observe(execution_time, algorithm=spec['algorithm'], size=size)
+
+        response = _solve_response(result, spec['algorithm'], spec['metric'], execution_time)
+        del response['path']
+        response['cached'] = cached
+        extra = {}
+        if maze is not None:
+            extra['grid_path'] = distance_oracle.route(maze['id'], maze['blocked'], spec['points'],
+                                                       result['tour'], maze['diagonal'])
+        if profile:
+            extra['profile'] = breakdown
+        return encode_solution(response, spec['points'], result['tour'], output, media_type, extra)
+
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+def _sse(event, payload):
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@bp.route('/solve_tsp/stream', methods=['POST'])
+def solve_tsp_stream():
+    """
+    Streaming variant of /solve_tsp using Server-Sent Events.
+
+    Takes the same JSON body. The solver runs in a background thread and
+    every better route is sent as it is found, so a robot can start moving
+    while the search continues:
+
+        event: improvement
+        data: {"path": [...], "total_distance": float, "elapsed": float}
+
+    Improvements closer together than STREAM_MIN_INTERVAL are dropped (the
+    final route is always sent). The stream ends with one "result" event
+    carrying the same body /solve_tsp returns, or an "error" event. With a
+    "maze_id" the distances are grid travel distances and the result also
+    carries the "grid_path".
+    """
+    data = request.get_json()
+    try:
+        spec = _parse_solve_request(data, maze=True)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    maze, error = _maze_distances(data, spec)
+    if error is not None:
+        return error
+
+    events = queue.Queue()
+
+    def run():
+        try:
+            if maze is not None:
+                solver = TSPSolver(spec['points'], dtype=spec['dtype'], distance_matrix=maze['matrix'])
+            else:
+                solver = TSPSolver(spec['points'], metric=spec['metric'], dtype=spec['dtype'])
+            start_time = time.time()
+            last_sent = [0.0]
+
+            def on_improve(tour, total_distance):
+                now = time.time()
+                if now - last_sent[0] < STREAM_MIN_INTERVAL:
+                    return
+                last_sent[0] = now
+                events.put(('improvement', {
+                    'path': solver.points[tour].tolist(),
+                    'total_distance': round(total_distance, 3),
+                    'elapsed': round(now - start_time, 6)
+                }))
+
+            result = solver.solve(spec['algorithm'], improve=spec['improve'],
+                                  time_limit=spec['time_limit'], on_improve=on_improve,
+                                  **spec['params'])
+            execution_time = time.time() - start_time
+            size = size_bucket(len(spec['points']))
+            solve_seconds.observe(execution_time, algorithm=spec['algorithm'], size=size)
+            if solver.engine.build_time is not None:
+                matrix_seconds.observe(solver.engine.build_time, metric=spec['metric'], size=size)
+            response = _solve_response(result, spec['algorithm'], spec['metric'], execution_time)
+            if maze is not None:
+                response['grid_path'] = distance_oracle.route(maze['id'], maze['blocked'], spec['points'],
+                                                              result['tour'], maze['diagonal'])
+            events.put(('result', response))
+        except Exception as e:
+            events.put(('error', {'error': f'Server error: {str(e)}'}))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def generate():
+        while True:
+            item = events.get()
+            if item is None:
+                return
+            yield _sse(*item)
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def _job_response(job):
+    """JSON body describing a solve job (with its result once available)."""
+    response = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'algorithm': job['algorithm'],
+        'num_points': job['num_points'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    }
+    if job['result'] is not None:
+        response['result'] = _solve_response(job['result'], job['algorithm'], job['metric'],
+                                             job['execution_time'])
+    if job['error'] is not None:
+        response['error'] = job['error']
+    return response
+
+@bp.route('/solve_tsp/jobs', methods=['POST'])
+def submit_job():
+    """
+    Submit a solve to run in the background.
+
+    Takes the same JSON body as /solve_tsp and answers 202 with the job id
+    right away. 429 means the worker pool's queue is full (retry later),
+    503 that the job store is full.
+    """
+    try:
+        spec = _parse_solve_request(request.get_json())
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        job = job_queue.submit(spec)
+    except QueueFull as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '1'
+        return response, 429
+    except StoreFull as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/solve_tsp/jobs/{job['id']}"
+    }), 202
+
+@bp.route('/solve_tsp/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Job status and, once finished, its result.
+
+    Pass ?wait=<seconds> to long-poll: the request returns as soon as the
+    job finishes, or after at most MAX_JOB_WAIT seconds.
+    """
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), MAX_JOB_WAIT)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+
+    job = job_queue.wait(job_id, wait)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_response(job))
+
+@bp.route('/solve_tsp/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job; a running solve stops early and keeps its best route so far."""
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_response(job))
+
+@bp.route('/solve_tsp/routes', methods=['POST'])
+def create_route():
+    """
+    Solve a pick list and keep it as a route session that can be edited.
+
+    Takes the /solve_tsp body; the first point is the robot's position.
+    "return_to_start": false ends the route at the last stop instead of
+    driving back. Stop ids are the indices of the points.
+
+    Returns:
+    {
+        "route_id": string,
+        "stops": [ids in driving order],
+        "path": [[x, y], ...]   (robot position, stops, start again if returning),
+        "total_distance": float,
+        "visited": [ids]
     }
     """
     try:
         data = request.get_json()
-        print("🔧 Received TSP request:", data)  # Debug log
+        try:
+            spec = _parse_solve_request(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
 
-        points = data.get('points', [])
-        algorithm = data.get('algorithm', 'nearest_neighbor')
+        route = route_sessions.create(spec['points'], spec['algorithm'], improve=spec['improve'],
+                                      metric=spec['metric'], return_to_start=bool(data.get('return_to_start', True)),
+                                      time_limit=spec['time_limit'], **spec['params'])
+        return jsonify(route), 201
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
 
-        if len(points) < 2:
-            return jsonify({
-                'error': 'At least 2 points are required'
-            }), 400
+@bp.route('/solve_tsp/routes/<route_id>', methods=['GET'])
+def get_route(route_id):
+    """Current state of a route session."""
+    try:
+        return jsonify(route_sessions.get(route_id))
+    except SessionNotFound:
+        return jsonify({'error': 'Route not found'}), 404
+
+@bp.route('/solve_tsp/routes/<route_id>', methods=['PATCH'])
+def update_route(route_id):
+    """
+    Change a route without re-solving it.
+
+    Expected JSON input (every field optional):
+    {
+        "visit": id,              (the robot reached this stop; it becomes the robot's position)
+        "remove": [id, ...],      (cancelled stops)
+        "add": [[x, y], ...]      (new stops)
+    }
+
+    Changes apply in that order. New stops go in by cheapest insertion and
+    only the part of the route around each change is re-optimized (2-opt /
+    Or-opt), so the robot's position stays at the head of the route.
 
-        # Initialize TSP solver
-        solver = TSPSolver(points)
-        
-        # Start timing
+    Returns:
+        The route as for POST, plus "added" (ids of the new stops) and
+        "update_time" (seconds)
+    """
+    try:
+        data = request.get_json() or {}
         start_time = time.time()
+        try:
+            add = [[float(x), float(y)] for x, y in data.get('add', [])]
+            route = route_sessions.update(route_id, add=add, remove=data.get('remove', []),
+                                          visit=data.get('visit'))
+        except SessionNotFound:
+            return jsonify({'error': 'Route not found'}), 404
+        except KeyError as e:
+            return jsonify({'error': e.args[0]}), 400
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid route update: {str(e)}'}), 400
+        route['update_time'] = round(time.time() - start_time, 6)
+        return jsonify(route)
+    except Exception as e:
+        return jsonify({
+            'error': f'Server error: {str(e)}'
+        }), 500
 
-        # Solve based on selected algorithm
-        if algorithm == 'nearest_neighbor':
-            path, total_distance = solver.nearest_neighbor()
-        elif algorithm == 'greedy':
-            path, total_distance = solver.greedy_algorithm()
-        elif algorithm == 'genetic':
-            path, total_distance = solver.genetic_algorithm()
-        elif algorithm == 'dynamic':
-            path, total_distance = solver.dynamic_programming()
-        elif algorithm == 'aco':
-            path, total_distance = solver.ant_colony_optimization()
-        else:
+@bp.route('/solve_tsp/routes/<route_id>', methods=['DELETE'])
+def delete_route(route_id):
+    """Close a route session."""
+    if not route_sessions.delete(route_id):
+        return jsonify({'error': 'Route not found'}), 404
+    return jsonify({'status': 'deleted', 'route_id': route_id})
+
+@bp.route('/solve_tsp/batch', methods=['POST'])
+def solve_tsp_batch():
+    """
+    Solve many independent pick lists in one request.
+
+    Expected JSON input:
+    {
+        "instances": [{...}, {...}, ...]   (each a /solve_tsp request body)
+    }
+
+    Instances are solved concurrently on a worker pool, and small
+    nearest-neighbor instances of the same size share one vectorized pass.
+    One invalid or failing instance does not fail the batch.
+
+    Returns:
+    {
+        "results": [                       (input order)
+            {"index": 0, ...the /solve_tsp response...},
+            {"index": 1, "error": string},
+            ...
+        ],
+        "count": int,
+        "failed": int,
+        "execution_time": float
+    }
+    """
+    try:
+        data = request.get_json()
+        instances = data.get('instances') if isinstance(data, dict) else None
+        if not isinstance(instances, list) or not instances:
             return jsonify({
-                'error': f'Unknown algorithm: {algorithm}'
+                'error': 'instances must be a non-empty list'
+            }), 400
+        if len(instances) > MAX_BATCH_INSTANCES:
+            return jsonify({
+                'error': f'At most {MAX_BATCH_INSTANCES} instances per batch'
             }), 400
 
-        # Calculate execution time
-        execution_time = time.time() - start_time
+        start_time = time.time()
+        responses = [None] * len(instances)
+        specs = [None] * len(instances)
+        keys = [None] * len(instances)
+        for i, instance in enumerate(instances):
+            try:
+                spec = _parse_solve_request(instance)
+                if spec['cache']:
+                    keys[i] = solution_cache.canonicalize(
+                        spec['points'], **{k: v for k, v in spec.items() if k not in ('points', 'cache')})
+            except (TypeError, ValueError) as e:
+                responses[i] = {'index': i, 'error': str(e)}
+                continue
+            if keys[i] is not None:
+                cached = solution_cache.get(keys[i])
+                if cached is not None:
+                    responses[i] = _solve_response(cached, spec['algorithm'], spec['metric'], 0.0)
+                    responses[i].update({'index': i, 'cached': True})
+                    continue
+            specs[i] = spec
+
+        results = solve_batch(specs, executor=_worker_pool())
+        for i, result in enumerate(results):
+            if result is None:
+                continue
+            if 'error' in result:
+                responses[i] = {'index': i, 'error': result['error']}
+                continue
+            if keys[i] is not None:
+                solution_cache.put(keys[i], result)
+            responses[i] = _solve_response(result, specs[i]['algorithm'], specs[i]['metric'],
+                                           result['execution_time'])
+            responses[i].update({'index': i, 'cached': False})
 
         return jsonify({
-            'path': path,
-            'total_distance': round(total_distance, 3),
-            'execution_time': round(execution_time, 6),
-            'algorithm_used': algorithm
+            'results': responses,
+            'count': len(responses),
+            'failed': sum(1 for r in responses if 'error' in r),
+            'execution_time': round(time.time() - start_time, 6)
         })
 
     except Exception as e:
@@ -98,22 +812,22 @@ def solve_tsp():
             'error': f'Server error: {str(e)}'
         }), 500
 
-@app.route('/api/save-maze', methods=['POST'])
+@bp.route('/api/save-maze', methods=['POST'])
 def save_maze():
-    """Save maze configuration"""
+    """Save maze configuration (pass an existing "maze_id" to update that maze)"""
     try:
         maze_data = request.get_json()
-        maze_id = str(uuid.uuid4())
-        
+
         # Store maze configuration
-        maze_configs[maze_id] = {
-            'id': maze_id,
-            'maze': maze_data.get('maze'),
-            'robots': maze_data.get('robots'),
-            'deliveries': maze_data.get('deliveries'),
-            'timestamp': datetime.now().isoformat()
-        }
-        
+        try:
+            maze_id, replaced = storage.save_maze(maze_data.get('maze'), maze_data.get('robots'),
+                                                  maze_data.get('deliveries'), maze_data.get('maze_id'))
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid maze: {str(e)}'}), 400
+        if replaced:
+            # Distances computed on the old layout no longer hold
+            distance_oracle.invalidate(maze_id)
+
         return jsonify({
             'status': 'success',
             'maze_id': maze_id,
@@ -124,47 +838,181 @@ def save_maze():
             'error': f'Failed to save maze: {str(e)}'
         }), 500
 
-@app.route('/api/load-maze/<maze_id>')
+@bp.route('/api/load-maze/<maze_id>')
 def load_maze(maze_id):
     """Load maze configuration by ID"""
-    if maze_id in maze_configs:
-        return jsonify(maze_configs[maze_id])
+    maze = storage.export_maze(maze_id)
+    if maze is not None:
+        return jsonify(maze)
     return jsonify({'error': 'Maze not found'}), 404
 
-@app.route('/api/simulate', methods=['POST'])
+def _parse_cells(items, name):
+    """Grid cells given as {"x": .., "y": ..} objects or [x, y] pairs."""
+    cells = []
+    for item in items or []:
+        if isinstance(item, dict):
+            cells.append((int(item['x']), int(item['y'])))
+        else:
+            x, y = item
+            cells.append((int(x), int(y)))
+    if not cells:
+        raise ValueError(f'At least one {name} position is required')
+    return cells
+
+@bp.route('/api/simulate', methods=['POST'])
 def run_simulation():
-    """Run robot simulation"""
+    """
+    Run robot simulation
+
+    Expected JSON input:
+    {
+        "maze": grid from the maze editor (or "maze_id" of a saved maze),
+        "robots": [{"x": 0, "y": 0}, ...] or [[x, y], ...],
+        "deliveries": [{"x": 5, "y": 7}, ...] or [[x, y], ...],
+        "algorithm": "astar" | "dijkstra" | "greedy" | "jps" (optional, default astar),
+        "diagonal": false (optional; 8-connected moves, not with jps)
+    }
+
+    Deliveries are assigned greedily to the least-travelled robot and every
+    leg is routed on the server. Distances are in cells; completion_time is
+    the number of steps until the last robot finishes.
+    """
     try:
-        sim_data = request.get_json()
+        sim_data = request.get_json() or {}
+        saved = {}
+        if sim_data.get('maze_id') is not None:
+            saved = storage.get_maze(sim_data['maze_id'])
+            if saved is None:
+                return jsonify({'error': 'Maze not found'}), 404
+
+        algorithm = sim_data.get('algorithm', 'astar')
+        diagonal = bool(sim_data.get('diagonal', False))
+        if algorithm not in GRID_ALGORITHMS:
+            return jsonify({
+                'error': f'Invalid algorithm. Choose from: {", ".join(GRID_ALGORITHMS)}'
+            }), 400
+        try:
+            if sim_data.get('maze'):
+                blocked = occupancy_grid(sim_data['maze'])
+            elif saved:
+                blocked = saved['blocked']
+            else:
+                raise ValueError('A maze grid or a saved maze_id is required')
+            robots = _parse_cells(sim_data.get('robots') or sim_data.get('startPoints')
+                                  or saved.get('robots'), 'robot')
+            deliveries = _parse_cells(sim_data.get('deliveries') or sim_data.get('deliveryPoints')
+                                      or saved.get('deliveries'), 'delivery')
+            start_time = time.time()
+            plan = plan_deliveries(blocked, robots, deliveries, algorithm, diagonal)
+            planning_time = time.time() - start_time
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid simulation input: {str(e)}'}), 400
+
         sim_id = str(uuid.uuid4())
-        
-        # Process simulation
         results = {
             'simulation_id': sim_id,
-            'algorithm': sim_data.get('algorithm', 'astar'),
-            'robot_count': sim_data.get('robot_count', 2),
-            'total_distance': random.randint(100, 500),  # Replace with actual calculation
-            'completion_time': random.randint(10, 60),   # Replace with actual calculation
-            'collisions_avoided': random.randint(0, 20), # Replace with actual calculation
-            'efficiency_score': round(random.uniform(0.7, 1.0), 2),
+            'algorithm': algorithm,
+            'robot_count': len(robots),
+            'total_distance': round(plan['total_distance'], 4),
+            'completion_time': plan['makespan'],
+            'planning_time': round(planning_time, 4),
+            'nodes_expanded': plan['expanded'],
+            'conflicts': plan['conflicts'],
+            'unreachable': plan['unreachable'],
+            'efficiency_score': round(plan['efficiency'], 4),
+            'routes': [{
+                'robot': i,
+                'start': robot['start'],
+                'deliveries': robot['deliveries'],
+                'path': robot['path'],
+                'distance': round(robot['distance'], 4),
+            } for i, robot in enumerate(plan['robots'])],
             'timestamp': datetime.now().isoformat()
         }
-        
-        simulations[sim_id] = results
+
+        storage.save_simulation(sim_id, results)
         return jsonify(results)
     except Exception as e:
         return jsonify({
             'error': f'Simulation failed: {str(e)}'
         }), 500
 
-@app.route('/api/results/<sim_id>')
+@bp.route('/api/mapf', methods=['POST'])
+def plan_multi_agent():
+    """
+    Plan collision-free paths for several robots
+
+    Expected JSON input:
+    {
+        "maze": grid from the maze editor (or "maze_id" of a saved maze),
+        "robots": [{"x": 0, "y": 0}, ...] or [[x, y], ...],
+        "goals": one cell per robot, same formats,
+        "method": "cooperative" | "cbs" (optional, default cooperative),
+        "time_limit": float (optional, seconds, default 5)
+    }
+
+    Robots move one cell (or wait) per time step on a 4-connected grid and
+    stay on their goal once there. "cbs" searches for a minimum-cost plan and
+    falls back to the cooperative plan when the budget runs out.
+    """
+    try:
+        data = request.get_json() or {}
+        saved = {}
+        if data.get('maze_id') is not None:
+            saved = storage.get_maze(data['maze_id'])
+            if saved is None:
+                return jsonify({'error': 'Maze not found'}), 404
+
+        method = data.get('method', 'cooperative')
+        if method not in MAPF_METHODS:
+            return jsonify({
+                'error': f'Invalid method. Choose from: {", ".join(MAPF_METHODS)}'
+            }), 400
+        try:
+            time_limit = float(data.get('time_limit', MAPF_TIME_LIMIT))
+            if not 0 < time_limit <= MAX_MAPF_TIME_LIMIT:
+                raise ValueError(f'time_limit must be in (0, {MAX_MAPF_TIME_LIMIT:g}]')
+            if data.get('maze'):
+                blocked = occupancy_grid(data['maze'])
+            elif saved:
+                blocked = saved['blocked']
+            else:
+                raise ValueError('A maze grid or a saved maze_id is required')
+            robots = _parse_cells(data.get('robots') or saved.get('robots'), 'robot')
+            goals = _parse_cells(data.get('goals'), 'goal')
+            start_time = time.time()
+            plan = plan_paths(blocked, robots, goals, method, time_limit)
+            planning_time = time.time() - start_time
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid planning input: {str(e)}'}), 400
+
+        plan['robot_count'] = len(robots)
+        plan['planning_time'] = round(planning_time, 4)
+        return jsonify(plan)
+    except Exception as e:
+        return jsonify({
+            'error': f'Planning failed: {str(e)}'
+        }), 500
+
+@bp.route('/api/results/<sim_id>')
 def get_results(sim_id):
     """Get simulation results by ID"""
-    if sim_id in simulations:
-        return jsonify(simulations[sim_id])
+    results = storage.get_simulation(sim_id)
+    if results is not None:
+        return jsonify(results)
     return jsonify({'error': 'Simulation not found'}), 404
 
-@app.route('/api/algorithms')
+@bp.route('/api/cache-stats')
+def cache_stats():
+    """Solution cache size and hit/miss counters"""
+    return jsonify(solution_cache.stats())
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Request counts, solve and matrix timings, queue depth and cache counters (Prometheus text format)"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+@bp.route('/api/algorithms')
 def get_algorithms():
     """Get available pathfinding algorithms"""
     return jsonify({
@@ -189,11 +1037,18 @@ def get_algorithms():
                 'description': 'Fast but not always optimal',
                 'complexity': 'O(b^m)',
                 'optimal': False
+            },
+            {
+                'id': 'jps',
+                'name': 'Jump Point Search',
+                'description': 'A* that jumps along open corridors, expanding far fewer nodes',
+                'complexity': 'O(b^d)',
+                'optimal': True
             }
         ]
     })
 
-@app.route('/api/maze-templates')
+@bp.route('/api/maze-templates')
 def get_maze_templates():
     """Get predefined maze templates"""
     templates = [
@@ -218,7 +1073,7 @@ def get_maze_templates():
     ]
     return jsonify({'templates': templates})
 
-@app.route('/health')
+@bp.route('/health')
 def health_check():
     """Health check endpoint"""
     return jsonify({
@@ -227,15 +1082,124 @@ def health_check():
         'version': '1.0.0'
     })
 
-@app.errorhandler(404)
+@bp.route('/ready')
+def readiness():
+    """
+    Readiness check: 200 when this worker can take solve requests, else 503.
+
+    Checks that the database answers, that a small solve runs, and that
+    neither the request cap nor the background job queue is saturated.
+    """
+    checks = {}
+    try:
+        storage.ping()
+        checks['storage'] = 'ok'
+    except Exception as e:
+        checks['storage'] = f'error: {str(e)}'
+    try:
+        TSPSolver([[0, 0], [0, 1], [1, 1], [1, 0]]).solve('nearest_neighbor')
+        checks['solver'] = 'ok'
+    except Exception as e:
+        checks['solver'] = f'error: {str(e)}'
+
+    limiter = current_app.extensions['request_limiter']
+    with limiter['lock']:
+        active = limiter['active']
+    saturated = bool(limiter['limit']) and active >= limiter['limit']
+    checks['requests'] = 'full' if saturated else 'ok'
+    checks['jobs'] = 'full' if job_queue.depth >= job_queue.capacity else 'ok'
+
+    ready = all(value == 'ok' for value in checks.values())
+    return jsonify({
+        'status': 'ready' if ready else 'not_ready',
+        'checks': checks,
+        'active_requests': active,
+        'max_concurrent_requests': limiter['limit'],
+        'jobs_in_flight': job_queue.depth,
+        'pid': os.getpid()
+    }), 200 if ready else 503
+
+@bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(413)
+def body_too_large(error):
+    return jsonify({'error': f"Request body exceeds {current_app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+
+@bp.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+def _limit_requests(app):
+    """Cap requests served at once: beyond MAX_CONCURRENT_REQUESTS answer 429 instead of queueing."""
+    limiter = {'limit': int(app.config['MAX_CONCURRENT_REQUESTS']), 'active': 0, 'lock': threading.Lock()}
+    app.extensions['request_limiter'] = limiter
+
+    @app.before_request
+    def admit():
+        max_body = app.config['MAX_CONTENT_LENGTH']
+        if max_body is not None and (request.content_length or 0) > max_body:
+            # Refuse before reading; werkzeug only checks once the body is parsed
+            return body_too_large(None)
+        if not limiter['limit'] or request.endpoint in UNCAPPED_ENDPOINTS:
+            return None
+        with limiter['lock']:
+            if limiter['active'] >= limiter['limit']:
+                response = jsonify({'error': f"Server busy ({limiter['limit']} requests in progress)"})
+                response.headers['Retry-After'] = '1'
+                return response, 429
+            limiter['active'] += 1
+        g.holds_request_slot = True
+        return None
+
+    @app.teardown_request
+    def release(error=None):
+        if g.pop('holds_request_slot', False):
+            with limiter['lock']:
+                limiter['active'] -= 1
+
+def create_app(config=None):
+    """
+    Application factory.
+
+    Settings come from DEFAULT_CONFIG, then WAREHOUSE_* environment
+    variables (values parsed as JSON, e.g. WAREHOUSE_MAX_CONCURRENT_REQUESTS=8),
+    then `config`. Solver state (caches, stores, the job queue) lives at
+    module level and is shared by every app of the process; forked server
+    workers each start their own pools and database connections.
+
+    Args:
+        config: Flask config overrides
+
+    Returns:
+        The Flask application
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    app.config.from_prefixed_env('WAREHOUSE')
+    if config:
+        app.config.update(config)
+    app.register_blueprint(bp)
+    _limit_requests(app)
+    return app
+
+def warm_up():
+    """
+    Run every algorithm once on a tiny instance.
+
+    A prefork server calls this before forking, so NumPy and every solver
+    code path are loaded once in the parent and shared copy-on-write; new
+    workers answer their first request at full speed.
+    """
+    points = [[0, 0], [3, 1], [1, 4], [5, 5], [2, 2], [4, 0], [0, 5], [5, 2]]
+    for algorithm in ALGORITHMS:
+        TSPSolver(points).solve(algorithm, improve=True, time_limit=0.05)
+
+app = create_app()
+
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     print("🤖 Starting Warehouse Robot Path Optimizer...")
     print("📍 Access the application at: http://127.0.0.1:5000")
     print("🔗 Available routes:")
@@ -0,0 +1,134 @@
+import time
+import numpy as np
+from collections import defaultdict
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Tuple
+from distance_engine import METRICS
+from tsp_heuristics import TSPSolver, IMPROVE_MODES
+
+# Nearest-neighbor instances up to this size are solved together in one
+# vectorized pass (a (batch, n, n) distance tensor) instead of one by one
+BATCH_VECTOR_MAX_POINTS = 64
+
+# Instances per vectorized pass, which bounds the distance tensor's memory
+BATCH_VECTOR_GROUP = 256
+
+# Instances sent to a worker process per task
+BATCH_CHUNK_SIZE = 8
+
+
+def batch_nearest_neighbor(points: np.ndarray, metric: str = 'euclidean') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest neighbor from point 0 for many same-size instances at once.
+
+    Args:
+        points: (batch, n, 2) coordinates
+        metric: Key of METRICS
+
+    Returns:
+        Tuple of (batch, n + 1) closed tours and (batch,) tour lengths
+    """
+    batch, n, _ = points.shape
+    distances = METRICS[metric](points[:, :, None, :], points[:, None, :, :])
+    rows = np.arange(batch)
+    tours = np.zeros((batch, n + 1), dtype=np.intp)
+    visited = np.zeros((batch, n), dtype=bool)
+    visited[:, 0] = True
+    current = np.zeros(batch, dtype=np.intp)
+    for step in range(1, n):
+        candidates = np.where(visited, np.inf, distances[rows, current])
+        current = np.argmin(candidates, axis=1)
+        tours[:, step] = current
+        visited[rows, current] = True
+    lengths = distances[rows[:, None], tours[:, :-1], tours[:, 1:]].sum(axis=1)
+    return tours, lengths
+
+
+def _vectorizable(spec: Dict) -> bool:
+    return (spec['algorithm'] == 'nearest_neighbor'
+            and IMPROVE_MODES[spec['improve']] is None
+            and spec['params'].get('num_starts', 1) == 1
+            and len(spec['points']) <= BATCH_VECTOR_MAX_POINTS)
+
+
+def _solve_one(spec: Dict) -> Dict:
+    """Solve a single instance; errors are returned, not raised, so one bad instance stays isolated."""
+    start_time = time.time()
+    try:
+        solver = TSPSolver(spec['points'], metric=spec['metric'], dtype=spec['dtype'])
+        result = solver.solve(spec['algorithm'], improve=spec['improve'],
+                              time_limit=spec['time_limit'], **spec['params'])
+    except Exception as e:
+        return {'error': str(e), 'execution_time': time.time() - start_time}
+    result['execution_time'] = time.time() - start_time
+    return result
+
+
+def solve_batch(specs: List[Optional[Dict]], executor: Optional[Executor] = None) -> List[Dict]:
+    """
+    Solve many independent instances.
+
+    Small nearest-neighbor instances are grouped by size and metric and
+    solved in one vectorized pass per group; everything else is spread over
+    `executor` (or solved inline without one).
+
+    Args:
+        specs: Parsed solve requests; None entries are skipped
+        executor: Optional pool for the non-vectorized instances
+
+    Returns:
+        One dict per spec, in input order: a TSPSolver.solve() style result
+        plus 'execution_time', or {'error': message}. Skipped entries get None.
+    """
+    results: List[Optional[Dict]] = [None] * len(specs)
+    groups: Dict[Tuple[int, str], List[int]] = defaultdict(list)
+    others = []
+    for i, spec in enumerate(specs):
+        if spec is None:
+            continue
+        if _vectorizable(spec):
+            groups[(len(spec['points']), spec['metric'])].append(i)
+        else:
+            others.append(i)
+
+    # Submit the pool work first so it overlaps with the vectorized groups
+    pending = None
+    if others and executor is not None:
+        pending = executor.map(_solve_one, [specs[i] for i in others], chunksize=BATCH_CHUNK_SIZE)
+
+    for (n, metric), group in groups.items():
+        for start in range(0, len(group), BATCH_VECTOR_GROUP):
+            members = group[start:start + BATCH_VECTOR_GROUP]
+            _solve_vectorized([specs[i] for i in members], members, n, metric, results)
+
+    if pending is not None:
+        for i, result in zip(others, pending):
+            results[i] = result
+    else:
+        for i in others:
+            results[i] = _solve_one(specs[i])
+    return results
+
+
+def _solve_vectorized(specs: List[Dict], members: List[int], n: int, metric: str,
+                      results: List[Optional[Dict]]) -> None:
+    """Solve one group of same-size nearest-neighbor instances and store their results."""
+    start_time = time.time()
+    try:
+        points = np.array([spec['points'] for spec in specs], dtype=np.float64).reshape(len(specs), n, 2)
+    except (TypeError, ValueError):
+        # Malformed coordinates somewhere in the group: fall back to one by one
+        for spec, i in zip(specs, members):
+            results[i] = _solve_one(spec)
+        return
+    tours, lengths = batch_nearest_neighbor(points, metric)
+    # Report each instance's share of the group's time
+    share = (time.time() - start_time) / len(specs)
+    for row, i in enumerate(members):
+        results[i] = {
+            'path': points[row][tours[row]].tolist(),
+            'tour': tours[row].tolist(),
+            'total_distance': float(lengths[row]),
+            'execution_time': share,
+            'vectorized': True,
+        }
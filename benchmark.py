@@ -0,0 +1,297 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from tsp_heuristics import ALGORITHMS, BRANCH_AND_BOUND_MAX_POINTS, HELD_KARP_MAX_POINTS, TSPSolver
+
+# Bump when the layout of the results file changes
+RESULTS_VERSION = 1
+
+FAMILIES = ('uniform', 'clustered', 'aisles')
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+
+# Side of the square the instances are drawn in
+EXTENT = 1000.0
+
+# Largest instance each algorithm is run on; beyond it the run is recorded as skipped.
+# Genetic and ACO hold the full n x n matrix, Held-Karp and branch and bound are exponential,
+# the insertion heuristics take O(n^2) time.
+MAX_POINTS = {
+    'dynamic': HELD_KARP_MAX_POINTS,
+    'branch_and_bound': BRANCH_AND_BOUND_MAX_POINTS,
+    'genetic': 2000,
+    'aco': 2000,
+    'farthest_insertion': 10000,
+    'cheapest_insertion': 10000,
+}
+
+# Seeded algorithms get the instance seed so every run does the same work
+SEEDED_ALGORITHMS = ('genetic', 'aco')
+
+# Default slowdown tolerated by diff_results() before a timing counts as a regression
+TIME_TOLERANCE = 1.5
+
+
+def generate_instance(family: str, n: int, seed: int) -> np.ndarray:
+    """
+    Seeded benchmark instance.
+
+    - uniform: points spread evenly over the square
+    - clustered: Gaussian blobs around about sqrt(n) / 2 centers, like
+      picks concentrated in a few hot zones
+    - aisles: pick faces on both sides of parallel racks at evenly spaced
+      shelf positions, so many distances tie and tours run along the aisles
+
+    Args:
+        family: Key of FAMILIES
+        n: Number of points
+        seed: Seed for numpy.random.Generator
+
+    Returns:
+        (n, 2) float64 array
+    """
+    rng = np.random.default_rng(seed)
+    if family == 'uniform':
+        return rng.uniform(0.0, EXTENT, (n, 2))
+    if family == 'clustered':
+        centers = rng.uniform(0.0, EXTENT, (max(2, int(math.sqrt(n) / 2)), 2))
+        spread = EXTENT / (4.0 * math.sqrt(len(centers)))
+        points = centers[rng.integers(len(centers), size=n)] + rng.normal(0.0, spread, (n, 2))
+        return np.clip(points, 0.0, EXTENT)
+    if family == 'aisles':
+        aisles = max(2, round(math.sqrt(n / 8)))
+        slots = math.ceil(2 * n / aisles)
+        # Slot s of aisle a, side 0 or 1: two pick faces per rack, one unit either side
+        chosen = rng.choice(aisles * 2 * slots, size=n, replace=False)
+        aisle, rest = np.divmod(chosen, 2 * slots)
+        side, slot = np.divmod(rest, slots)
+        spacing = EXTENT / aisles
+        x = (aisle + 0.5) * spacing + np.where(side == 1, 1.0, -1.0)
+        y = slot * (EXTENT / slots)
+        return np.column_stack([x, y]).astype(np.float64)
+    raise ValueError(f'Unknown instance family: {family}')
+
+
+def _measure(points: np.ndarray, algorithm: str, options: Dict, trace_memory: bool) -> Dict:
+    """
+    One solve, solver construction (distance matrix) included.
+
+    Wall time and CPU time (process_time) come from an untraced run; with
+    trace_memory the solve is repeated under tracemalloc for the peak, since
+    tracing slows down the pure-Python parts several times over.
+    """
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = TSPSolver(points).solve(algorithm, **options)
+    record = {
+        'wall_time': time.perf_counter() - wall_start,
+        'cpu_time': time.process_time() - cpu_start,
+        'length': result['total_distance'],
+        'peak_memory': None,
+    }
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            TSPSolver(points).solve(algorithm, **options)
+            record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return record
+
+
+def run_benchmark(families: Sequence[str] = FAMILIES, sizes: Sequence[int] = DEFAULT_SIZES,
+                  algorithms: Optional[Sequence[str]] = None, improve: Sequence[bool] = (False, True),
+                  seed: int = 0, time_limit: Optional[float] = 10.0, trace_memory: bool = True,
+                  best_known: Optional[Dict[str, float]] = None,
+                  log=None) -> Dict:
+    """
+    Run every algorithm on every instance, with and without local search.
+
+    Each run's tour length is compared with a reference: the Held-Karp
+    optimum when the instance is small enough for it, otherwise the best
+    length known, i.e. the shortest tour of this run or of `best_known`
+    (for instance the 'instances' of an earlier results file).
+
+    Args:
+        families: Instance families (keys of FAMILIES)
+        sizes: Instance sizes
+        algorithms: Keys of ALGORITHMS (default: all)
+        improve: Local-search settings to run each algorithm with
+        seed: Instance seed; every instance also seeds the stochastic algorithms
+        time_limit: Seconds per solve for the anytime algorithms and local search
+        trace_memory: Record peak memory (a second, traced solve per run)
+        best_known: Instance key -> best tour length known from elsewhere
+        log: Called with a summary line per run once its instance is done
+
+    Returns:
+        Dict with 'version', 'config', 'instances' (key -> reference length
+        and whether it is optimal) and 'runs' (one record per instance,
+        algorithm and improve setting, with 'gap_pct' to the reference, or
+        'skipped' / 'error')
+    """
+    algorithms = list(algorithms or ALGORITHMS)
+    for name in algorithms:
+        if name not in ALGORITHMS:
+            raise ValueError(f'Unknown algorithm: {name}')
+    best_known = best_known or {}
+    instances, runs = {}, []
+
+    for family in families:
+        for n in sizes:
+            key = f'{family}-{n}-{seed}'
+            points = generate_instance(family, n, seed)
+            optimum = None
+            if n <= HELD_KARP_MAX_POINTS:
+                optimum = TSPSolver(points).solve('dynamic')['total_distance']
+
+            instance_runs = []
+            for name in algorithms:
+                for use_local_search in improve:
+                    record = {'instance': key, 'family': family, 'n': n,
+                              'algorithm': name, 'improve': use_local_search}
+                    limit = MAX_POINTS.get(name)
+                    if limit is not None and n > limit:
+                        record['skipped'] = f'more than {limit} points'
+                    else:
+                        options = {'improve': use_local_search, 'time_limit': time_limit}
+                        if name in SEEDED_ALGORITHMS:
+                            options['seed'] = seed
+                        try:
+                            record.update(_measure(points, name, options, trace_memory))
+                        except Exception as e:
+                            record['error'] = str(e)
+                    instance_runs.append(record)
+
+            lengths = [r['length'] for r in instance_runs if 'length' in r]
+            if optimum is not None:
+                reference = optimum
+            else:
+                reference = min(lengths + ([best_known[key]] if key in best_known else []), default=None)
+            instances[key] = {'family': family, 'n': n, 'seed': seed,
+                              'reference': reference, 'optimal': optimum is not None}
+            for record in instance_runs:
+                if 'length' in record and reference:
+                    record['gap_pct'] = 100.0 * (record['length'] - reference) / reference
+                if log is not None:
+                    log(_describe(record))
+            runs.extend(instance_runs)
+
+    return {
+        'version': RESULTS_VERSION,
+        'config': {
+            'families': list(families),
+            'sizes': list(sizes),
+            'algorithms': algorithms,
+            'improve': list(improve),
+            'seed': seed,
+            'time_limit': time_limit,
+            'trace_memory': trace_memory,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'instances': instances,
+        'runs': runs,
+    }
+
+
+def _describe(record: Dict) -> str:
+    label = f"{record['instance']:>20} {record['algorithm']:>16} {'+ls' if record['improve'] else '   '}"
+    if 'skipped' in record:
+        return f'{label}  skipped ({record["skipped"]})'
+    if 'error' in record:
+        return f'{label}  error: {record["error"]}'
+    gap = f"{record['gap_pct']:6.2f}%" if 'gap_pct' in record else '      -'
+    return f"{label}  {record['length']:12.1f}  gap {gap}  {record['wall_time']:8.3f}s"
+
+
+def _run_key(record: Dict) -> tuple:
+    return record['instance'], record['algorithm'], bool(record['improve'])
+
+
+def diff_results(baseline: Dict, current: Dict, time_tolerance: float = TIME_TOLERANCE,
+                 gap_tolerance: float = 0.1, min_time: float = 0.05) -> List[str]:
+    """
+    Regressions of `current` against an earlier results file.
+
+    A run regresses when its tour is more than `gap_tolerance` percent
+    longer, when its wall time grew by more than `time_tolerance` times
+    (runs under `min_time` seconds are too noisy to compare), when its
+    peak memory grew by more than `time_tolerance` times, or when it ran
+    before and now fails.
+
+    Returns:
+        One line per regression (empty when there are none)
+    """
+    before = {_run_key(r): r for r in baseline.get('runs', [])}
+    problems = []
+    for record in current.get('runs', []):
+        old = before.get(_run_key(record))
+        if old is None or 'length' not in old:
+            continue
+        label = '{} {} improve={}'.format(*_run_key(record))
+        if 'error' in record:
+            problems.append(f'{label}: now fails ({record["error"]})')
+            continue
+        if 'length' not in record:
+            continue
+        if record['length'] > old['length'] * (1.0 + gap_tolerance / 100.0):
+            problems.append(f"{label}: length {old['length']:.1f} -> {record['length']:.1f}")
+        if record['wall_time'] >= min_time and record['wall_time'] > old['wall_time'] * time_tolerance:
+            problems.append(f"{label}: wall time {old['wall_time']:.3f}s -> {record['wall_time']:.3f}s")
+        if old.get('peak_memory') and record.get('peak_memory') \
+                and record['peak_memory'] > old['peak_memory'] * time_tolerance:
+            problems.append(f"{label}: peak memory {old['peak_memory']} -> {record['peak_memory']} bytes")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the TSPSolver algorithms on seeded instances.')
+    parser.add_argument('--families', nargs='+', choices=FAMILIES, default=list(FAMILIES))
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--improve', choices=('both', 'off', 'on'), default='both',
+                        help='Run without local search, with it, or both (default)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-limit', type=float, default=10.0,
+                        help='Seconds per solve for the anytime algorithms and local search')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip the traced second solve that measures peak memory')
+    parser.add_argument('--baseline', help='Earlier results file: reuse its best lengths and report regressions')
+    parser.add_argument('--output', '-o', default='benchmark.json', help="Results file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    best_known = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        best_known = {key: instance['reference'] for key, instance in baseline.get('instances', {}).items()
+                      if instance.get('reference')}
+
+    improve = {'both': (False, True), 'off': (False,), 'on': (True,)}[args.improve]
+    results = run_benchmark(args.families, args.sizes, args.algorithms, improve, seed=args.seed,
+                            time_limit=args.time_limit, trace_memory=not args.no_memory,
+                            best_known=best_known, log=lambda line: print(line, file=sys.stderr))
+
+    text = json.dumps(results, indent=1, sort_keys=True)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+    if baseline is not None:
+        problems = diff_results(baseline, results)
+        for line in problems:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,319 @@
+import heapq
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Edge states in the constraint matrix
+FREE, INCLUDED, EXCLUDED = 0, 1, -1
+
+
+class _Node:
+    """Search node: branching decisions on top of the parent's, plus warm-start penalties."""
+    __slots__ = ('parent', 'decisions', 'pi', 'depth')
+
+    def __init__(self, parent: Optional['_Node'], decisions: List[Tuple[int, int, int]],
+                 pi: np.ndarray, depth: int):
+        self.parent = parent
+        self.decisions = decisions
+        self.pi = pi
+        self.depth = depth
+
+
+class BranchAndBound:
+    """
+    Exact symmetric TSP solver using Held-Karp 1-tree lower bounds.
+
+    Each search node's bound is the best 1-tree bound found by subgradient
+    optimization of the node penalties (warm-started from the parent).
+    Branching follows Volgenant & Jonker: at a vertex of degree > 2 in the
+    1-tree, one free tree edge is excluded, or included while a second is
+    excluded, or both are included. Nodes are explored best-bound first, so
+    when the time limit hits, the smallest bound left in the queue is a
+    proven lower bound on the optimum.
+
+    Nodes only store their branching decisions and a link to the parent;
+    the full constraint matrix is rebuilt (and propagated) when a node is
+    expanded, which keeps the queue small.
+    """
+
+    def __init__(self, cost: np.ndarray, time_limit: Optional[float] = 10.0,
+                 root_iterations: int = 200, node_iterations: int = 30):
+        """
+        Args:
+            cost: Symmetric (n, n) distance matrix
+            time_limit: Seconds before returning the best tour found (None = no limit)
+            root_iterations: Subgradient iterations at the root node
+            node_iterations: Subgradient iterations at every other node
+        """
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.n = len(self.cost)
+        self.time_limit = time_limit
+        self.root_iterations = root_iterations
+        self.node_iterations = node_iterations
+        # Forced edges are made this much cheaper so every spanning tree picks them first
+        self.big = (float(self.cost.max()) + 1.0) * self.n * 4
+        self.nodes_explored = 0
+
+    def solve(self, initial_tour: List[int],
+              callback: Optional[Callable[[List[int], float], None]] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        Args:
+            initial_tour: Open visiting order used as the starting upper bound
+            callback: Called as callback(tour, cost) whenever a better tour is found
+            should_stop: Polled before every node; True ends the search like a timeout
+
+        Returns:
+            Dict with 'tour' (open visiting order), 'cost', 'lower_bound',
+            'gap' (relative), 'optimal' and 'nodes'
+        """
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        best_tour = list(initial_tour)
+        upper = self._tour_cost(best_tour)
+        tolerance = 1e-9 * max(upper, 1.0)
+
+        if self.n <= 3:
+            return self._report(best_tour, upper, upper)
+
+        root = _Node(None, [], np.zeros(self.n), 0)
+        counter = 0
+        queue = [(-np.inf, counter, root)]
+        while queue:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            if should_stop is not None and should_stop():
+                break
+            parent_bound, _, node = heapq.heappop(queue)
+            if parent_bound >= upper - tolerance:
+                continue
+            self.nodes_explored += 1
+
+            state = self._build_state(node)
+            if state is None:
+                continue
+            iterations = self.root_iterations if node.parent is None else self.node_iterations
+            bound, pi, degrees, tree, tour = self._bound(state, node.pi, upper, iterations)
+            if tour is not None and bound < upper - tolerance:
+                best_tour, upper = tour, bound
+                if callback is not None:
+                    callback(best_tour, upper)
+            if tour is not None or bound >= upper - tolerance:
+                continue
+
+            for decisions in self._branch(state, degrees, tree):
+                counter += 1
+                heapq.heappush(queue, (bound, counter, _Node(node, decisions, pi, node.depth + 1)))
+
+        lower = min([upper] + [entry[0] for entry in queue])
+        return self._report(best_tour, upper, max(lower, 0.0) if queue else upper)
+
+    def _report(self, tour: List[int], upper: float, lower: float) -> Dict:
+        upper, lower = float(upper), float(lower)
+        gap = 0.0 if upper <= 0 else max(0.0, (upper - lower) / upper)
+        return {
+            'tour': [int(v) for v in tour],
+            'cost': upper,
+            'lower_bound': lower,
+            'gap': gap,
+            'optimal': bool(gap <= 1e-9),
+            'nodes': self.nodes_explored,
+        }
+
+    def _tour_cost(self, tour: List[int]) -> float:
+        tour = np.asarray(tour)
+        return float(self.cost[tour, np.roll(tour, -1)].sum())
+
+    # ----- constraints -------------------------------------------------
+
+    def _build_state(self, node: _Node) -> Optional[np.ndarray]:
+        """Constraint matrix for a node, or None if its decisions are infeasible."""
+        state = np.zeros((self.n, self.n), dtype=np.int8)
+        np.fill_diagonal(state, EXCLUDED)
+        while node is not None:
+            for i, j, value in node.decisions:
+                if state[i, j] != FREE and state[i, j] != value:
+                    return None
+                state[i, j] = state[j, i] = value
+            node = node.parent
+        return state if self._propagate(state) else None
+
+    def _propagate(self, state: np.ndarray) -> bool:
+        """Apply degree and subtour implications until nothing changes."""
+        n = self.n
+        changed = True
+        while changed:
+            changed = False
+            included = (state == INCLUDED).sum(axis=1)
+            available = (state != EXCLUDED).sum(axis=1)
+            if (included > 2).any() or (available < 2).any():
+                return False
+
+            # A vertex with two included edges cannot take any other
+            full = np.flatnonzero((included == 2) & (available > 2))
+            for v in full:
+                free = state[v] == FREE
+                state[v, free] = EXCLUDED
+                state[free, v] = EXCLUDED
+                changed = True
+            # A vertex with exactly two usable edges must use both
+            forced = np.flatnonzero((available == 2) & (included < 2))
+            for v in forced:
+                free = state[v] == FREE
+                state[v, free] = INCLUDED
+                state[free, v] = INCLUDED
+                changed = True
+            if changed:
+                continue
+
+            # Included edges form paths; the edge closing a path early is forbidden
+            adjacency = [np.flatnonzero(state[v] == INCLUDED).tolist() for v in range(n)]
+            seen = [False] * n
+            for v in range(n):
+                if seen[v] or len(adjacency[v]) != 1:
+                    continue
+                prev, current, length = -1, v, 0
+                seen[v] = True
+                while True:
+                    step = [u for u in adjacency[current] if u != prev]
+                    if not step:
+                        break
+                    prev, current = current, step[0]
+                    seen[current] = True
+                    length += 1
+                if length < n - 1 and state[v, current] == FREE:
+                    state[v, current] = state[current, v] = EXCLUDED
+                    changed = True
+            # Any vertex still unseen with two included edges lies on a cycle,
+            # which is only allowed if it is the full tour
+            for v in range(n):
+                if seen[v] or len(adjacency[v]) != 2:
+                    continue
+                prev, current, length = -1, v, 0
+                while True:
+                    seen[current] = True
+                    step = adjacency[current][0] if adjacency[current][0] != prev else adjacency[current][1]
+                    prev, current = current, step
+                    length += 1
+                    if current == v:
+                        break
+                if length < n:
+                    return False
+        return True
+
+    # ----- bounds ------------------------------------------------------
+
+    def _one_tree(self, weights: np.ndarray, state: np.ndarray) -> Optional[Tuple[float, np.ndarray, List[Tuple[int, int]]]]:
+        """
+        Minimum 1-tree under the constraints: an MST over vertices 1..n-1
+        (Prim, O(n²) vectorized) plus the two cheapest edges at vertex 0.
+
+        Returns:
+            Tuple of (weight, degrees, edges) or None if the constraints disconnect the graph
+        """
+        n = self.n
+        select = np.where(state == EXCLUDED, np.inf, weights)
+        select = np.where(state == INCLUDED, select - self.big, select)
+
+        edges = []
+        in_tree = np.zeros(n, dtype=bool)
+        in_tree[0] = True   # vertex 0 is handled separately
+        in_tree[1] = True
+        best = select[1].copy()
+        link = np.ones(n, dtype=np.intp)
+        for _ in range(n - 2):
+            candidates = np.where(in_tree, np.inf, best)
+            j = int(np.argmin(candidates))
+            if not np.isfinite(candidates[j]):
+                return None
+            edges.append((int(link[j]), j))
+            in_tree[j] = True
+            closer = (select[j] < best) & ~in_tree
+            best[closer] = select[j][closer]
+            link[closer] = j
+
+        order = np.argsort(select[0, 1:])[:2] + 1
+        if not np.isfinite(select[0, order]).all():
+            return None
+        edges.extend((0, int(v)) for v in order)
+
+        rows = np.array([e[0] for e in edges])
+        cols = np.array([e[1] for e in edges])
+        weight = float(weights[rows, cols].sum())
+        degrees = np.bincount(np.concatenate([rows, cols]), minlength=n)
+        return weight, degrees, edges
+
+    def _bound(self, state: np.ndarray, pi: np.ndarray, upper: float, iterations: int):
+        """
+        Subgradient optimization of the 1-tree bound for one node.
+
+        Returns:
+            Tuple of (bound, best penalties, degrees, tree edges, tour or None).
+            The bound is +inf when the node is infeasible; a tour is returned
+            when the best 1-tree is itself a tour.
+        """
+        pi = pi.astype(np.float64, copy=True)
+        best = (-np.inf, pi.copy(), None, None)
+        step_scale = 2.0
+        stale = 0
+        for _ in range(max(1, iterations)):
+            weights = self.cost + pi[:, None] + pi[None, :]
+            result = self._one_tree(weights, state)
+            if result is None:
+                return np.inf, pi, None, None, None
+            weight, degrees, edges = result
+            bound = weight - 2.0 * pi.sum()
+            if bound > best[0]:
+                best = (bound, pi.copy(), degrees, edges)
+                stale = 0
+            else:
+                stale += 1
+                if stale >= 5:
+                    step_scale /= 2.0
+                    stale = 0
+
+            if (degrees == 2).all():
+                tour = self._tree_to_tour(edges)
+                return self._tour_cost(tour), pi, degrees, edges, tour
+            if best[0] >= upper or step_scale < 1e-4:
+                break
+
+            gradient = degrees - 2
+            norm = float((gradient * gradient).sum())
+            pi += step_scale * (upper - bound) / norm * gradient
+
+        bound, pi, degrees, edges = best
+        return bound, pi, degrees, edges, None
+
+    def _tree_to_tour(self, edges: List[Tuple[int, int]]) -> List[int]:
+        adjacency = [[] for _ in range(self.n)]
+        for i, j in edges:
+            adjacency[i].append(j)
+            adjacency[j].append(i)
+        tour = [0]
+        prev, current = -1, 0
+        for _ in range(self.n - 1):
+            step = adjacency[current][0] if adjacency[current][0] != prev else adjacency[current][1]
+            prev, current = current, step
+            tour.append(current)
+        return tour
+
+    # ----- branching ---------------------------------------------------
+
+    def _branch(self, state: np.ndarray, degrees: np.ndarray,
+                edges: List[Tuple[int, int]]) -> List[List[Tuple[int, int, int]]]:
+        """Volgenant-Jonker branching at the highest-degree vertex of the 1-tree."""
+        v = int(np.argmax(degrees))
+        free = [(j if i == v else i) for i, j in edges
+                if v in (i, j) and state[i, j] == FREE]
+        free.sort(key=lambda u: -self.cost[v, u])
+        if not free:
+            return []
+        e1 = free[0]
+        if (state[v] == INCLUDED).sum() == 1 or len(free) == 1:
+            return [[(v, e1, EXCLUDED)], [(v, e1, INCLUDED)]]
+        e2 = free[1]
+        return [
+            [(v, e1, EXCLUDED)],
+            [(v, e1, INCLUDED), (v, e2, EXCLUDED)],
+            [(v, e1, INCLUDED), (v, e2, INCLUDED)],
+        ]
@@ -0,0 +1,99 @@
+import time
+import tracemalloc
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional
+from parallel import SharedArray, SharedSpec, attach_shared, detach_shared
+from tsp_heuristics import COORDINATE_ALGORITHMS, TSPSolver
+
+
+def _solve(spec: SharedSpec, points: List[List[float]], metric: str, algorithm: str, options: Dict) -> Dict:
+    """
+    One solve against the shared matrix; the solver (and its view) is gone on return.
+
+    COORDINATE_ALGORITHMS ignore the matrix and solve on the points with `metric`.
+    """
+    try:
+        if algorithm in COORDINATE_ALGORITHMS:
+            solver = TSPSolver(points, metric=metric, max_matrix_points=0)
+        else:
+            solver = TSPSolver(points, distance_matrix=attach_shared(spec))
+        return solver.solve(algorithm, **options)
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def _run_algorithm(spec: SharedSpec, points: List[List[float]], metric: str, algorithm: str,
+                   options: Dict, measure_memory: bool) -> Dict:
+    """
+    Worker task: run one algorithm against the shared distance matrix.
+
+    Wall time and CPU time (time.process_time, so only this worker's CPU)
+    cover the solve itself, not attaching the matrix, and come from an
+    untraced run. With measure_memory the solve is repeated under
+    tracemalloc for the peak of Python and NumPy allocations, since tracing
+    slows down the pure-Python parts several times over. The matrix is
+    detached afterwards so the pool's long-lived workers do not keep it.
+    """
+    try:
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        result = _solve(spec, points, metric, algorithm, options)
+        result['wall_time'] = time.perf_counter() - wall_start
+        result['cpu_time'] = time.process_time() - cpu_start
+        result['peak_memory'] = None
+        if measure_memory and 'error' not in result:
+            tracemalloc.start()
+            try:
+                _solve(spec, points, metric, algorithm, options)
+                result['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return result
+    finally:
+        detach_shared(spec)
+
+
+def compare_algorithms(points: List[List[float]], algorithms: Dict[str, Dict],
+                       metric: str = 'euclidean', dtype: str = 'float64',
+                       executor: Optional[Executor] = None, measure_memory: bool = False) -> Dict:
+    """
+    Run several algorithms on one instance in parallel.
+
+    The distance matrix is built once in the calling process and published
+    to the workers through shared memory, so every algorithm solves against
+    the same matrix and none of them pays for building it.
+
+    With ``measure_memory`` every algorithm is solved a second time under
+    tracemalloc for its peak memory, so the timings stay untraced. That
+    doubles the work, and algorithms without a fixed seed may take a
+    different route in the traced run, so it is off by default.
+
+    Args:
+        points: Instance coordinates
+        algorithms: API algorithm name -> TSPSolver.solve() keyword options
+        metric: Distance metric for the shared matrix (and for COORDINATE_ALGORITHMS)
+        dtype: Storage type of the shared matrix
+        executor: Process pool to run on (default: a temporary pool)
+        measure_memory: Record peak memory with tracemalloc (a second, traced solve)
+
+    Returns:
+        Dict with 'matrix_time' (seconds to build the matrix) and 'results':
+        algorithm name -> solve() result plus 'wall_time', 'cpu_time' and
+        'peak_memory' (bytes, None unless measured), or 'error'
+    """
+    start_time = time.perf_counter()
+    matrix = TSPSolver(points, metric=metric, dtype=dtype, max_matrix_points=None).distance_matrix
+    matrix_time = time.perf_counter() - start_time
+
+    own_pool = executor is None
+    if own_pool:
+        executor = ProcessPoolExecutor(max_workers=len(algorithms))
+    try:
+        with SharedArray(matrix) as shared:
+            futures = {name: executor.submit(_run_algorithm, shared.spec, points, metric, name, options,
+                                             measure_memory)
+                       for name, options in algorithms.items()}
+            results = {name: future.result() for name, future in futures.items()}
+    finally:
+        if own_pool:
+            executor.shutdown()
+    return {'matrix_time': matrix_time, 'results': results}
@@ -0,0 +1,296 @@
+import numpy as np
+from typing import List, Optional, Tuple
+from distance_engine import DistanceEngine
+from spatial_index import hilbert_order
+
+# Matching candidates: every point is linked to the next CURVE_WINDOW points
+# along each of several Hilbert curves. The extra curves are drawn on the plane
+# wrapped around by the given fractions of its extent, so points that one curve
+# separates at a quadrant border are close on another.
+CURVE_WINDOW = 3
+CURVE_SHIFTS = ((0.0, 0.0), (0.5, 0.5), (0.25, 0.75))
+
+# Grid resolution of the candidate curves; ties inside a cell only reorder close points
+CURVE_BITS = 12
+
+
+def curve_edges(points: np.ndarray, window: int = CURVE_WINDOW,
+                shifts=CURVE_SHIFTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse candidate edges between points that are close along shifted Hilbert curves.
+
+    A cheap stand-in for k-nearest-neighbor lists: a few vectorized curve
+    orders instead of a k-d tree query per point. The consecutive pairs of
+    the first curve form a path through every point, so the candidate graph
+    is always connected.
+
+    Args:
+        points: (n, 2) array of coordinates
+        window: Points after each point on a curve that it is linked to
+        shifts: (x, y) wrap-around offsets of the curves, as fractions of the extent
+
+    Returns:
+        Tuple of (i, j) int64 arrays with i < j, without duplicates
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(points)
+    if n < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    low = points.min(axis=0)
+    span = float((points.max(axis=0) - low).max()) or 1.0
+    keys = []
+    for sx, sy in shifts:
+        if sx or sy:
+            shifted = np.mod(points - low + np.array([sx, sy]) * span, span)
+        else:
+            shifted = points
+        order = hilbert_order(shifted, CURVE_BITS)
+        for offset in range(1, min(window, n - 1) + 1):
+            a, b = order[:-offset], order[offset:]
+            keys.append(np.minimum(a, b) * n + np.maximum(a, b))
+    keys = np.unique(np.concatenate(keys))
+    return keys // n, keys % n
+
+
+def spanning_tree(n: int, i: np.ndarray, j: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum spanning forest of a sparse graph (Boruvka's algorithm, vectorized).
+
+    Every round each component takes its cheapest edge to another
+    component and the components are merged by pointer jumping, so there
+    are O(log n) rounds of whole-array NumPy operations. Ties are broken
+    by edge position after a stable sort by weight, which keeps the chosen
+    edges free of cycles.
+
+    Args:
+        n: Number of vertices
+        i, j: Edge endpoints
+        weights: Edge weights
+
+    Returns:
+        Tuple of (i, j) arrays of the tree edges (n - 1 of them when the graph is connected)
+    """
+    order = np.argsort(weights, kind='stable')
+    i, j = np.asarray(i)[order], np.asarray(j)[order]
+    component = np.arange(n)
+    tree_i, tree_j = [], []
+    while len(i):
+        ci, cj = component[i], component[j]
+        cross = ci != cj
+        i, j, ci, cj = i[cross], j[cross], ci[cross], cj[cross]
+        if not len(i):
+            break
+        # The edges are sorted, so a component's cheapest edge is its first appearance
+        position = np.arange(len(i))
+        first = np.full(n, len(i))
+        np.minimum.at(first, ci, position)
+        np.minimum.at(first, cj, position)
+        components = np.flatnonzero(first < len(i))
+        edge = first[components]
+        other = np.where(ci[edge] == components, cj[edge], ci[edge])
+        chosen = np.unique(edge)
+        tree_i.append(i[chosen])
+        tree_j.append(j[chosen])
+
+        # Hook every component onto the one across its edge; of two components
+        # that chose each other, the smaller id becomes the root
+        parent = np.arange(n)
+        parent[components] = other
+        root = (parent[other] == components) & (components < other)
+        parent[components[root]] = components[root]
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        component = parent[component]
+    if not tree_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(tree_i), np.concatenate(tree_j)
+
+
+def _adjacency(n: int, i: np.ndarray, j: np.ndarray) -> Tuple[List[int], List[int], List[int]]:
+    """CSR adjacency of an undirected multigraph: (offsets, neighbor, edge id) as Python lists."""
+    heads = np.concatenate([i, j])
+    tails = np.concatenate([j, i])
+    edge_ids = np.concatenate([np.arange(len(i)), np.arange(len(i))])
+    order = np.argsort(heads, kind='stable')
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(heads, minlength=n))])
+    return offsets.tolist(), tails[order].tolist(), edge_ids[order].tolist()
+
+
+def double_tree_tour(n: int, tree_i: np.ndarray, tree_j: np.ndarray, start: int = 0) -> List[int]:
+    """
+    Visiting order of a depth-first walk around a spanning tree.
+
+    Walking every tree edge twice and skipping the cities already visited
+    is the preorder, at most twice the tree's weight under a metric.
+    """
+    offsets, neighbors, _ = _adjacency(n, tree_i, tree_j)
+    seen = [False] * n
+    tour = []
+    stack = [start]
+    while stack:
+        city = stack.pop()
+        if seen[city]:
+            continue
+        seen[city] = True
+        tour.append(city)
+        stack.extend(neighbors[offsets[city]:offsets[city + 1]])
+    return tour
+
+
+def greedy_matching(points: np.ndarray, ids: np.ndarray, engine: DistanceEngine,
+                    candidates: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Perfect matching of an even set of points, shortest candidate edges first.
+
+    Candidates are the curve edges among the points plus any given ones;
+    whatever they leave unmatched is paired off along a Hilbert curve.
+
+    Args:
+        points: (n, 2) array of all coordinates
+        ids: Point indices to match (even count)
+        engine: Distance engine for the edge weights
+        candidates: Extra (i, j) edges between points of `ids`
+
+    Returns:
+        Tuple of (a, b) arrays of matched point indices
+    """
+    a, b = curve_edges(points[ids])
+    a, b = ids[a], ids[b]
+    if candidates is not None:
+        a, b = np.concatenate([a, candidates[0]]), np.concatenate([b, candidates[1]])
+    order = np.argsort(engine.pairs(a, b), kind='stable')
+    matched = np.zeros(len(points), dtype=bool).tolist()
+    pairs_a, pairs_b = [], []
+    for x, y in zip(a[order].tolist(), b[order].tolist()):
+        if not matched[x] and not matched[y]:
+            matched[x] = matched[y] = True
+            pairs_a.append(x)
+            pairs_b.append(y)
+    left = ids[~np.asarray(matched, dtype=bool)[ids]]
+    left = left[hilbert_order(points[left])]
+    pairs_a.extend(left[0::2].tolist())
+    pairs_b.extend(left[1::2].tolist())
+    return np.asarray(pairs_a, dtype=np.intp), np.asarray(pairs_b, dtype=np.intp)
+
+
+def euler_tour(n: int, i: np.ndarray, j: np.ndarray, start: int = 0) -> List[int]:
+    """
+    Visiting order from an Eulerian circuit of a connected multigraph with even degrees.
+
+    The circuit is found with Hierholzer's algorithm and shortcut to the
+    first visit of every vertex.
+    """
+    offsets, neighbors, edge_ids = _adjacency(n, i, j)
+    used = [False] * len(i)
+    cursor = offsets[:-1]
+    stack = [start]
+    circuit = []
+    while stack:
+        city = stack[-1]
+        p, end = cursor[city], offsets[city + 1]
+        while p < end and used[edge_ids[p]]:
+            p += 1
+        if p == end:
+            cursor[city] = p
+            circuit.append(stack.pop())
+        else:
+            used[edge_ids[p]] = True
+            cursor[city] = p + 1
+            stack.append(neighbors[p])
+    circuit = np.asarray(circuit, dtype=np.intp)
+    _, first = np.unique(circuit, return_index=True)
+    return circuit[np.sort(first)].tolist()
+
+
+def insertion_tour(engine: DistanceEngine, farthest: bool = True, start: int = 0) -> List[int]:
+    """
+    Farthest or cheapest insertion, one distance row per step.
+
+    The tour is a successor array with the length of every city's outgoing
+    edge, so each step is a handful of whole-array NumPy operations:
+    O(n) memory, O(n^2) time with no per-city Python loop.
+
+    - farthest: insert the city farthest from the tour at its cheapest
+      position. Starts from `start` and the city farthest from it.
+    - cheapest: insert the city with the cheapest insertion anywhere.
+      Every outside city keeps the cost of its best edge. When that edge
+      is replaced the cost is kept as a lower bound and the city is only
+      re-scanned against the whole tour if it comes up as the cheapest.
+
+    Returns:
+        Open visiting order starting at `start`
+    """
+    n = engine.n
+    if n < 3:
+        return list(range(start, n)) + list(range(start))
+    succ = np.zeros(n, dtype=np.intp)
+    edge = np.zeros(n)                      # edge[c] = d(c, succ[c])
+    members = np.zeros(n, dtype=np.intp)
+    inside = np.zeros(n, dtype=bool)
+    from_start = np.asarray(engine.row(start), dtype=np.float64)
+    masked = from_start.copy()
+    masked[start] = -np.inf if farthest else np.inf
+    second = int(np.argmax(masked) if farthest else np.argmin(masked))
+    from_second = np.asarray(engine.row(second), dtype=np.float64)
+    succ[start], succ[second] = second, start
+    edge[start] = edge[second] = from_start[second]
+    members[:2] = start, second
+    inside[[start, second]] = True
+
+    if farthest:
+        gap = np.minimum(from_start, from_second)
+        gap[inside] = -1.0
+    else:
+        cost = from_start + from_second - edge[start]
+        cost[inside] = np.inf
+        best_edge = np.full(n, start, dtype=np.intp)
+        stale = np.zeros(n, dtype=bool)
+
+    for t in range(2, n):
+        tour = members[:t]
+        if farthest:
+            city = int(np.argmax(gap))
+            to_city = np.asarray(engine.row(city), dtype=np.float64)
+            a = int(tour[np.argmin(to_city[tour] + to_city[succ[tour]] - edge[tour])])
+        else:
+            while True:
+                city = int(np.argmin(cost))
+                to_city = np.asarray(engine.row(city), dtype=np.float64)
+                if not stale[city]:
+                    break
+                insertion = to_city[tour] + to_city[succ[tour]] - edge[tour]
+                best = int(np.argmin(insertion))
+                cost[city], best_edge[city], stale[city] = insertion[best], tour[best], False
+            a = int(best_edge[city])
+        b = int(succ[a])
+        succ[a], succ[city] = city, b
+        edge[a], edge[city] = to_city[a], to_city[b]
+        members[t] = city
+        inside[city] = True
+
+        if farthest:
+            np.minimum(gap, to_city, out=gap)
+            gap[city] = -1.0
+            continue
+        # Edge a -> b is gone; a -> city and city -> b are new
+        stale |= best_edge == a
+        from_a = np.asarray(engine.row(a), dtype=np.float64)
+        from_b = np.asarray(engine.row(b), dtype=np.float64)
+        via_a = from_a + to_city - edge[a]
+        via_city = to_city + from_b - edge[city]
+        candidate = np.minimum(via_a, via_city)
+        better = (candidate < cost) & ~inside
+        cost[better] = candidate[better]
+        best_edge[better] = np.where(via_a[better] <= via_city[better], a, city)
+        cost[city] = np.inf
+
+    order = [start]
+    city = int(succ[start])
+    succ = succ.tolist()
+    while city != start:
+        order.append(city)
+        city = succ[city]
+    return order
@@ -0,0 +1,373 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from distance_engine import METRICS, _SCALAR_METRICS
+from local_search import LocalSearch
+from spatial_index import KDTree, hilbert_order
+
+PARTITIONS = ('hilbert', 'kmeans')
+
+# Points per cluster; small enough for a cluster's full distance matrix (8 MB at 1000)
+CLUSTER_SIZE = 1000
+
+# Largest cluster size accepted (the matrix size at which TSPSolver stops building one)
+MAX_CLUSTER_SIZE = 4000
+
+# Lloyd iterations for k-means partitions (started from Hilbert buckets, so few are needed)
+KMEANS_ITERATIONS = 8
+
+# Rows per k-means assignment block
+KMEANS_BLOCK = 8192
+
+# Neighbor list size for the stitching repair
+REPAIR_NEIGHBORS = 8
+
+# Length of the edge that closes a repair window; no local search move may drop it
+_PINNED = 1e18
+
+# Cluster tasks per worker process, so faster workers pick up more of the clusters
+TASKS_PER_WORKER = 4
+
+# Cluster solver: solve_cluster(points, metric, algorithm, improve, time_limit, ends) -> cyclic
+# visiting order; with ends = (entry, exit) the solver should keep the two adjacent
+ClusterSolver = Callable[[np.ndarray, str, str, object, Optional[float], Optional[Tuple[int, int]]], List[int]]
+
+
+def partition(points: np.ndarray, cluster_size: int = CLUSTER_SIZE, method: str = 'hilbert') -> List[np.ndarray]:
+    """
+    Split points into spatially compact clusters of about `cluster_size`.
+
+    - hilbert: consecutive runs of the Hilbert curve order. O(n log n) and
+      perfectly balanced.
+    - kmeans: Lloyd's algorithm on squared Euclidean distance, seeded with
+      the Hilbert buckets' centroids. Clusters follow gaps in the layout
+      (aisles, zones) more closely; any cluster that grows past twice the
+      target size is cut into Hilbert runs again.
+
+    Returns:
+        List of point index arrays, one per non-empty cluster
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    n = len(points)
+    cluster_size = max(2, int(cluster_size))
+    if cluster_size > MAX_CLUSTER_SIZE:
+        raise ValueError(f'cluster_size must be at most {MAX_CLUSTER_SIZE} (got {cluster_size})')
+    if method not in PARTITIONS:
+        raise ValueError(f'Unknown partition: {method}')
+    order = hilbert_order(points)
+    buckets = np.array_split(order, max(1, math.ceil(n / cluster_size)))
+    if method == 'hilbert' or len(buckets) == 1:
+        return buckets
+
+    centroids = np.array([points[bucket].mean(axis=0) for bucket in buckets])
+    labels = np.empty(n, dtype=np.intp)
+    for _ in range(KMEANS_ITERATIONS):
+        squared = (centroids ** 2).sum(axis=1)
+        for start in range(0, n, KMEANS_BLOCK):
+            block = points[start:start + KMEANS_BLOCK]
+            # |p - c|^2 up to the per-row constant |p|^2
+            labels[start:start + KMEANS_BLOCK] = np.argmin(squared - 2.0 * block @ centroids.T, axis=1)
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+    clusters = []
+    members = np.argsort(labels, kind='stable')
+    bounds = np.cumsum(np.bincount(labels, minlength=len(centroids)))[:-1]
+    for cluster in np.split(members, bounds):
+        if len(cluster) > min(2 * cluster_size, MAX_CLUSTER_SIZE):
+            cluster = cluster[hilbert_order(points[cluster])]
+            clusters.extend(np.array_split(cluster, math.ceil(len(cluster) / cluster_size)))
+        elif len(cluster):
+            clusters.append(cluster)
+    return clusters
+
+
+def _solve_clusters(solve_cluster: ClusterSolver, chunks: List[np.ndarray], ends: List[Optional[Tuple[int, int]]],
+                    metric: str, algorithm: str, improve, wall_deadline: Optional[float],
+                    should_stop: Optional[Callable[[], bool]] = None) -> List[List[int]]:
+    """
+    Worker task: cyclic visiting orders (local indices) for a few clusters.
+
+    The clusters share what is left until `wall_deadline` (time.time()) evenly.
+    Once stopped, the remaining clusters keep their input order.
+    """
+    tours = []
+    for i, chunk in enumerate(chunks):
+        if should_stop is not None and should_stop():
+            tours.extend(list(range(len(c))) for c in chunks[i:])
+            break
+        time_limit = None
+        if wall_deadline is not None:
+            time_limit = max(0.0, wall_deadline - time.time()) / (len(chunks) - i)
+        tours.append(solve_cluster(chunk, metric, algorithm, improve, time_limit, ends[i]))
+    return tours
+
+
+def _link_points(points: np.ndarray, metric: str, a: np.ndarray, b: np.ndarray,
+                 toward: np.ndarray) -> Tuple[int, int]:
+    """
+    Close pair of points joining cluster a to cluster b (indices into a and b).
+
+    Starts from a's point nearest b's centroid and alternates nearest-point
+    lookups twice; exact closest pairs are not worth an |a| x |b| block.
+    """
+    distance = METRICS[metric]
+    i = int(np.argmin(distance(points[a], toward)))
+    j = int(np.argmin(distance(points[b], points[a[i]])))
+    i = int(np.argmin(distance(points[a], points[b[j]])))
+    return i, j
+
+
+def _cluster_ends(points: np.ndarray, metric: str, clusters: List[np.ndarray], order: List[int],
+                  centroids: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Entry and exit point (local indices) of every cluster for the given cluster order.
+
+    Consecutive clusters are linked through a close pair of points. A
+    cluster whose entry and exit would coincide exits through its point
+    nearest the next cluster's link point instead.
+    """
+    k = len(order)
+    exits, entries = [0] * len(clusters), [0] * len(clusters)
+    for position, c in enumerate(order):
+        following = order[(position + 1) % k]
+        exits[c], entries[following] = _link_points(points, metric, clusters[c], clusters[following],
+                                                    centroids[following])
+    distance = METRICS[metric]
+    for position, c in enumerate(order):
+        members = clusters[c]
+        if entries[c] == exits[c] and len(members) > 1:
+            following = order[(position + 1) % k]
+            target = points[clusters[following][entries[following]]]
+            ranked = np.argsort(distance(points[members], target))
+            exits[c] = int(ranked[1] if ranked[0] == entries[c] else ranked[0])
+    return list(zip(entries, exits))
+
+
+def _open_cycle(cycle: Sequence[int], entry: int, exit: int) -> Optional[List[int]]:
+    """The cycle as a path from entry to exit, or None if the two are not adjacent on it."""
+    m = len(cycle)
+    if m < 2 or entry == exit:
+        return list(cycle) if m == 1 else None
+    i = list(cycle).index(entry)
+    if cycle[i - 1] == exit:
+        return [cycle[(i + j) % m] for j in range(m)]
+    if cycle[(i + 1) % m] == exit:
+        return [cycle[(i - j) % m] for j in range(m)]
+    return None
+
+
+def _cut_cycle(cycle: np.ndarray, points: np.ndarray, metric: str,
+               enter_from: np.ndarray, leave_to: np.ndarray) -> np.ndarray:
+    """
+    Open a cluster's cycle into a path between its neighbors in the cluster order.
+
+    Every edge (a, b) of the cycle is a candidate cut, walked either way;
+    the one chosen minimizes d(enter_from, first) - d(a, b) + d(last, leave_to).
+    """
+    m = len(cycle)
+    if m < 3:
+        return cycle
+    distance = METRICS[metric]
+    a, b = cycle, np.roll(cycle, -1)
+    edge = distance(points[a], points[b])
+    forward = distance(enter_from, points[b]) - edge + distance(points[a], leave_to)
+    backward = distance(enter_from, points[a]) - edge + distance(points[b], leave_to)
+    j = int(np.argmin(np.minimum(forward, backward)))
+    if forward[j] <= backward[j]:
+        return np.roll(cycle, -(j + 1))          # b[j] ... a[j]
+    return np.roll(cycle[::-1], -(m - 1 - j))    # a[j] ... b[j]
+
+
+def _seam_phases(k: int) -> List[List[int]]:
+    """
+    Seams (seam s joins path s to path s + 1, cyclically) grouped so the
+    windows of one group share no path and can be repaired in parallel.
+    """
+    if k < 2:
+        return []
+    if k == 2:
+        return [[0]]
+    last = k - 1 if k % 2 else k
+    phases = [list(range(0, last, 2)), list(range(1, last, 2))]
+    if k % 2:
+        phases.append([k - 1])
+    return phases
+
+
+def _repair_window(coords: np.ndarray, metric: str, split: int,
+                   wall_deadline: Optional[float]) -> Tuple[np.ndarray, int]:
+    """
+    Worker task: 2-opt / Or-opt repair of the seam in a window of two joined paths.
+
+    The window is closed into a cycle by a pinned edge between its first
+    and last city, with a huge negative length so no move removes it; the
+    ends therefore stay where they are and the window slots back into the
+    tour. Only cities with a neighbor across the seam start active, and
+    every reversal is bounded by the window size.
+
+    Args:
+        coords: Window cities in path order
+        metric: Built-in metric name
+        split: Position of the first city of the second path
+        wall_deadline: time.time() value at which to stop
+
+    Returns:
+        Tuple of (new path order as positions into coords, active cities)
+    """
+    m = len(coords)
+    if m < 5:
+        return np.arange(m), 0
+    neighbors, _ = KDTree(coords, metric).k_nearest(REPAIR_NEIGHBORS)
+    side = np.arange(m) >= split
+    active = set(np.flatnonzero((side[neighbors] != side[:, None]).any(axis=1)).tolist())
+    active.update((split - 1, split))
+
+    xs, ys = coords[:, 0].tolist(), coords[:, 1].tolist()
+    scalar, last = _SCALAR_METRICS[metric], m - 1
+
+    def distance(i: int, j: int) -> float:
+        if (i == 0 and j == last) or (i == last and j == 0):
+            return -_PINNED
+        return scalar(xs[i], ys[i], xs[j], ys[j])
+
+    deadline = None if wall_deadline is None else time.perf_counter() + (wall_deadline - time.time())
+    cycle = LocalSearch(range(m), distance, neighbors.tolist()).run(active=sorted(active), deadline=deadline)
+    return np.asarray(_open_cycle(cycle, 0, last), dtype=np.intp), len(active)
+
+
+def decompose(points: np.ndarray, solve_cluster: ClusterSolver, metric: str = 'euclidean',
+              cluster_size: int = CLUSTER_SIZE, method: str = 'hilbert', algorithm: str = 'greedy',
+              improve='or_opt', workers: int = 1, deadline: Optional[float] = None,
+              should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[int], Dict]:
+    """
+    Cluster-first, route-second tour for very large instances.
+
+    1. Partition the points (see partition()) and order the clusters with
+       a small tour over their centroids. Consecutive clusters are linked
+       through a close pair of points, which fixes every cluster's entry
+       and exit.
+    2. Solve every cluster independently with an existing algorithm, on
+       `workers` processes, as a path from its entry to its exit. Only the
+       cluster's coordinates travel to the worker, and its distance matrix
+       is cluster-sized, so memory stays O(n + workers * cluster_size^2).
+    3. Chain the paths in cluster order.
+    4. Repair the seams: 2-opt and Or-opt inside a window of the two
+       clusters each seam joins, with only the cities near the seam active.
+       Windows that share no cluster run in parallel. The interiors are
+       already locally optimal, so the repair touches a small part of the
+       tour, and no move ever reverses more than two clusters' worth.
+
+    Args:
+        points: (n, 2) array of coordinates
+        solve_cluster: Picklable solve_cluster(points, metric, algorithm,
+                       improve, time_limit, ends) returning a cyclic order
+                       that keeps ends = (entry, exit) adjacent if it can
+        metric: Built-in metric name
+        cluster_size: Target points per cluster (at most MAX_CLUSTER_SIZE)
+        method: 'hilbert' or 'kmeans'
+        algorithm: Algorithm for the clusters (key of tsp_heuristics.ALGORITHMS)
+        improve: Local-search option for the clusters
+        workers: Worker processes for the clusters and the repair (1 = this process)
+        deadline: time.perf_counter() value by which to return
+        should_stop: Cancellation check, polled between clusters and between repair phases
+
+    Returns:
+        Tuple of (open tour over all points, info dict with 'clusters',
+        'partition', 'boundary_cities' (seam cities repaired) and stage timings)
+    """
+    if metric not in METRICS:
+        raise ValueError(f'Decomposition needs a built-in coordinate metric (got {metric})')
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    timings = {}
+    stage_start = time.perf_counter()
+    clusters = partition(points, cluster_size, method)
+    centroids = np.array([points[cluster].mean(axis=0) for cluster in clusters])
+    if len(clusters) > 3:
+        cluster_order = solve_cluster(centroids, metric, 'greedy', 'or_opt', None, None)
+    else:
+        cluster_order = list(range(len(clusters)))
+    if len(clusters) > 1:
+        ends = _cluster_ends(points, metric, clusters, cluster_order, centroids)
+    else:
+        ends = [None]
+    timings['partition_time'] = time.perf_counter() - stage_start
+
+    # Solve the clusters; the deadline crosses process boundaries as wall-clock time
+    stage_start = time.perf_counter()
+    wall_deadline = None if deadline is None else time.time() + (deadline - stage_start)
+    chunks = [points[cluster] for cluster in clusters]
+    workers = max(1, min(int(workers), len(chunks)))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if pool is None:
+            local_tours = _solve_clusters(solve_cluster, chunks, ends, metric, algorithm, improve,
+                                          wall_deadline, should_stop)
+        else:
+            per_task = max(1, math.ceil(len(chunks) / (workers * TASKS_PER_WORKER)))
+            starts = range(0, len(chunks), per_task)
+            rounds = math.ceil(len(starts) / workers)
+            now = time.time()
+            # Tasks run about `workers` at a time; each round gets an equal slice of the time left
+            futures = [pool.submit(_solve_clusters, solve_cluster, chunks[i:i + per_task], ends[i:i + per_task],
+                                   metric, algorithm, improve,
+                                   None if wall_deadline is None else
+                                   now + (wall_deadline - now) * (task // workers + 1) / rounds)
+                       for task, i in enumerate(starts)]
+            local_tours = []
+            for future, i in zip(futures, starts):
+                if should_stop is not None and should_stop():
+                    for pending in futures:
+                        pending.cancel()
+                if future.cancelled():
+                    local_tours.extend(list(range(len(chunk))) for chunk in chunks[i:i + per_task])
+                else:
+                    local_tours.extend(future.result())
+        timings['cluster_time'] = time.perf_counter() - stage_start
+
+        # Chain the clusters' paths; a cycle that lost its entry-exit edge is cut where it joins best
+        paths: List[np.ndarray] = []
+        for position, c in enumerate(cluster_order):
+            path = local_tours[c] if ends[c] is None else _open_cycle(local_tours[c], *ends[c])
+            if path is None:
+                enter_from = points[paths[-1][-1]] if paths else centroids[cluster_order[-1]]
+                leave_to = centroids[cluster_order[(position + 1) % len(cluster_order)]]
+                paths.append(_cut_cycle(clusters[c][np.asarray(local_tours[c], dtype=np.intp)],
+                                        points, metric, enter_from, leave_to))
+            else:
+                paths.append(clusters[c][np.asarray(path, dtype=np.intp)])
+        tour = np.concatenate(paths)
+
+        # Repair each seam inside a window of the two clusters it joins
+        stage_start = time.perf_counter()
+        bounds = np.concatenate([[0], np.cumsum([len(path) for path in paths])])
+        k = len(paths)
+        boundary = 0
+        for phase in _seam_phases(k):
+            if (should_stop is not None and should_stop()) or (deadline is not None and time.perf_counter() >= deadline):
+                break
+            windows = [np.concatenate([np.arange(bounds[s], bounds[s + 1]),
+                                       np.arange(bounds[(s + 1) % k], bounds[(s + 1) % k + 1])])
+                       for s in phase]
+            args = [(points[tour[window]], metric, int(bounds[s + 1] - bounds[s]), wall_deadline)
+                    for s, window in zip(phase, windows)]
+            if pool is None:
+                repaired = [_repair_window(*arg) for arg in args]
+            else:
+                repaired = list(pool.map(_repair_window, *zip(*args)))
+            for window, (order, active) in zip(windows, repaired):
+                tour[window] = tour[window][order]
+                boundary += active
+        timings['repair_time'] = time.perf_counter() - stage_start
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    info = {'clusters': len(clusters), 'partition': method, 'boundary_cities': boundary}
+    info.update(timings)
+    return tour.tolist(), info
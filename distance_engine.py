@@ -0,0 +1,186 @@
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+# A metric takes two coordinate arrays that broadcast against each other
+# (shape (..., 2)) and returns the distances along the last axis.
+MetricFunction = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def _euclidean(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    diff = a - b
+    return np.sqrt(np.einsum('...k,...k->...', diff, diff))
+
+
+def _manhattan(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.abs(a - b).sum(axis=-1)
+
+
+def _chebyshev(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.abs(a - b).max(axis=-1)
+
+
+METRICS: Dict[str, MetricFunction] = {
+    'euclidean': _euclidean,
+    'manhattan': _manhattan,   # aisle travel: robots move along x then y
+    'chebyshev': _chebyshev,
+}
+
+# Scalar versions for pure-Python inner loops (local search etc.)
+_SCALAR_METRICS = {
+    'euclidean': lambda ax, ay, bx, by: math.hypot(ax - bx, ay - by),
+    'manhattan': lambda ax, ay, bx, by: abs(ax - bx) + abs(ay - by),
+    'chebyshev': lambda ax, ay, bx, by: max(abs(ax - bx), abs(ay - by)),
+}
+
+
+class DistanceEngine:
+    """
+    Distance provider shared by every TSP algorithm.
+
+    Small instances get a full n x n matrix computed with NumPy broadcasting,
+    one block of rows at a time so the temporary (block, n, 2) difference
+    array stays bounded. Above ``max_matrix_points`` no matrix is built and
+    distances are computed on demand from the coordinates instead, which keeps
+    memory at O(n).
+    """
+
+    def __init__(self, points: Union[np.ndarray, List[List[float]]],
+                 metric: Union[str, MetricFunction] = 'euclidean',
+                 dtype: Union[str, np.dtype] = np.float64,
+                 block_size: int = 1024,
+                 max_matrix_points: Optional[int] = 4000,
+                 matrix: Optional[np.ndarray] = None):
+        """
+        Args:
+            points: (n, 2) array of coordinates
+            metric: 'euclidean', 'manhattan', 'chebyshev' or a callable
+                    metric(a, b) that broadcasts over the last axis
+            dtype: Storage type for distances (float64 or float32)
+            block_size: Rows computed per broadcasting block
+            max_matrix_points: Largest n for which the full matrix is built
+                               eagerly; None always builds it
+            matrix: Precomputed distance matrix to use instead of the metric
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.n = len(self.points)
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype(np.float32), np.dtype(np.float64)):
+            raise ValueError(f"Unsupported distance dtype: {self.dtype}")
+        self.block_size = max(1, int(block_size))
+
+        if callable(metric):
+            self.metric_name = getattr(metric, '__name__', 'custom')
+            self._metric = metric
+        elif metric in METRICS:
+            self.metric_name = metric
+            self._metric = METRICS[metric]
+        else:
+            raise ValueError(f"Unknown distance metric: {metric}")
+
+        self.matrix: Optional[np.ndarray] = None
+        # Seconds spent building the matrix (None until this engine builds one)
+        self.build_time: Optional[float] = None
+        self.external_matrix = matrix is not None
+        if matrix is not None:
+            matrix = np.asarray(matrix)
+            if matrix.shape != (self.n, self.n):
+                raise ValueError("Distance matrix shape does not match the number of points")
+            self.matrix = matrix.astype(self.dtype, copy=False)
+        elif max_matrix_points is None or self.n <= max_matrix_points:
+            self.materialize()
+
+    @property
+    def is_materialized(self) -> bool:
+        """True when a full distance matrix is held in memory."""
+        return self.matrix is not None
+
+    @property
+    def has_coordinate_metric(self) -> bool:
+        """True when distances follow one of the built-in coordinate metrics."""
+        if self.external_matrix:
+            return False
+        return self.metric_name in METRICS and self._metric is METRICS[self.metric_name]
+
+    def matrix_nbytes(self) -> int:
+        """Memory the full matrix needs (or uses) at the configured dtype."""
+        return self.n * self.n * self.dtype.itemsize
+
+    def materialize(self) -> np.ndarray:
+        """Build (if needed) and return the full distance matrix."""
+        if self.matrix is None:
+            start_time = time.perf_counter()
+            matrix = np.empty((self.n, self.n), dtype=self.dtype)
+            for start in range(0, self.n, self.block_size):
+                stop = min(start + self.block_size, self.n)
+                matrix[start:stop] = self._compute(self.points[start:stop, None, :],
+                                                   self.points[None, :, :])
+            np.fill_diagonal(matrix, 0.0)
+            self.matrix = matrix
+            self.build_time = time.perf_counter() - start_time
+        return self.matrix
+
+    def _compute(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        return np.asarray(self._metric(a, b), dtype=self.dtype)
+
+    def pair(self, i: int, j: int) -> float:
+        """Distance between point i and point j."""
+        if self.matrix is not None:
+            return float(self.matrix[i, j])
+        return float(self._compute(self.points[i], self.points[j]))
+
+    def pairs(self, a: Union[np.ndarray, Sequence[int]], b: Union[np.ndarray, Sequence[int]]) -> np.ndarray:
+        """Element-wise distances between index arrays a and b (any matching shape)."""
+        a = np.asarray(a, dtype=np.intp)
+        b = np.asarray(b, dtype=np.intp)
+        if self.matrix is not None:
+            return self.matrix[a, b]
+        return self._compute(self.points[a], self.points[b])
+
+    def row(self, i: int, cols: Optional[Union[np.ndarray, Sequence[int]]] = None) -> np.ndarray:
+        """Distances from point i to every point (or to the given columns)."""
+        if self.matrix is not None:
+            return self.matrix[i] if cols is None else self.matrix[i, cols]
+        targets = self.points if cols is None else self.points[np.asarray(cols, dtype=np.intp)]
+        return self._compute(self.points[i][None, :], targets)
+
+    def block(self, rows: Union[np.ndarray, Sequence[int]], cols: Optional[Union[np.ndarray, Sequence[int]]] = None) -> np.ndarray:
+        """Distance sub-matrix between the given rows and columns."""
+        rows = np.asarray(rows, dtype=np.intp)
+        if self.matrix is not None:
+            return self.matrix[rows] if cols is None else self.matrix[np.ix_(rows, np.asarray(cols, dtype=np.intp))]
+        targets = self.points if cols is None else self.points[np.asarray(cols, dtype=np.intp)]
+        return self._compute(self.points[rows][:, None, :], targets[None, :, :])
+
+    def tour_length(self, indices: Union[np.ndarray, Sequence[int]], closed: bool = False) -> float:
+        """
+        Length of a path through the given indices.
+
+        Args:
+            indices: Visiting order
+            closed: Also add the edge from the last index back to the first
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        if len(indices) < 2:
+            return 0.0
+        nxt = np.roll(indices, -1) if closed else indices[1:]
+        cur = indices if closed else indices[:-1]
+        return float(self.pairs(cur, nxt).sum(dtype=np.float64))
+
+    def scalar_function(self) -> Callable[[int, int], float]:
+        """
+        Fast scalar d(i, j) for pure-Python inner loops.
+
+        Works on plain Python lists to avoid NumPy scalar indexing overhead:
+        coordinates for the built-in metrics, matrix rows otherwise.
+        """
+        if self.has_coordinate_metric:
+            xs = self.points[:, 0].tolist()
+            ys = self.points[:, 1].tolist()
+            fn = _SCALAR_METRICS[self.metric_name]
+            return lambda i, j: fn(xs[i], ys[i], xs[j], ys[j])
+        if self.matrix is not None:
+            rows = self.matrix.tolist()
+            return lambda i, j: rows[i][j]
+        return self.pair
@@ -0,0 +1,155 @@
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Sequence, Tuple
+from grid_paths import Cell, _Grid, distance_map
+
+
+def maze_fingerprint(blocked: np.ndarray) -> str:
+    """Digest of an obstacle grid; changes whenever any cell changes."""
+    digest = hashlib.blake2b(np.packbits(blocked).tobytes(), digest_size=16)
+    digest.update(repr(blocked.shape).encode())
+    return digest.hexdigest()
+
+
+class DistanceOracle:
+    """
+    Grid-true travel distances between pick locations on saved mazes.
+
+    Every pick cell gets a distance field: the BFS (Dijkstra with diagonal
+    moves) distance from that cell to every cell of the maze. A pick list's
+    distance matrix is read off the fields of its cells, and the route
+    between two picks is recovered by walking downhill on the target's
+    field, so no extra search is needed to draw the path.
+
+    Fields are cached per maze id and reused by later pick lists on the same
+    maze, least recently used first out once `max_bytes` is reached. Each
+    maze id remembers the fingerprint of the grid its fields were built on;
+    when a request arrives with a different grid for the same id, the old
+    fields are dropped. Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: Approximate memory cap for cached distance fields
+        """
+        self.max_bytes = max_bytes
+        self._fields: 'OrderedDict[Tuple, np.ndarray]' = OrderedDict()
+        self._fingerprints: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, maze_id: Hashable) -> None:
+        """Forget everything computed for a maze."""
+        with self._lock:
+            self._fingerprints.pop(maze_id, None)
+            for key in [key for key in self._fields if key[0] == maze_id]:
+                self.nbytes -= self._fields.pop(key).nbytes
+
+    def _field(self, maze_id: Hashable, blocked: np.ndarray, cell: Cell, diagonal: bool) -> np.ndarray:
+        """Flat distance field from one cell (float32, inf where unreachable)."""
+        key = (maze_id, diagonal, cell)
+        with self._lock:
+            field = self._fields.get(key)
+            if field is not None:
+                self._fields.move_to_end(key)
+                self.hits += 1
+                return field
+            self.misses += 1
+
+        field = distance_map(blocked, [cell], diagonal).astype(np.float32).ravel()
+        with self._lock:
+            if key not in self._fields:
+                self._fields[key] = field
+                self.nbytes += field.nbytes
+                while self.nbytes > self.max_bytes and len(self._fields) > 1:
+                    self.nbytes -= self._fields.popitem(last=False)[1].nbytes
+        return field
+
+    def _check(self, maze_id: Hashable, blocked: np.ndarray) -> None:
+        fingerprint = maze_fingerprint(blocked)
+        if self._fingerprints.get(maze_id) != fingerprint:
+            self.invalidate(maze_id)
+            with self._lock:
+                self._fingerprints[maze_id] = fingerprint
+
+    def matrix(self, maze_id: Hashable, blocked: np.ndarray, cells: Sequence[Cell],
+               diagonal: bool = False) -> np.ndarray:
+        """
+        Travel distance matrix between pick cells.
+
+        Args:
+            maze_id: Key the fields are cached under
+            blocked: (height, width) bool grid, True = obstacle
+            cells: (x, y) pick cells
+            diagonal: Allow 8-connected moves
+
+        Returns:
+            (n, n) float64 matrix of shortest grid distances
+
+        Raises:
+            ValueError: A cell is blocked or outside the grid, or some picks
+                        cannot reach each other
+        """
+        self._check(maze_id, blocked)
+        grid = _Grid(blocked, diagonal)
+        cells = [(int(x), int(y)) for x, y in cells]
+        flat = np.array([grid.index(cell) for cell in cells], dtype=np.intp)
+        matrix = np.empty((len(cells), len(cells)))
+        for j, cell in enumerate(cells):
+            matrix[:, j] = self._field(maze_id, blocked, cell, diagonal)[flat]
+        if not np.isfinite(matrix).all():
+            cut_off = sorted({cells[i] for i in np.flatnonzero(~np.isfinite(matrix).all(axis=1))})
+            raise ValueError(f'Pick locations not connected to the others: {cut_off}')
+        return matrix
+
+    def path(self, maze_id: Hashable, blocked: np.ndarray, source: Cell, target: Cell,
+             diagonal: bool = False) -> List[Cell]:
+        """Shortest grid path from source to target, both included."""
+        target = (int(target[0]), int(target[1]))
+        field = self._field(maze_id, blocked, target, diagonal)
+        grid = _Grid(blocked, diagonal)
+        i, goal = grid.index(source), grid.index(target)
+        if not np.isfinite(field[i]):
+            raise ValueError(f'No path from {source} to {target}')
+        path = [i]
+        while i != goal:
+            # Steepest step downhill; on an exact distance field it stays on a shortest path
+            i = min(grid.neighbors(i), key=lambda move: field[move[0]] + move[1])[0]
+            path.append(i)
+        return [grid.cell(i) for i in path]
+
+    def route(self, maze_id: Hashable, blocked: np.ndarray, cells: Sequence[Cell], tour: Sequence[int],
+              diagonal: bool = False) -> List[Cell]:
+        """
+        Stitch the grid paths between consecutive stops of a tour.
+
+        Args:
+            cells: (x, y) pick cells
+            tour: Visiting order as indices into `cells` (closed or open)
+
+        Returns:
+            Every cell the robot passes, in order
+        """
+        stops = [(int(cells[i][0]), int(cells[i][1])) for i in tour]
+        route = [stops[0]]
+        for source, target in zip(stops, stops[1:]):
+            route.extend(self.path(maze_id, blocked, source, target, diagonal)[1:])
+        return route
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'mazes': len(self._fingerprints),
+                'fields': len(self._fields),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,204 @@
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional
+from parallel import SharedArray, SharedSpec, attach_shared, detach_shared, process_pool
+
+
+def random_population(n: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """(size, n) int32 matrix of random permutations."""
+    return rng.permuted(np.tile(np.arange(n, dtype=np.int32), (size, 1)), axis=1)
+
+
+def tour_lengths(population: np.ndarray, distance_matrix: np.ndarray) -> np.ndarray:
+    """Closed tour length of every row, as one gather-and-sum over the matrix."""
+    return distance_matrix[population, np.roll(population, -1, axis=1)].sum(axis=1, dtype=np.float64)
+
+
+def tournament_selection(lengths: np.ndarray, count: int, tournament_size: int,
+                         rng: np.random.Generator) -> np.ndarray:
+    """Indices of `count` winners, each the shortest of `tournament_size` random entrants."""
+    entrants = rng.integers(0, len(lengths), size=(count, min(tournament_size, len(lengths))))
+    winners = np.argmin(lengths[entrants], axis=1)
+    return entrants[np.arange(count), winners]
+
+
+def order_crossover(parents1: np.ndarray, parents2: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Batched order crossover (OX).
+
+    Each child copies a random slice [a, b) of its first parent, then fills
+    the remaining positions starting at b (wrapping around) with the other
+    cities in the order they appear in the second parent, also read from b.
+    """
+    count, n = parents1.shape
+    rows = np.arange(count)[:, None]
+    positions = np.arange(n)[None, :]
+    start = rng.integers(0, n - 1, size=count)[:, None]
+    end = rng.integers(start[:, 0] + 1, n, size=count)[:, None]
+
+    in_slice = (positions >= start) & (positions < end)
+    children = np.where(in_slice, parents1, -1).astype(np.int32)
+
+    # Which cities each child already has from the slice
+    taken = np.zeros((count, n), dtype=bool)
+    taken[np.nonzero(in_slice)[0], parents1[in_slice]] = True
+
+    # Second parent read from `end`, minus the cities already taken
+    rotated = np.take_along_axis(parents2, (end + positions) % n, axis=1)
+    keep = ~np.take_along_axis(taken, rotated, axis=1)
+    target = (end + np.cumsum(keep, axis=1) - 1) % n
+    children[np.broadcast_to(rows, keep.shape)[keep], target[keep]] = rotated[keep]
+    return children
+
+
+def swap_mutation(children: np.ndarray, rate: float, rng: np.random.Generator) -> None:
+    """Swap two random cities in each child with probability `rate` (in place)."""
+    count, n = children.shape
+    mutate = np.flatnonzero(rng.random(count) < rate)
+    if len(mutate) == 0:
+        return
+    i = rng.integers(0, n, size=len(mutate))
+    j = rng.integers(0, n, size=len(mutate))
+    swapped = children[mutate, i]
+    children[mutate, i] = children[mutate, j]
+    children[mutate, j] = swapped
+
+
+def evolve(population: np.ndarray, distance_matrix: np.ndarray, generations: int,
+           rng: np.random.Generator, mutation_rate: float = 0.02, tournament_size: int = 5,
+           elite_size: int = 2, lengths: Optional[np.ndarray] = None,
+           deadline: Optional[float] = None,
+           callback: Optional[Callable[[np.ndarray, float], None]] = None,
+           should_stop: Optional[Callable[[], bool]] = None):
+    """
+    Run the GA for a number of generations on an int32 population matrix.
+
+    Every generation is a fixed number of NumPy calls regardless of the
+    population size: one fitness gather, one batched tournament, one batched
+    OX and one batched mutation. The `elite_size` shortest tours are copied
+    into the next generation unchanged.
+
+    Evolution stops early once time.perf_counter() passes `deadline` or
+    `should_stop()` returns True; `callback(tour, length)` is called
+    whenever the best tour improves.
+
+    Returns:
+        Tuple of (final population, its tour lengths)
+    """
+    size, n = population.shape
+    if lengths is None:
+        lengths = tour_lengths(population, distance_matrix)
+    if n < 3:
+        return population, lengths
+    elite_size = min(elite_size, size)
+    best_length = float(lengths.min())
+    if callback is not None:
+        callback(population[int(np.argmin(lengths))], best_length)
+
+    for _ in range(generations):
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        if should_stop is not None and should_stop():
+            break
+        offspring = size - elite_size
+        parents1 = population[tournament_selection(lengths, offspring, tournament_size, rng)]
+        parents2 = population[tournament_selection(lengths, offspring, tournament_size, rng)]
+        children = order_crossover(parents1, parents2, rng)
+        swap_mutation(children, mutation_rate, rng)
+
+        elite = np.argsort(lengths)[:elite_size]
+        population = np.concatenate([population[elite], children])
+        lengths = np.concatenate([lengths[elite], tour_lengths(children, distance_matrix)])
+        if callback is not None and lengths.min() < best_length:
+            best = int(np.argmin(lengths))
+            best_length = float(lengths[best])
+            callback(population[best], best_length)
+    return population, lengths
+
+
+def _evolve_island(spec: SharedSpec, population: np.ndarray, lengths: np.ndarray, generations: int,
+                   rng: np.random.Generator, params: Dict, time_limit: Optional[float] = None):
+    """Worker task: evolve one island for one migration epoch (the pool is long-lived, so detach after)."""
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    try:
+        population, lengths = evolve(population, attach_shared(spec), generations, rng, lengths=lengths,
+                                     deadline=deadline, **params)
+    finally:
+        detach_shared(spec)
+    return population, lengths, rng
+
+
+def island_model(distance_matrix: np.ndarray, islands: int, population_size: int, generations: int,
+                 migration_interval: int = 50, migrants: int = 2, seed: Optional[int] = None,
+                 max_workers: Optional[int] = None, time_limit: Optional[float] = None,
+                 callback: Optional[Callable[[np.ndarray, float], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None, **params):
+    """
+    Island-model GA: independent populations evolve in worker processes and
+    exchange their best individuals every `migration_interval` generations.
+
+    The distance matrix is published once through shared memory; only the
+    small population matrices travel between processes. The islands run on
+    the long-lived parallel.process_pool() unless `max_workers` asks for a
+    pool of a given size. Migration follows a
+    ring: each island's best `migrants` tours replace the worst tours of the
+    next island. Every island gets its own generator spawned from `seed`.
+
+    Workers receive the remaining `time_limit` with every epoch, and
+    `callback(tour, length)` reports the best tour after each epoch that
+    improved it. `should_stop()` is checked between epochs.
+
+    Returns:
+        Tuple of (best tour as int array, its length)
+    """
+    n = len(distance_matrix)
+    seeds = np.random.SeedSequence(seed).spawn(islands)
+    rngs = [np.random.default_rng(s) for s in seeds]
+    populations = [random_population(n, population_size, rng) for rng in rngs]
+    lengths = [tour_lengths(p, distance_matrix) for p in populations]
+    migrants = min(migrants, population_size // 2)
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    best_length = np.inf
+
+    own_pool = max_workers is not None
+    pool = ProcessPoolExecutor(max_workers=min(islands, max_workers)) if own_pool else process_pool()
+    try:
+        with SharedArray(distance_matrix) as shared:
+            done = 0
+            while done < generations:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                if should_stop is not None and should_stop():
+                    break
+                epoch = min(migration_interval, generations - done)
+                futures = [pool.submit(_evolve_island, shared.spec, populations[i], lengths[i], epoch, rngs[i],
+                                       params, remaining)
+                           for i in range(islands)]
+                for i, future in enumerate(futures):
+                    populations[i], lengths[i], rngs[i] = future.result()
+                done += epoch
+
+                if callback is not None:
+                    winner = min(range(islands), key=lambda i: lengths[i].min())
+                    if lengths[winner].min() < best_length:
+                        best = int(np.argmin(lengths[winner]))
+                        best_length = float(lengths[winner][best])
+                        callback(populations[winner][best], best_length)
+
+                if migrants and done < generations:
+                    best = [populations[i][np.argsort(lengths[i])[:migrants]] for i in range(islands)]
+                    best_lengths = [np.sort(lengths[i])[:migrants] for i in range(islands)]
+                    for i in range(islands):
+                        source = (i - 1) % islands
+                        worst = np.argsort(lengths[i])[-migrants:]
+                        populations[i][worst] = best[source]
+                        lengths[i][worst] = best_lengths[source]
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    winner = min(range(islands), key=lambda i: lengths[i].min())
+    best = int(np.argmin(lengths[winner]))
+    return populations[winner][best], float(lengths[winner][best])
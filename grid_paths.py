@@ -0,0 +1,419 @@
+import heapq
+import math
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Cell = Tuple[int, int]   # (x, y)
+
+SQRT2 = math.sqrt(2.0)
+
+# Search algorithm -> (weight of g, weight of h) in the priority g * wg + h * wh
+GRID_ALGORITHMS = {
+    'astar': (1.0, 1.0),
+    'dijkstra': (1.0, 0.0),
+    'greedy': (0.0, 1.0),   # greedy best-first: fast, not optimal
+    'jps': (1.0, 1.0),      # jump point search (4-connected)
+}
+
+
+def occupancy_grid(maze) -> np.ndarray:
+    """
+    Convert a maze from one of the frontends into a boolean obstacle grid.
+
+    Accepted layouts:
+      - maze.html: maze[x][y] = {'wall': bool, ...}
+      - multi.html: grid[y][x] = 0 (blocked) / 1 (walkable) / 2 (node)
+      - grid[y][x] = True / False (wall flags)
+      - a NumPy bool array indexed [y, x] (True = blocked)
+
+    Returns:
+        (height, width) bool array, True where a cell is blocked
+    """
+    if isinstance(maze, np.ndarray):
+        return maze.astype(bool)
+    if not maze or not maze[0]:
+        raise ValueError('Maze must be a non-empty 2D grid')
+    first = maze[0][0]
+    if isinstance(first, dict):
+        return np.array([[bool(cell.get('wall')) for cell in column] for column in maze], dtype=bool).T
+    if isinstance(first, bool):
+        return np.array(maze, dtype=bool)
+    return np.array(maze, dtype=np.float64) < 1
+
+
+class _Grid:
+    """Flat-indexed view of an obstacle grid for the search loops."""
+
+    def __init__(self, blocked: np.ndarray, diagonal: bool):
+        self.height, self.width = blocked.shape
+        self.free = (~blocked).ravel().tolist()
+        self.diagonal = diagonal
+
+    def passable(self, x: int, y: int) -> bool:
+        return 0 <= x < self.width and 0 <= y < self.height and self.free[y * self.width + x]
+
+    def index(self, cell: Cell) -> int:
+        x, y = int(cell[0]), int(cell[1])
+        if not self.passable(x, y):
+            raise ValueError(f'Cell {cell} is outside the grid or blocked')
+        return y * self.width + x
+
+    def heuristic(self, i: int, goal: int) -> float:
+        dx = abs(i % self.width - goal % self.width)
+        dy = abs(i // self.width - goal // self.width)
+        if self.diagonal:
+            # Octile distance
+            return dx + dy + (SQRT2 - 2.0) * min(dx, dy)
+        return dx + dy
+
+    def neighbors(self, i: int):
+        """(neighbor index, step cost) pairs; diagonal moves may not cut corners."""
+        w, free = self.width, self.free
+        x, y = i % w, i // w
+        left, right = x > 0 and free[i - 1], x < w - 1 and free[i + 1]
+        up, down = y > 0 and free[i - w], y < self.height - 1 and free[i + w]
+        if left:
+            yield i - 1, 1.0
+        if right:
+            yield i + 1, 1.0
+        if up:
+            yield i - w, 1.0
+        if down:
+            yield i + w, 1.0
+        if self.diagonal:
+            if up and left and free[i - w - 1]:
+                yield i - w - 1, SQRT2
+            if up and right and free[i - w + 1]:
+                yield i - w + 1, SQRT2
+            if down and left and free[i + w - 1]:
+                yield i + w - 1, SQRT2
+            if down and right and free[i + w + 1]:
+                yield i + w + 1, SQRT2
+
+    def cell(self, i: int) -> Cell:
+        return i % self.width, i // self.width
+
+
+def find_path(blocked: np.ndarray, start: Cell, goal: Cell, algorithm: str = 'astar',
+              diagonal: bool = False) -> Dict:
+    """
+    Shortest path between two cells of an obstacle grid.
+
+    A*, Dijkstra and greedy best-first share one binary-heap search with
+    lazy deletion; they differ only in how g and h are weighted. Jump point
+    search expands far fewer nodes on open floors by jumping along
+    straight lines between forced neighbors.
+
+    Args:
+        blocked: (height, width) bool grid, True = obstacle
+        start: (x, y) start cell
+        goal: (x, y) goal cell
+        algorithm: Key of GRID_ALGORITHMS
+        diagonal: Allow 8-connected moves (not supported by 'jps')
+
+    Returns:
+        Dict with 'path' (list of (x, y) cells from start to goal, or None
+        when unreachable), 'distance' (inf when unreachable) and 'expanded'
+        (nodes taken off the heap)
+    """
+    if algorithm not in GRID_ALGORITHMS:
+        raise ValueError(f'Unknown grid algorithm: {algorithm}')
+    grid = _Grid(blocked, diagonal)
+    s, g = grid.index(start), grid.index(goal)
+    if algorithm == 'jps':
+        if diagonal:
+            raise ValueError('Jump point search is implemented for 4-connected grids')
+        return _JumpPointSearch(grid, g).search(s)
+
+    weight_g, weight_h = GRID_ALGORITHMS[algorithm]
+    size = grid.width * grid.height
+    cost = [math.inf] * size
+    parent = [-1] * size
+    closed = [False] * size
+    cost[s] = 0.0
+    heap = [(grid.heuristic(s, g) * weight_h, 0.0, s)]
+    expanded = 0
+    while heap:
+        _, _, i = heapq.heappop(heap)
+        if closed[i]:
+            continue
+        closed[i] = True
+        expanded += 1
+        if i == g:
+            break
+        base = cost[i]
+        for j, step in grid.neighbors(i):
+            new_cost = base + step
+            if new_cost < cost[j] and not closed[j]:
+                cost[j] = new_cost
+                parent[j] = i
+                h = grid.heuristic(j, g)
+                heapq.heappush(heap, (new_cost * weight_g + h * weight_h, h, j))
+
+    if not closed[g]:
+        return {'path': None, 'distance': math.inf, 'expanded': expanded}
+    path = [g]
+    while path[-1] != s:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return {'path': [grid.cell(i) for i in path], 'distance': cost[g], 'expanded': expanded}
+
+
+class _JumpPointSearch:
+    """
+    Jump point search on a 4-connected grid.
+
+    Horizontal jumps stop at cells with a forced vertical neighbor; vertical
+    jumps stop at forced horizontal neighbors or where a horizontal jump
+    from the cell finds a jump point. Only jump points enter the heap.
+    """
+
+    def __init__(self, grid: _Grid, goal: int):
+        self.grid = grid
+        self.goal = grid.cell(goal)
+
+    def _jump(self, x: int, y: int, dx: int, dy: int) -> Optional[Cell]:
+        passable, goal = self.grid.passable, self.goal
+        while True:
+            if not passable(x, y):
+                return None
+            if (x, y) == goal:
+                return x, y
+            if dx:
+                if (passable(x, y - 1) and not passable(x - dx, y - 1)) or \
+                        (passable(x, y + 1) and not passable(x - dx, y + 1)):
+                    return x, y
+            else:
+                if (passable(x - 1, y) and not passable(x - 1, y - dy)) or \
+                        (passable(x + 1, y) and not passable(x + 1, y - dy)):
+                    return x, y
+                if self._jump(x + 1, y, 1, 0) or self._jump(x - 1, y, -1, 0):
+                    return x, y
+            x += dx
+            y += dy
+
+    def _directions(self, cell: Cell, parent: Optional[Cell]) -> List[Tuple[int, int]]:
+        """Pruned set of directions to jump in from a cell."""
+        if parent is None:
+            return [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        x, y = cell
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        if dx:
+            return [(dx, 0), (0, 1), (0, -1)]
+        return [(0, dy), (1, 0), (-1, 0)]
+
+    def search(self, start: int) -> Dict:
+        grid, goal = self.grid, self.goal
+        start_cell = grid.cell(start)
+        cost = {start_cell: 0.0}
+        parent: Dict[Cell, Optional[Cell]] = {start_cell: None}
+        closed = set()
+        goal_index = goal[1] * grid.width + goal[0]
+        heap = [(grid.heuristic(start, goal_index), 0.0, start_cell)]
+        expanded = 0
+        while heap:
+            _, _, cell = heapq.heappop(heap)
+            if cell in closed:
+                continue
+            closed.add(cell)
+            expanded += 1
+            if cell == goal:
+                break
+            x, y = cell
+            for dx, dy in self._directions(cell, parent[cell]):
+                jump = self._jump(x + dx, y + dy, dx, dy)
+                if jump is None or jump in closed:
+                    continue
+                new_cost = cost[cell] + abs(jump[0] - x) + abs(jump[1] - y)
+                if new_cost < cost.get(jump, math.inf):
+                    cost[jump] = new_cost
+                    parent[jump] = cell
+                    h = grid.heuristic(jump[1] * grid.width + jump[0], goal_index)
+                    heapq.heappush(heap, (new_cost + h, h, jump))
+
+        if goal not in closed:
+            return {'path': None, 'distance': math.inf, 'expanded': expanded}
+        # Expand the straight segments between consecutive jump points
+        jumps = [goal]
+        while parent[jumps[-1]] is not None:
+            jumps.append(parent[jumps[-1]])
+        jumps.reverse()
+        path = [jumps[0]]
+        for (x0, y0), (x1, y1) in zip(jumps, jumps[1:]):
+            dx, dy = (x1 > x0) - (x1 < x0), (y1 > y0) - (y1 < y0)
+            x, y = x0, y0
+            while (x, y) != (x1, y1):
+                x, y = x + dx, y + dy
+                path.append((x, y))
+        return {'path': path, 'distance': cost[goal], 'expanded': expanded}
+
+
+def distance_map(blocked: np.ndarray, sources: Sequence[Cell], diagonal: bool = False) -> np.ndarray:
+    """
+    Travel distance from the nearest of `sources` to every cell.
+
+    Breadth-first search on 4-connected grids (unit steps), Dijkstra with
+    diagonal moves.
+
+    Returns:
+        (height, width) float array, inf for blocked or unreachable cells
+    """
+    grid = _Grid(blocked, diagonal)
+    size = grid.width * grid.height
+    dist = [math.inf] * size
+    starts = [grid.index(cell) for cell in sources]
+    for s in starts:
+        dist[s] = 0.0
+
+    if not diagonal:
+        queue = deque(starts)
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1.0
+            for j, _ in grid.neighbors(i):
+                if dist[j] == math.inf:
+                    dist[j] = d
+                    queue.append(j)
+    else:
+        heap = [(0.0, s) for s in starts]
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]:
+                continue
+            for j, step in grid.neighbors(i):
+                if d + step < dist[j]:
+                    dist[j] = d + step
+                    heapq.heappush(heap, (d + step, j))
+    return np.array(dist).reshape(grid.height, grid.width)
+
+
+def nearest_target(blocked: np.ndarray, source: Cell, targets: Sequence[Cell],
+                   diagonal: bool = False) -> Tuple[Optional[int], int]:
+    """
+    The target closest to `source` by travel distance.
+
+    Same search as distance_map(), stopped at the first target reached, so
+    it only covers the area within that target's distance.
+
+    Returns:
+        Tuple of (index into `targets` or None when none is reachable, cells expanded)
+    """
+    grid = _Grid(blocked, diagonal)
+    wanted: Dict[int, int] = {}
+    for k, (x, y) in enumerate(targets):
+        if grid.passable(x, y):
+            wanted.setdefault(y * grid.width + x, k)
+    start = grid.index(source)
+    dist = {start: 0.0}
+    expanded = 0
+    if not diagonal:
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            expanded += 1
+            if i in wanted:
+                return wanted[i], expanded
+            d = dist[i] + 1.0
+            for j, _ in grid.neighbors(i):
+                if j not in dist:
+                    dist[j] = d
+                    queue.append(j)
+    else:
+        heap = [(0.0, start)]
+        while heap:
+            d, i = heapq.heappop(heap)
+            if d > dist[i]:
+                continue
+            expanded += 1
+            if i in wanted:
+                return wanted[i], expanded
+            for j, step in grid.neighbors(i):
+                if d + step < dist.get(j, math.inf):
+                    dist[j] = d + step
+                    heapq.heappush(heap, (d + step, j))
+    return None, expanded
+
+
+def count_conflicts(paths: Sequence[Sequence[Cell]]) -> int:
+    """
+    Collisions between robots following timed paths (one cell per time step).
+
+    Counts vertex conflicts (two robots in one cell at the same step) and
+    edge conflicts (two robots swapping cells). A robot that has arrived
+    stays on its last cell.
+    """
+    paths = [list(map(tuple, p)) for p in paths if len(p)]
+    if len(paths) < 2:
+        return 0
+    horizon = max(len(p) for p in paths)
+    conflicts = 0
+    for t in range(horizon):
+        at = [p[min(t, len(p) - 1)] for p in paths]
+        seen: Dict[Cell, int] = {}
+        for cell in at:
+            seen[cell] = seen.get(cell, 0) + 1
+        conflicts += sum(count - 1 for count in seen.values() if count > 1)
+        if t:
+            before = [p[min(t - 1, len(p) - 1)] for p in paths]
+            moves = {(b, a) for b, a in zip(before, at) if b != a}
+            conflicts += sum(1 for b, a in moves if (a, b) in moves) // 2
+    return conflicts
+
+
+def plan_deliveries(blocked: np.ndarray, robots: Sequence[Cell], deliveries: Sequence[Cell],
+                    algorithm: str = 'astar', diagonal: bool = False) -> Dict:
+    """
+    Assign deliveries to robots and route them over the grid.
+
+    The robot with the least travel so far repeatedly takes its nearest
+    remaining delivery (true grid distance, from a search that stops at the
+    first delivery it reaches) and is routed there with the chosen search
+    algorithm; `expanded` counts the cells of both searches. Paths are
+    planned per robot, ignoring the others; `conflicts` counts where they
+    would collide.
+
+    Returns:
+        Dict with 'robots' (per robot: 'start', 'deliveries', 'path',
+        'distance'), 'total_distance', 'makespan' (steps of the longest
+        route), 'expanded', 'conflicts', 'unreachable' (deliveries no robot
+        can reach) and 'efficiency' (straight-line lower bound / travelled, 1.0 = no detours)
+    """
+    plans = [{'start': tuple(cell), 'deliveries': [], 'path': [tuple(cell)], 'distance': 0.0}
+             for cell in robots]
+    remaining = [tuple(cell) for cell in deliveries]
+    unreachable = []
+    expanded = 0
+    lower_bound = 0.0
+    active = list(range(len(plans)))
+
+    while remaining and active:
+        r = min(active, key=lambda k: plans[k]['distance'])
+        position = plans[r]['path'][-1]
+        best, searched = nearest_target(blocked, position, remaining, diagonal)
+        expanded += searched
+        if best is None:
+            # Nothing left that this robot can reach
+            active.remove(r)
+            continue
+        target = remaining.pop(best)
+        leg = find_path(blocked, position, target, algorithm, diagonal)
+        expanded += leg['expanded']
+        plans[r]['deliveries'].append(target)
+        plans[r]['path'].extend(leg['path'][1:])
+        plans[r]['distance'] += leg['distance']
+        dx, dy = abs(target[0] - position[0]), abs(target[1] - position[1])
+        lower_bound += dx + dy + (SQRT2 - 2.0) * min(dx, dy) if diagonal else dx + dy
+    unreachable.extend(remaining)
+
+    total = sum(plan['distance'] for plan in plans)
+    return {
+        'robots': plans,
+        'total_distance': total,
+        'makespan': max((len(plan['path']) - 1 for plan in plans), default=0),
+        'expanded': expanded,
+        'conflicts': count_conflicts([plan['path'] for plan in plans]),
+        'unreachable': unreachable,
+        'efficiency': lower_bound / total if total else 1.0,
+    }
@@ -0,0 +1,448 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Dict, Optional, Tuple
+from storage import Connections
+from tsp_heuristics import TSPSolver
+
+# Job lifecycle
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED_STATES = {DONE, FAILED, CANCELLED}
+
+# Seconds between looks at the shared store for changes made by other processes
+POLL_INTERVAL = 0.2
+
+JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    owner INTEGER NOT NULL,
+    finished_at REAL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at);
+"""
+
+
+class QueueFull(Exception):
+    """Every worker is busy and the wait queue is full; the client should retry later."""
+
+
+class StoreFull(Exception):
+    """The job store holds its maximum number of unfinished jobs."""
+
+
+class JobStore:
+    """
+    Bounded, thread-safe registry of solve jobs.
+
+    Jobs are plain dicts keyed by id. Finished jobs expire `ttl` seconds
+    after they finish; when the store is full the oldest finished jobs are
+    dropped first, and only if every job is still active does create()
+    refuse new work. A condition variable lets readers block until a job
+    finishes (long polling).
+    """
+
+    # Whether other processes see the same jobs (see SharedJobStore)
+    shared = False
+
+    def __init__(self, max_jobs: int = 1000, ttl: float = 600.0):
+        """
+        Args:
+            max_jobs: Maximum number of jobs kept (active and finished)
+            ttl: Seconds a finished job stays retrievable
+        """
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: Dict[str, Dict] = {}
+        self._changed = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._changed:
+            return len(self._jobs)
+
+    def create(self, **fields) -> Dict:
+        """Register a new queued job and return a copy of it."""
+        with self._changed:
+            self._evict()
+            if len(self._jobs) >= self.max_jobs:
+                raise StoreFull(f'Job store is full ({self.max_jobs} active jobs)')
+            job = self._new_job(fields)
+            self._jobs[job['id']] = job
+            return dict(job)
+
+    @staticmethod
+    def _new_job(fields: Dict) -> Dict:
+        job = {
+            'id': str(uuid.uuid4()),
+            'status': QUEUED,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+        }
+        job.update(fields)
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None or self._expired(job, time.time()):
+                return None
+            return dict(job)
+
+    def update(self, job_id: str, **fields) -> None:
+        """Change job fields; entering a finished state stamps finished_at and wakes waiters."""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            if job['status'] in FINISHED_STATES and job['finished_at'] is None:
+                job['finished_at'] = time.time()
+            self._changed.notify_all()
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Block until the job finishes or `timeout` seconds pass, then return it."""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self._jobs.get(job_id, {}).get('status', DONE) in FINISHED_STATES,
+                timeout=timeout)
+        return self.get(job_id)
+
+    def _expired(self, job: Dict, now: float) -> bool:
+        return job['finished_at'] is not None and now - job['finished_at'] > self.ttl
+
+    def _evict(self) -> None:
+        now = time.time()
+        for job_id in [i for i, job in self._jobs.items() if self._expired(job, now)]:
+            del self._jobs[job_id]
+        if len(self._jobs) >= self.max_jobs:
+            finished = sorted((job['finished_at'], i) for i, job in self._jobs.items()
+                              if job['finished_at'] is not None)
+            for _, job_id in finished[:len(self._jobs) - self.max_jobs + 1]:
+                del self._jobs[job_id]
+
+
+class SharedJobStore(JobStore):
+    """
+    Job registry in SQLite, shared by all worker processes of the server.
+
+    Same limits and interface as JobStore, so a job submitted to one worker
+    can be polled or cancelled through any other. Jobs are stored as
+    deflated JSON. Cancelling a job that another process runs only sets a
+    flag on its row, which that job's pool worker polls. Waiters wake at
+    once on updates made in this process and within POLL_INTERVAL on
+    updates from others. An unfinished job whose owning process is gone
+    (crashed or restarted worker) is reported as failed.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, max_jobs: int = 1000, ttl: float = 600.0):
+        """
+        Args:
+            path: SQLite database file, the same for every worker
+            max_jobs: Maximum number of jobs kept (active and finished)
+            ttl: Seconds a finished job stays retrievable
+        """
+        super().__init__(max_jobs=max_jobs, ttl=ttl)
+        self.path = path
+        self._db = Connections(path, JOBS_SCHEMA)
+
+    def __len__(self) -> int:
+        return self._db.get().execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+    def create(self, **fields) -> Dict:
+        job = self._new_job(fields)
+        db = self._db.get()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            self._evict_rows(db)
+            if db.execute('SELECT COUNT(*) FROM jobs').fetchone()[0] >= self.max_jobs:
+                raise StoreFull(f'Job store is full ({self.max_jobs} active jobs)')
+            db.execute('INSERT INTO jobs (id, data, owner) VALUES (?, ?, ?)',
+                       (job['id'], _pack(job), os.getpid()))
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._db.get().execute('SELECT data, owner FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job, owner = _unpack(row[0]), row[1]
+        if job['finished_at'] is None and owner != os.getpid() and not _process_alive(owner):
+            self.update(job_id, status=FAILED, error='The worker process running this job exited')
+            return self.get(job_id)
+        return None if self._expired(job, time.time()) else job
+
+    def update(self, job_id: str, **fields) -> None:
+        db = self._db.get()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return
+            job = _unpack(row[0])
+            job.update(fields)
+            if job['status'] in FINISHED_STATES and job['finished_at'] is None:
+                job['finished_at'] = time.time()
+            db.execute('UPDATE jobs SET data = ?, finished_at = ? WHERE id = ?',
+                       (_pack(job), job['finished_at'], job_id))
+        with self._changed:
+            self._changed.notify_all()
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['status'] in FINISHED_STATES or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(remaining, POLL_INTERVAL))
+
+    def request_cancel(self, job_id: str) -> None:
+        """Flag an unfinished job for cancellation by whichever process runs it."""
+        db = self._db.get()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND finished_at IS NULL', (job_id,))
+
+    def cancel_requested(self, job_id: str) -> bool:
+        row = self._db.get().execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _evict_rows(self, db) -> None:
+        """Drop expired jobs, then the oldest finished ones while full (inside a transaction)."""
+        db.execute('DELETE FROM jobs WHERE finished_at < ?', (time.time() - self.ttl,))
+        excess = db.execute('SELECT COUNT(*) FROM jobs').fetchone()[0] - self.max_jobs + 1
+        if excess > 0:
+            db.execute('DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE finished_at IS NOT NULL'
+                       ' ORDER BY finished_at LIMIT ?)', (excess,))
+
+
+def _pack(job: Dict) -> bytes:
+    return zlib.compress(json.dumps(job).encode())
+
+
+def _unpack(payload: bytes) -> Dict:
+    return json.loads(zlib.decompress(payload))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# Worker-side views of the JobQueue flag arrays and, for a shared job store,
+# the store itself; set by the pool initializer
+_cancel_flags = None
+_started_at = None
+_store = None
+
+
+def _init_worker(cancel_flags, started_at, store_path: Optional[str]) -> None:
+    global _cancel_flags, _started_at, _store
+    _cancel_flags, _started_at = cancel_flags, started_at
+    _store = SharedJobStore(store_path) if store_path else None
+
+
+class _CancelCheck:
+    """should_stop for one job: its cancel flag, plus the shared store's flag at most every POLL_INTERVAL."""
+
+    def __init__(self, slot: int, job_id: str):
+        self.slot = slot
+        self.job_id = job_id
+        self.cancelled = False
+        self.next_check = 0.0
+
+    def __call__(self) -> bool:
+        if _cancel_flags[self.slot] != 0:
+            return True
+        if _store is not None and not self.cancelled and time.monotonic() >= self.next_check:
+            self.cancelled = _store.cancel_requested(self.job_id)
+            self.next_check = time.monotonic() + POLL_INTERVAL
+        return self.cancelled
+
+
+def _run_job(slot: int, job_id: str, spec: Dict) -> Tuple[Optional[Dict], float, bool]:
+    """
+    Worker task: run one solve.
+
+    Returns:
+        Tuple of (TSPSolver.solve result, execution time, whether it was cancelled);
+        the result is None for a job cancelled through the shared store before it started
+    """
+    _started_at[slot] = time.time()
+    should_stop = _CancelCheck(slot, job_id)
+    if should_stop():
+        return None, 0.0, True
+    if _store is not None:
+        _store.update(job_id, status=RUNNING, started_at=_started_at[slot])
+    solver = TSPSolver(spec['points'], metric=spec['metric'], dtype=spec['dtype'])
+    start_time = time.time()
+    result = solver.solve(spec['algorithm'], improve=spec['improve'], time_limit=spec['time_limit'],
+                          should_stop=should_stop, **spec['params'])
+    return result, time.time() - start_time, should_stop()
+
+
+class JobQueue:
+    """
+    Runs solve jobs on a bounded process pool.
+
+    At most `max_workers + max_queued` jobs are in flight; submit() raises
+    QueueFull beyond that instead of letting the backlog grow. Each in-flight
+    job owns a slot in two shared arrays inherited by the workers: a cancel
+    flag the solver polls through ``should_stop`` (a running job stops
+    early and keeps its best tour so far) and the time the job started,
+    which is how queued jobs are seen to be running. A forked server worker
+    gets fresh arrays and its own pool on first use, so workers never share
+    slots. With a SharedJobStore, jobs running in another server worker are
+    cancelled through the store, and pool workers mark their job running
+    there themselves.
+    """
+
+    def __init__(self, store: JobStore, max_workers: Optional[int] = None, max_queued: int = 16):
+        """
+        Args:
+            store: Where job state is kept
+            max_workers: Worker processes (default: CPU count)
+            max_queued: Jobs allowed to wait for a free worker
+        """
+        self.store = store
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.capacity = self.max_workers + max_queued
+        # Re-entrant: Future.cancel() runs the done callback in the calling thread
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        """Fresh slot arrays and no pool, owned by the current process."""
+        self._pid = os.getpid()
+        self._cancel_flags = multiprocessing.RawArray('b', self.capacity)
+        self._started_at = multiprocessing.RawArray('d', self.capacity)
+        self._free_slots = list(range(self.capacity))
+        self._active: Dict[str, Tuple[int, Future]] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _check_fork(self) -> None:
+        """After a fork the parent's slots and pool belong to the parent; start over (under the lock)."""
+        if self._pid != os.getpid():
+            self._reset()
+
+    @property
+    def depth(self) -> int:
+        """Jobs currently queued or running."""
+        with self._lock:
+            self._check_fork()
+            return len(self._active)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                             initargs=(self._cancel_flags, self._started_at,
+                                                       self.store.path if self.store.shared else None))
+        return self._pool
+
+    def submit(self, spec: Dict) -> Dict:
+        """
+        Queue a solve.
+
+        Args:
+            spec: Parsed request with 'points', 'metric', 'dtype', 'algorithm',
+                  'improve', 'time_limit' and 'params'
+
+        Returns:
+            The new job
+
+        Raises:
+            QueueFull: All slots are taken
+            StoreFull: The job store cannot take another job
+        """
+        with self._lock:
+            self._check_fork()
+            if not self._free_slots:
+                raise QueueFull(f'Too many pending jobs ({self.capacity})')
+            job = self.store.create(algorithm=spec['algorithm'], metric=spec['metric'],
+                                    num_points=len(spec['points']))
+            slot = self._free_slots.pop()
+            self._cancel_flags[slot] = 0
+            self._started_at[slot] = 0.0
+            try:
+                future = self._executor().submit(_run_job, slot, job['id'], spec)
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for this and later jobs
+                self._pool = None
+                future = self._executor().submit(_run_job, slot, job['id'], spec)
+            self._active[job['id']] = (slot, future)
+        future.add_done_callback(partial(self._finish, job['id']))
+        return job
+
+    def _finish(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            slot, _ = self._active.pop(job_id)
+            started_at = self._started_at[slot] or None
+            self._free_slots.append(slot)
+
+        if future.cancelled():
+            self.store.update(job_id, status=CANCELLED)
+            return
+        error = future.exception()
+        if error is not None:
+            self.store.update(job_id, status=FAILED, started_at=started_at, error=str(error))
+            return
+        result, execution_time, cancelled = future.result()
+        self.store.update(job_id, status=CANCELLED if cancelled else DONE, started_at=started_at,
+                          result=result, execution_time=execution_time)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Current job state (None if unknown or expired)."""
+        with self._lock:
+            self._check_fork()
+            if job_id in self._active:
+                slot, _ = self._active[job_id]
+                if self._started_at[slot]:
+                    self.store.update(job_id, status=RUNNING, started_at=self._started_at[slot])
+        return self.store.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict]:
+        """Long poll: wait up to `timeout` seconds for the job to finish."""
+        if timeout > 0:
+            self.store.wait(job_id, timeout)
+        return self.status(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """
+        Cancel a job: a queued job is dropped, a running one is asked to stop
+        and finishes as 'cancelled' with the best tour found so far. A job
+        of another server worker is flagged in the shared store and stops
+        once its pool worker sees the flag.
+        """
+        with self._lock:
+            self._check_fork()
+            if job_id in self._active:
+                slot, future = self._active[job_id]
+                if not future.cancel():
+                    self._cancel_flags[slot] = 1
+            elif self.store.shared:
+                self.store.request_cancel(job_id)
+        return self.status(job_id)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
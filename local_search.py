@@ -0,0 +1,217 @@
+import time
+from collections import deque
+from typing import Callable, Iterable, List, Optional, Sequence
+
+# Moves must gain more than this to be applied; guards against float noise
+# cycling between equivalent tours.
+EPSILON = 1e-9
+
+# Cities examined between deadline / should_stop checks
+DEADLINE_CHECK_INTERVAL = 256
+
+
+class LocalSearch:
+    """
+    2-opt and Or-opt improvement of a closed tour.
+
+    The tour is stored as an array of cities plus the inverse position array,
+    so successor/predecessor lookups are O(1) and a 2-opt move is one segment
+    reversal (always of the shorter side). Moves are only tried towards the
+    neighbor lists of each city, and a queue of active cities acts as the
+    don't-look bits: a city is re-examined only after one of its tour edges
+    changed.
+    """
+
+    def __init__(self, tour: Sequence[int], distance: Callable[[int, int], float],
+                 neighbors: Sequence[Sequence[int]], or_opt: bool = True):
+        """
+        Args:
+            tour: Visiting order of every city exactly once (no closing repeat)
+            distance: Scalar distance function d(i, j)
+            neighbors: Candidate neighbor list for every city, nearest first
+            or_opt: Also try moving segments of 1-3 cities
+        """
+        self.tour = list(tour)
+        self.n = len(self.tour)
+        self.pos = [0] * (max(self.tour) + 1 if self.tour else 0)
+        for i, city in enumerate(self.tour):
+            self.pos[city] = i
+        self.d = distance
+        self.neighbors = neighbors
+        self.or_opt = or_opt
+        self.moves = 0
+
+    def succ(self, city: int) -> int:
+        return self.tour[(self.pos[city] + 1) % self.n]
+
+    def pred(self, city: int) -> int:
+        return self.tour[self.pos[city] - 1]
+
+    def length(self) -> float:
+        tour, d = self.tour, self.d
+        return sum(d(tour[i - 1], tour[i]) for i in range(self.n))
+
+    def run(self, active: Optional[Iterable[int]] = None, deadline: Optional[float] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> List[int]:
+        """
+        Apply improving moves until none is left (a local optimum).
+
+        Args:
+            active: Cities whose don't-look bit starts cleared (default: all)
+            deadline: time.perf_counter() value at which to stop early; the
+                      tour is valid (and no longer) at every point
+            should_stop: Polled with the deadline; True stops early
+
+        Returns:
+            The improved tour
+        """
+        if self.n < 5:
+            return self.tour
+        queue = deque(self.tour if active is None else active)
+        queued = [False] * len(self.pos)
+        for city in queue:
+            queued[city] = True
+
+        examined = 0
+        while queue:
+            examined += 1
+            if examined % DEADLINE_CHECK_INTERVAL == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                if should_stop is not None and should_stop():
+                    break
+            city = queue.popleft()
+            queued[city] = False
+            touched = self._improve_city(city)
+            if touched:
+                self.moves += 1
+                for c in touched:
+                    if not queued[c]:
+                        queued[c] = True
+                        queue.append(c)
+                if not queued[city]:
+                    queued[city] = True
+                    queue.append(city)
+        return self.tour
+
+    def _improve_city(self, a: int) -> Optional[List[int]]:
+        """Try one improving move around city a; return the cities it touched."""
+        touched = self._two_opt(a)
+        if touched is None and self.or_opt:
+            touched = self._or_opt(a)
+        return touched
+
+    def _reverse(self, i: int, j: int) -> None:
+        """Reverse the tour between positions i and j (inclusive, going forward)."""
+        n, tour, pos = self.n, self.tour, self.pos
+        length = (j - i) % n + 1
+        if 2 * length > n:
+            # Reversing the complement gives the same cycle and moves fewer cities
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+        if i <= j:
+            segment = tour[i:j + 1]
+            segment.reverse()
+            tour[i:j + 1] = segment
+            for k, city in enumerate(segment, i):
+                pos[city] = k
+        else:
+            for _ in range(length // 2):
+                ci, cj = tour[i], tour[j]
+                tour[i], tour[j] = cj, ci
+                pos[cj], pos[ci] = i, j
+                i = (i + 1) % n
+                j = (j - 1) % n
+
+    def _exchange(self, a: int, b: int, c: int, d: int) -> None:
+        """
+        Replace tour edges (a, b) and (c, d) with (a, c) and (b, d).
+
+        Both edges must have the same orientation: either b = succ(a) and
+        d = succ(c), or b = pred(a) and d = pred(c).
+        """
+        if self.succ(a) == b:
+            self._reverse(self.pos[b], self.pos[c])
+        else:
+            self._reverse(self.pos[c], self.pos[b])
+
+    def _two_opt(self, a: int) -> Optional[List[int]]:
+        d = self.d
+        for forward in (True, False):
+            b = self.succ(a) if forward else self.pred(a)
+            d_ab = d(a, b)
+            for c in self.neighbors[a]:
+                g1 = d_ab - d(a, c)
+                if g1 <= EPSILON:
+                    break
+                e = self.succ(c) if forward else self.pred(c)
+                if c == b or e == a:
+                    continue
+                if g1 + d(c, e) - d(b, e) > EPSILON:
+                    self._exchange(a, b, c, e)
+                    return [a, b, c, e]
+        return None
+
+    def _or_opt(self, a: int) -> Optional[List[int]]:
+        """Move a segment of 1-3 cities starting or ending at a elsewhere in the tour."""
+        d, n = self.d, self.n
+        for seg_len in (1, 2, 3):
+            if seg_len >= n - 3:
+                break
+            for forward in (True, False):
+                if seg_len == 1 and not forward:
+                    continue
+                # Segment s1..s2 in tour order, with a at one end
+                if forward:
+                    s1, s2 = a, self.tour[(self.pos[a] + seg_len - 1) % n]
+                else:
+                    s1, s2 = self.tour[(self.pos[a] - seg_len + 1) % n], a
+                p, nx = self.pred(s1), self.succ(s2)
+                removal_gain = d(p, s1) + d(s2, nx) - d(p, nx)
+                if removal_gain <= EPSILON:
+                    continue
+                start = self.pos[s1]
+                segment = {self.tour[(start + k) % n] for k in range(seg_len)}
+
+                for end in (s1, s2):
+                    for c in self.neighbors[end]:
+                        if c in segment:
+                            continue
+                        if d(end, c) >= removal_gain:
+                            break
+                        for u in (c, self.pred(c)):
+                            v = self.succ(u)
+                            if u in segment or v in segment or v == p or u == nx:
+                                continue
+                            d_uv = d(u, v)
+                            reversed_add = d(u, s2) + d(s1, v) - d_uv
+                            forward_add = d(u, s1) + d(s2, v) - d_uv
+                            if min(reversed_add, forward_add) < removal_gain - EPSILON:
+                                # Or-opt as two (or three) sequential 2-opt exchanges
+                                self._exchange(p, s1, u, v)
+                                self._exchange(p, u, nx, s2)
+                                if forward_add < reversed_add:
+                                    self._exchange(u, s2, s1, v)
+                                return [p, nx, s1, s2, u, v]
+        return None
+
+
+def improve_tour(tour: Sequence[int], distance: Callable[[int, int], float],
+                 neighbors: Sequence[Sequence[int]], or_opt: bool = True,
+                 deadline: Optional[float] = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> List[int]:
+    """
+    Run 2-opt (and optionally Or-opt) to a local optimum.
+
+    Args:
+        tour: Visiting order of every city exactly once (no closing repeat)
+        distance: Scalar distance function d(i, j)
+        neighbors: Candidate neighbor list for every city, nearest first
+        or_opt: Also try segment moves
+        deadline: time.perf_counter() value at which to stop early
+        should_stop: Polled with the deadline; True stops early
+
+    Returns:
+        Improved visiting order (same rotation is not guaranteed)
+    """
+    return LocalSearch(tour, distance, neighbors, or_opt=or_opt).run(deadline=deadline, should_stop=should_stop)
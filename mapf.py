@@ -0,0 +1,331 @@
+import heapq
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from grid_paths import Cell, _Grid, count_conflicts, distance_map
+
+# Multi-agent planners accepted by plan_paths()
+MAPF_METHODS = ('cooperative', 'cbs')
+
+# Low-level expansions between two deadline checks
+DEADLINE_CHECK_INTERVAL = 256
+
+# A single-robot search gives up after this many expansions per grid cell
+# (but never below MIN_EXPANSIONS); a boxed-in robot would otherwise search
+# every cell at every time step
+EXPANSIONS_PER_CELL = 2
+MIN_EXPANSIONS = 10000
+
+
+class ReservationTable:
+    """
+    Space-time occupancy shared by the planned robots.
+
+    Cells are reserved per time step; a robot that has arrived parks on its
+    goal, which blocks that cell from its arrival time on. Edge entries
+    forbid the move that would swap places with a reserved robot. CBS uses
+    the same structure to hold one agent's constraints.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._vertices: Set[int] = set()      # t * size + cell
+        self._edges: Set[Tuple[int, int, int]] = set()   # (from, to, arrival time)
+        self._parked: Dict[int, int] = {}     # cell -> time it is blocked from
+        self._last: Dict[int, int] = {}       # cell -> last reserved time step
+        self.horizon = 0
+
+    def add_vertex(self, cell: int, t: int) -> None:
+        self._vertices.add(t * self.size + cell)
+        self._last[cell] = max(self._last.get(cell, -1), t)
+        self.horizon = max(self.horizon, t)
+
+    def add_edge(self, source: int, target: int, t: int) -> None:
+        self._edges.add((source, target, t))
+        self.horizon = max(self.horizon, t)
+
+    def reserve(self, path: Sequence[int]) -> None:
+        """Reserve a robot's timed path and park it on its last cell."""
+        for t, cell in enumerate(path):
+            self.add_vertex(cell, t)
+            if t and path[t - 1] != cell:
+                self.add_edge(cell, path[t - 1], t)
+        self._parked[path[-1]] = min(self._parked.get(path[-1], len(path) - 1), len(path) - 1)
+
+    def blocked(self, cell: int, t: int) -> bool:
+        if t * self.size + cell in self._vertices:
+            return True
+        parked = self._parked.get(cell)
+        return parked is not None and t >= parked
+
+    def edge_blocked(self, source: int, target: int, t: int) -> bool:
+        return (source, target, t) in self._edges
+
+    def earliest_stop(self, cell: int) -> float:
+        """First time step from which a robot may stay on `cell` for good."""
+        if cell in self._parked:
+            return math.inf
+        return self._last.get(cell, -1) + 1
+
+
+def _space_time_astar(grid: _Grid, start: int, goal: int, h: List[float], table: ReservationTable,
+                      obstacles: Set[int], deadline: Optional[float]) -> Tuple[Optional[List[int]], int]:
+    """
+    A* over (cell, time) states with a wait action.
+
+    The heuristic is the true distance to the goal on the empty grid, so
+    unobstructed robots expand little more than their own path. The search
+    gives up past a horizon that leaves room to wait for every reservation,
+    or after its expansion budget.
+
+    Returns:
+        Tuple of (cell per time step from start to goal, or None) and the
+        number of states expanded
+    """
+    earliest = table.earliest_stop(goal)
+    if math.isinf(h[start]) or math.isinf(earliest) or goal in obstacles:
+        return None, 0
+    size = grid.width * grid.height
+    max_time = table.horizon + int(h[start]) + grid.width + grid.height
+    max_expanded = max(EXPANSIONS_PER_CELL * size, MIN_EXPANSIONS)
+    parent = {start: -1}
+    heap = [(h[start], 0, start)]
+    expanded = 0
+    while heap:
+        _, negative_t, cell = heapq.heappop(heap)
+        t = -negative_t
+        expanded += 1
+        if cell == goal and t >= earliest:
+            key, path = t * size + cell, []
+            while key != -1:
+                path.append(key % size)
+                key = parent[key]
+            path.reverse()
+            return path, expanded
+        if expanded >= max_expanded:
+            return None, expanded
+        if deadline is not None and expanded % DEADLINE_CHECK_INTERVAL == 0 \
+                and time.perf_counter() > deadline:
+            return None, expanded
+        if t >= max_time:
+            continue
+        key, nt = t * size + cell, t + 1
+        moves = [cell]
+        moves.extend(j for j, _ in grid.neighbors(cell))
+        for j in moves:
+            # Every state at time nt costs nt, so the first visit is the best one
+            next_key = nt * size + j
+            if next_key in parent or j in obstacles or table.blocked(j, nt) \
+                    or (j != cell and table.edge_blocked(cell, j, nt)):
+                continue
+            parent[next_key] = key
+            # Deeper states first among equal f: finishes ties without fanning out
+            heapq.heappush(heap, (nt + h[j], -nt, j))
+    return None, expanded
+
+
+def _first_conflict(paths: Sequence[Sequence[int]]) -> Optional[Tuple]:
+    """
+    Earliest collision between timed paths (robots stay on their last cell).
+
+    Returns:
+        None, or (t, a, b, cell) for two robots on one cell, or
+        (t, a, b, source, target) when a moves source -> target while b
+        moves the other way
+    """
+    horizon = max(len(p) for p in paths)
+    for t in range(horizon):
+        occupied: Dict[int, int] = {}
+        moves: Dict[Tuple[int, int], int] = {}
+        for agent, path in enumerate(paths):
+            cell = path[min(t, len(path) - 1)]
+            if cell in occupied:
+                return t, occupied[cell], agent, cell
+            occupied[cell] = agent
+            if t and t < len(path) and path[t - 1] != cell:
+                other = moves.get((cell, path[t - 1]))
+                if other is not None:
+                    return t, other, agent, cell, path[t - 1]
+                moves[(path[t - 1], cell)] = agent
+    return None
+
+
+class MultiAgentPlanner:
+    """
+    Collision-free paths for several robots on a 4-connected grid.
+
+    Robots move one cell or wait per time step. Two robots may not share a
+    cell at the same step or swap cells, and a robot stays on its goal after
+    arriving.
+
+    Cooperative A* plans the robots one after another against a space-time
+    reservation table. Each robot first tries to keep clear of the other
+    robots' goals and of the starts of robots not planned yet, so it neither
+    runs over a waiting robot nor blocks a goal that someone must reach
+    later (the case that makes prioritized planning slow or fail); if that
+    is impossible it is planned against the reservations alone. When a
+    robot still cannot be routed it moves to the front of the order and
+    planning restarts, within the time budget. Conflict-based search (CBS) searches for a plan of minimum total
+    cost by splitting on the first collision and replanning the two robots
+    involved; it starts from the cooperative plan and returns it if the
+    budget runs out first.
+    """
+
+    def __init__(self, blocked: np.ndarray, time_limit: Optional[float] = 5.0):
+        """
+        Args:
+            blocked: (height, width) bool grid, True = obstacle
+            time_limit: Planning budget in seconds (None = no limit)
+        """
+        self.blocked = blocked
+        self.grid = _Grid(blocked, diagonal=False)
+        self.time_limit = time_limit
+        self.expanded = 0
+
+    def plan(self, starts: Sequence[Cell], goals: Sequence[Cell], method: str = 'cooperative') -> Dict:
+        """
+        Args:
+            starts: (x, y) start cell per robot
+            goals: (x, y) goal cell per robot
+            method: Key of MAPF_METHODS
+
+        Returns:
+            Dict with 'paths' ((x, y) per time step and robot), 'makespan',
+            'total_cost' (sum of arrival times), 'conflicts' (collisions left
+            in the plan), 'failed' (robots left waiting at their start),
+            'method' (planner that produced the plan), 'optimal', 'expanded'
+            and 'timed_out'
+        """
+        if method not in MAPF_METHODS:
+            raise ValueError(f'Unknown MAPF method: {method}')
+        if len(starts) != len(goals):
+            raise ValueError('Every robot needs exactly one goal')
+        starts_i = [self.grid.index(cell) for cell in starts]
+        goals_i = [self.grid.index(cell) for cell in goals]
+        if len(set(starts_i)) < len(starts_i):
+            raise ValueError('Two robots start on the same cell')
+        if len(set(goals_i)) < len(goals_i):
+            raise ValueError('Two robots share a goal cell')
+
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.expanded = 0
+        heuristics = {}
+        for goal in set(goals_i):
+            heuristics[goal] = distance_map(self.blocked, [self.grid.cell(goal)]).ravel().tolist()
+        h = [heuristics[goal] for goal in goals_i]
+
+        paths, failed, timed_out = self._cooperative(starts_i, goals_i, h, deadline)
+        used, optimal = 'cooperative', False
+        if method == 'cbs' and not timed_out:
+            solution = self._cbs(starts_i, goals_i, h, deadline)
+            if solution is not None:
+                paths, failed, used, optimal = solution, [], 'cbs', True
+            else:
+                timed_out = True
+
+        cells = [[self.grid.cell(i) for i in path] for path in paths]
+        return {
+            'paths': cells,
+            'makespan': max(len(path) - 1 for path in paths) if paths else 0,
+            'total_cost': sum(len(path) - 1 for path in paths),
+            'conflicts': count_conflicts(cells),
+            'failed': failed,
+            'method': used,
+            'optimal': optimal,
+            'expanded': self.expanded,
+            'timed_out': timed_out,
+        }
+
+    def _cooperative(self, starts: List[int], goals: List[int], h: List[List[float]],
+                     deadline: Optional[float]) -> Tuple[List[List[int]], List[int], bool]:
+        """Prioritized planning with restarts; returns (paths, failed robots, timed out)."""
+        # Longest trips first: they are the hardest to fit around others
+        order = sorted(range(len(starts)), key=lambda k: -h[k][starts[k]])
+        best = None
+        for _ in range(len(starts) + 1):
+            table = ReservationTable(self.grid.width * self.grid.height)
+            avoid = set(starts) | set(goals)
+            paths: List[Optional[List[int]]] = [None] * len(starts)
+            failed = []
+            for k in order:
+                avoid.discard(starts[k])
+                avoid.discard(goals[k])
+                path, expanded = _space_time_astar(self.grid, starts[k], goals[k], h[k], table,
+                                                   avoid, deadline)
+                self.expanded += expanded
+                if path is None:
+                    path, expanded = _space_time_astar(self.grid, starts[k], goals[k], h[k], table,
+                                                       set(), deadline)
+                    self.expanded += expanded
+                avoid.add(goals[k])
+                if path is None:
+                    failed.append(k)
+                    path = [starts[k]]
+                table.reserve(path)
+                paths[k] = path
+            if best is None or len(failed) < len(best[1]):
+                best = (paths, failed)
+            timed_out = deadline is not None and time.perf_counter() > deadline
+            if not failed or timed_out:
+                return best[0], sorted(best[1]), timed_out
+            order = failed + [k for k in order if k not in failed]
+        return best[0], sorted(best[1]), False
+
+    def _cbs(self, starts: List[int], goals: List[int], h: List[List[float]],
+             deadline: Optional[float]) -> Optional[List[List[int]]]:
+        """Conflict-based search; None if the budget runs out."""
+        size = self.grid.width * self.grid.height
+        no_obstacles: Set[int] = set()
+
+        def replan(agent: int, constraints: Tuple) -> Optional[List[int]]:
+            table = ReservationTable(size)
+            for constraint in constraints:
+                if constraint[0] != agent:
+                    continue
+                if len(constraint) == 3:
+                    table.add_vertex(constraint[1], constraint[2])
+                else:
+                    table.add_edge(constraint[1], constraint[2], constraint[3])
+            path, expanded = _space_time_astar(self.grid, starts[agent], goals[agent], h[agent],
+                                               table, no_obstacles, deadline)
+            self.expanded += expanded
+            return path
+
+        paths = []
+        for agent in range(len(starts)):
+            path = replan(agent, ())
+            if path is None:
+                return None
+            paths.append(path)
+        counter = 0
+        heap = [(sum(len(p) - 1 for p in paths), counter, (), paths)]
+        while heap:
+            if deadline is not None and time.perf_counter() > deadline:
+                return None
+            _, _, constraints, paths = heapq.heappop(heap)
+            conflict = _first_conflict(paths)
+            if conflict is None:
+                return paths
+            if len(conflict) == 4:
+                t, a, b, cell = conflict
+                branches = [(a, cell, t), (b, cell, t)]
+            else:
+                t, a, b, source, target = conflict
+                branches = [(a, source, target, t), (b, target, source, t)]
+            for constraint in branches:
+                child = constraints + (constraint,)
+                path = replan(constraint[0], child)
+                if path is None:
+                    continue
+                child_paths = list(paths)
+                child_paths[constraint[0]] = path
+                counter += 1
+                heapq.heappush(heap, (sum(len(p) - 1 for p in child_paths), counter, child, child_paths))
+        return None
+
+
+def plan_paths(blocked: np.ndarray, starts: Sequence[Cell], goals: Sequence[Cell],
+               method: str = 'cooperative', time_limit: Optional[float] = 5.0) -> Dict:
+    """Convenience wrapper around MultiAgentPlanner.plan()."""
+    return MultiAgentPlanner(blocked, time_limit).plan(starts, goals, method)
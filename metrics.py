@@ -0,0 +1,217 @@
+import bisect
+import cProfile
+import math
+import os
+import pstats
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Solve latency buckets in seconds: sub-millisecond heuristics up to long anytime runs
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Instance size label: the smallest bound the point count fits under
+SIZE_BOUNDS = (10, 100, 1000, 10000, 100000)
+
+# Functions listed in a profile breakdown
+PROFILE_TOP = 25
+
+# Only one profiler can be active per process on newer Pythons; profiled solves take turns
+_profile_lock = threading.Lock()
+
+# Collector: yields (metric name, labels, value) for values read at scrape time
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+
+def size_bucket(n: int) -> str:
+    """Instance size label, e.g. 250 -> 'le_1000', 200000 -> 'gt_100000'."""
+    for bound in SIZE_BOUNDS:
+        if n <= bound:
+            return f'le_{bound}'
+    return f'gt_{SIZE_BOUNDS[-1]}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_labels(self.label_names, key)} {_number(value)}' for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.bounds = tuple(sorted(buckets))
+        # label values -> [count per bucket (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.label_names)
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.bounds) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """
+    The metrics of one server process, rendered in Prometheus text format.
+
+    Counters and histograms are updated as requests come in; values other
+    objects already keep (queue depth, cache counters) are read from them
+    at scrape time by registered collectors. Every worker of a prefork server keeps its own
+    registry, so a scrape sees the worker that answered it; scrape each
+    worker or aggregate with sum() in the queries.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collected: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labels)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labels, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def collect(self, metrics: Dict[str, Tuple[str, str]], collector: Collector) -> None:
+        """
+        Register values read at scrape time.
+
+        Args:
+            metrics: Metric name -> (type, help text) for every name the
+                     collector yields; type is 'gauge' or 'counter'
+            collector: Yields (metric name, labels, value)
+        """
+        with self._lock:
+            self._collected.update(metrics)
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, collectors, collected = list(self._metrics), list(self._collectors), dict(self._collected)
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+
+        samples: Dict[str, List[str]] = {name: [] for name in collected}
+        for collector in collectors:
+            for name, labels, value in collector():
+                names = sorted(labels)
+                samples.setdefault(name, []).append(
+                    f'{name}{_labels(names, [labels[k] for k in names])} {_number(value)}')
+        for name, lines_for_metric in samples.items():
+            kind, documentation = collected.get(name, ('gauge', name))
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(lines_for_metric)
+        return '\n'.join(lines) + '\n'
+
+
+def profile_call(function: Callable, *args, top: int = PROFILE_TOP, **kwargs) -> Tuple[object, Dict]:
+    """
+    Run a call under cProfile.
+
+    Profiling slows down the pure-Python parts of a solve (local search,
+    branch and bound) more than the NumPy parts, so treat the breakdown as
+    relative, not as the cost of an unprofiled solve. Profiled calls run
+    one at a time.
+
+    Returns:
+        Tuple of (the call's return value, breakdown dict with 'total_time',
+        'total_calls' and 'functions': the `top` functions by cumulative
+        time, each with 'function', 'calls', 'primitive_calls', 'own_time'
+        and 'cumulative_time')
+    """
+    profiler = cProfile.Profile()
+    with _profile_lock:
+        result = profiler.runcall(function, *args, **kwargs)
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (primitive, calls, own, cumulative, _) in stats.stats.items():
+        module = os.path.basename(filename)
+        rows.append({
+            'function': f'{module}:{line}({name})' if line else name,
+            'calls': calls,
+            'primitive_calls': primitive,
+            'own_time': round(own, 6),
+            'cumulative_time': round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: row['cumulative_time'], reverse=True)
+    breakdown = {
+        'total_time': round(stats.total_tt, 6),
+        'total_calls': stats.total_calls,
+        'functions': rows[:top],
+    }
+    return result, breakdown
@@ -0,0 +1,127 @@
+import os
+import threading
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+# (shared memory name, shape, dtype string, owner's resource tracker) - small and
+# picklable, sent to workers
+SharedSpec = Tuple[str, Tuple[int, ...], str, Optional[Tuple[int, int]]]
+
+# Worker-side cache of attached blocks, keyed by name
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+# Long-lived pool of process_pool(), owned by the process that started it
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for work split up within one solve, one worker per CPU.
+
+    Started on first use and kept, so later calls skip the worker start-up
+    and imports. A forked child, or a pool whose worker died, gets a new one.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        # _broken is set once a worker dies; such a pool refuses all work
+        if _pool is None or _pool_pid != os.getpid() or _pool._broken:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _tracker_id() -> Optional[Tuple[int, int]]:
+    """
+    Identity of this process's resource tracker: device and inode of its pipe.
+
+    Forked children that inherit the tracker share the pipe, so they get the
+    same identity as their parent. None where there is no tracker (Windows).
+    """
+    if os.name != 'posix':
+        return None
+    info = os.fstat(resource_tracker.getfd())
+    return info.st_dev, info.st_ino
+
+
+class SharedArray:
+    """
+    Read-only NumPy array published to worker processes through shared memory.
+
+    The owner copies the array into a shared block once; workers attach to it
+    by name with ``attach_shared(spec)`` instead of receiving a pickled copy
+    with every task. Use as a context manager so the block is always unlinked.
+    """
+
+    def __init__(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)
+        view[...] = array
+        self.spec: SharedSpec = (self._shm.name, array.shape, array.dtype.str, _tracker_id())
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self) -> 'SharedArray':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _open_untracked(name: str, owner_tracker: Optional[Tuple[int, int]]) -> shared_memory.SharedMemory:
+    """
+    Attach to an existing block, leaving its cleanup to the owner's resource tracker.
+
+    Python 3.13 can attach untracked. Before that, attaching registers the
+    block as if this process had created it. A worker with a tracker of its
+    own would then report the block as leaked and unlink it when the worker
+    exits, so the registration is withdrawn again. A worker that shares the
+    owner's tracker keeps it: the tracker holds one entry per name, and
+    withdrawing it would drop the owner's registration.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    if owner_tracker is not None and _tracker_id() != owner_tracker:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def attach_shared(spec: SharedSpec) -> np.ndarray:
+    """
+    Read-only view of a SharedArray inside a worker (attached once per process).
+
+    The attachment stays cached for later tasks on the same block. Workers of
+    a long-lived pool must call detach_shared() when done, or every block
+    they ever saw stays mapped.
+    """
+    name, shape, dtype, owner_tracker = spec
+    if name not in _attached:
+        shm = _open_untracked(name, owner_tracker)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        array.flags.writeable = False
+        _attached[name] = (shm, array)
+    return _attached[name][1]
+
+
+def detach_shared(spec: SharedSpec) -> None:
+    """
+    Drop a worker's attachment to a SharedArray and unmap the block.
+
+    Every view returned by attach_shared() for it must be gone by now.
+    """
+    entry = _attached.pop(spec[0], None)
+    if entry is not None:
+        shm, array = entry
+        del array
+        shm.close()
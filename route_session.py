@@ -0,0 +1,420 @@
+import pickle
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+import numpy as np
+from distance_engine import METRICS, _SCALAR_METRICS
+from local_search import LocalSearch
+from storage import Connections
+from tsp_heuristics import TSPSolver
+
+# Neighbor list size for insertion and repair
+SESSION_NEIGHBORS = 10
+
+# Large enough that no local search move ever drops the fixed edge
+_PINNED = 1e18
+
+ROUTES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS route_sessions (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    touched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS route_sessions_touched ON route_sessions (touched_at);
+"""
+
+
+class SessionNotFound(Exception):
+    """Unknown, expired or deleted route session."""
+
+
+class RouteSession:
+    """
+    A robot's route that changes while the robot is driving it.
+
+    The route runs from the robot's position (stop 0) through the open stops
+    and, by default, back to where it started. Internally it is a closed
+    tour with an extra end city joined to the robot by a pinned edge, whose
+    huge negative length means no 2-opt or Or-opt move ever removes it; the
+    robot therefore stays at the head of the route. For open routes the end
+    city is a dummy at distance 0 from everything.
+
+    New stops go in by cheapest insertion and removed stops are cut out;
+    either way only the cities around the change are queued for 2-opt /
+    Or-opt repair, so an update costs milliseconds instead of a re-solve.
+    Stop ids are the indices of the initial points, then count up for added
+    stops; the end city's slot is skipped, so clients never see it.
+    Not thread-safe; RouteSessionStore serializes access.
+    """
+
+    def __init__(self, points: Sequence[Sequence[float]], tour: Sequence[int],
+                 metric: str = 'euclidean', return_to_start: bool = True,
+                 neighbors: int = SESSION_NEIGHBORS):
+        """
+        Args:
+            points: Robot position followed by the stops
+            tour: Closed tour over `points` starting at 0 (TSPSolver.solve output)
+            metric: Key of METRICS
+            return_to_start: Route ends back at the robot's starting point
+            neighbors: Neighbor list size
+        """
+        if metric not in METRICS:
+            raise ValueError(f'Unknown metric: {metric}')
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(points)
+        self.metric = metric
+        self.return_to_start = return_to_start
+        self.k = neighbors
+        self.end = n
+        self._coords = np.zeros((max(2 * (n + 1), 16), 2))
+        self._coords[:n] = points
+        self._coords[n] = points[0]
+        self._alive = np.zeros(len(self._coords), dtype=bool)
+        self._alive[:n + 1] = True
+        self._size = n + 1
+        self.visited: List[int] = []
+        self._bind_distance()
+
+        route = [int(i) for i in tour[:-1]] if tour and tour[0] == tour[-1] else [int(i) for i in tour]
+        if sorted(route) != list(range(n)) or route[0] != 0:
+            raise ValueError('Tour must visit every point once, starting at point 0')
+        self.tour = route + [self.end]
+        self.neighbors: List[List[int]] = [[] for _ in range(len(self._coords))]
+        for city in range(self._size):
+            self._refresh_neighbors(city)
+
+    def _distances_from(self, city: int) -> np.ndarray:
+        """Distance from a city to every city slot (inf for unused slots and the dummy end)."""
+        distances = METRICS[self.metric](self._coords[city], self._coords[:self._size])
+        distances[~self._alive[:self._size]] = np.inf
+        distances[city] = np.inf
+        if not self.return_to_start:
+            distances[self.end] = np.inf
+        return distances
+
+    def _refresh_neighbors(self, city: int) -> None:
+        if city == self.end and not self.return_to_start:
+            return
+        distances = self._distances_from(city)
+        k = min(self.k, int(np.isfinite(distances).sum()))
+        if k <= 0:
+            self.neighbors[city] = []
+            return
+        nearest = np.argpartition(distances, k - 1)[:k]
+        self.neighbors[city] = nearest[np.argsort(distances[nearest])].tolist()
+
+    def _grow(self) -> int:
+        """Slot for a new city, doubling the coordinate storage when full."""
+        if self._size == len(self._coords):
+            coords = np.zeros((2 * len(self._coords), 2))
+            coords[:self._size] = self._coords
+            alive = np.zeros(len(coords), dtype=bool)
+            alive[:self._size] = self._alive[:self._size]
+            self._coords, self._alive = coords, alive
+            self.neighbors.extend([] for _ in range(len(coords) - len(self.neighbors)))
+            self._bind_distance()
+        self._size += 1
+        return self._size - 1
+
+    def _bind_distance(self) -> None:
+        """Scalar distance d(i, j) over the current coordinate array, pinned edge included."""
+        scalar, coords, end = _SCALAR_METRICS[self.metric], self._coords, self.end
+        open_end = not self.return_to_start
+
+        def distance(i: int, j: int) -> float:
+            if (i == 0 and j == end) or (i == end and j == 0):
+                return -_PINNED
+            if open_end and (i == end or j == end):
+                return 0.0
+            return scalar(coords[i, 0], coords[i, 1], coords[j, 0], coords[j, 1])
+        self.d = distance
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        del state['d']
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._bind_distance()
+
+    def _repair(self, active: Sequence[int]) -> None:
+        self.tour = LocalSearch(self.tour, self.d, self.neighbors).run(active=active)
+
+    def _city(self, stop: int) -> int:
+        """City slot of a stop id (ids skip the end city)."""
+        return stop + 1 if stop >= self.end else stop
+
+    def _stop(self, city: int) -> int:
+        """Stop id of a city slot."""
+        return city - 1 if city > self.end else city
+
+    def _open_city(self, stop: int) -> int:
+        """City slot of an open stop on the route; KeyError for anything else."""
+        city = self._city(stop)
+        if stop <= 0 or city >= self._size or not self._alive[city]:
+            raise KeyError(f'Unknown stop: {stop}')
+        return city
+
+    def add(self, point: Sequence[float]) -> int:
+        """Insert a stop at its cheapest position and repair around it; returns its id."""
+        city = self._grow()
+        self._coords[city] = point
+        self._alive[city] = True
+        self._refresh_neighbors(city)
+        distances = self._distances_from(city)
+        for other in self.neighbors[city]:
+            # The new stop may displace the farthest entry of a neighbor's list
+            ranked = self.neighbors[other]
+            if len(ranked) < self.k or distances[other] < self.d(other, ranked[-1]):
+                ranked.append(city)
+                ranked.sort(key=lambda c: self.d(other, c))
+                del ranked[self.k:]
+
+        if len(self.tour) == 2:
+            self.tour = [0, city, self.end]
+            return self._stop(city)
+        n, d = len(self.tour), self.d
+        position = {c: i for i, c in enumerate(self.tour)}
+        # Candidate edges next to the nearest stops; the pinned edge is off limits
+        candidates = {position[c] for c in self.neighbors[city]}
+        candidates |= {(i - 1) % n for i in candidates}
+        candidates |= {position[0], (position[0] - 1) % n}
+        best, best_cost = None, np.inf
+        for i in candidates:
+            u, v = self.tour[i], self.tour[(i + 1) % n]
+            if {u, v} == {0, self.end}:
+                continue
+            cost = d(u, city) + d(city, v) - d(u, v)
+            if cost < best_cost:
+                best, best_cost = i, cost
+        u, v = self.tour[best], self.tour[(best + 1) % n]
+        self.tour.insert(best + 1, city)
+        self._repair([city, u, v])
+        return self._stop(city)
+
+    def remove(self, stop: int) -> None:
+        """Drop an open stop and repair around the gap."""
+        self._cut(self._open_city(stop))
+
+    def _cut(self, removed: int) -> None:
+        i = self.tour.index(removed)
+        u, v = self.tour[i - 1], self.tour[(i + 1) % len(self.tour)]
+        del self.tour[i]
+        self._alive[removed] = False
+        for city in range(self._size):
+            if removed in self.neighbors[city]:
+                self._refresh_neighbors(city)
+        self.neighbors[removed] = []
+        self._repair([u, v])
+
+    def visit(self, stop: int) -> None:
+        """The robot has reached `stop`: it becomes the robot's position and leaves the route."""
+        reached = self._open_city(stop)
+        self._cut(reached)
+        self._coords[0] = self._coords[reached]
+        self.visited.append(stop)
+        self._refresh_neighbors(0)
+        for city in self.neighbors[0]:
+            self._refresh_neighbors(city)
+        self._repair([0] + self.neighbors[0] + [self.tour[1], self.tour[-2]])
+
+    def order(self) -> List[int]:
+        """Cities of the open stops in driving order."""
+        i = self.tour.index(0)
+        n = len(self.tour)
+        step = -1 if self.tour[(i + 1) % n] == self.end else 1
+        return [self.tour[(i + step * k) % n] for k in range(1, n - 1)]
+
+    def state(self) -> Dict:
+        """Route from the robot's position: stop ids, coordinates and length."""
+        order = self.order()
+        cities = [0] + order + ([self.end] if self.return_to_start else [])
+        path = self._coords[cities]
+        if len(cities) > 1:
+            length = float(METRICS[self.metric](path[:-1], path[1:]).sum())
+        else:
+            length = 0.0
+        return {
+            'stops': [self._stop(city) for city in order],
+            'path': path.tolist(),
+            'total_distance': length,
+            'visited': list(self.visited),
+        }
+
+
+class RouteSessionStore:
+    """
+    In-process registry of route sessions, bounded in count and idle time.
+
+    Sessions live in the memory of one server process; a server with
+    several workers uses SharedRouteSessionStore instead.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600.0):
+        """
+        Args:
+            max_sessions: Sessions kept; the least recently used goes first
+            ttl: Seconds a session survives without being touched
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def create(self, points: Sequence[Sequence[float]], algorithm: str = 'nearest_neighbor',
+               improve=True, metric: str = 'euclidean', return_to_start: bool = True,
+               time_limit: Optional[float] = None, **params) -> Dict:
+        """
+        Solve the initial stops and open a session on the result.
+
+        Args:
+            points: Robot position followed by the stops
+            algorithm, improve, time_limit, **params: As TSPSolver.solve()
+            metric: Key of METRICS
+            return_to_start: Route ends back at the robot's starting point
+
+        Returns:
+            Dict with 'route_id' plus the session state
+        """
+        if len(points) < 2:
+            tour = [0, 0]
+        else:
+            solver = TSPSolver(points, metric=metric)
+            tour = solver.solve(algorithm, improve=improve, time_limit=time_limit, **params)['tour']
+        session = RouteSession(points, tour, metric=metric, return_to_start=return_to_start)
+        route_id = str(uuid.uuid4())
+        self._insert(route_id, session)
+        return dict(session.state(), route_id=route_id)
+
+    def _insert(self, route_id: str, session: RouteSession) -> None:
+        with self._lock:
+            self._evict()
+            self._sessions[route_id] = {'session': session, 'lock': threading.Lock(),
+                                        'touched_at': time.monotonic()}
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for route_id in [i for i, entry in self._sessions.items() if now - entry['touched_at'] > self.ttl]:
+            del self._sessions[route_id]
+        while len(self._sessions) >= self.max_sessions:
+            oldest = min(self._sessions, key=lambda i: self._sessions[i]['touched_at'])
+            del self._sessions[oldest]
+
+    def _entry(self, route_id: str) -> Dict:
+        with self._lock:
+            entry = self._sessions.get(route_id)
+            if entry is None or time.monotonic() - entry['touched_at'] > self.ttl:
+                self._sessions.pop(route_id, None)
+                raise SessionNotFound(route_id)
+            entry['touched_at'] = time.monotonic()
+            return entry
+
+    @contextmanager
+    def _session(self, route_id: str) -> Iterator[RouteSession]:
+        """The session, held exclusively for the duration of the block."""
+        entry = self._entry(route_id)
+        with entry['lock']:
+            yield entry['session']
+
+    def update(self, route_id: str, add: Sequence[Sequence[float]] = (), remove: Sequence[int] = (),
+               visit: Optional[int] = None) -> Dict:
+        """
+        Apply changes to a session: visit first, then removals, then additions.
+
+        Returns:
+            Dict with the session state plus 'added' (ids of the new stops)
+
+        Raises:
+            SessionNotFound: Unknown or expired session
+            KeyError: A stop to remove or visit is not on the route
+        """
+        with self._session(route_id) as session:
+            if visit is not None:
+                session.visit(int(visit))
+            for stop in remove:
+                session.remove(int(stop))
+            added = [session.add([float(point[0]), float(point[1])]) for point in add]
+            return dict(session.state(), route_id=route_id, added=added)
+
+    def get(self, route_id: str) -> Dict:
+        with self._session(route_id) as session:
+            return dict(session.state(), route_id=route_id)
+
+    def delete(self, route_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(route_id, None) is not None
+
+
+class SharedRouteSessionStore(RouteSessionStore):
+    """
+    Route sessions in SQLite, shared by all worker processes of the server.
+
+    Each session is a pickled row. An update loads it, applies the changes
+    and writes it back inside one write transaction, so concurrent updates
+    from different workers are serialized and a failed update (unknown
+    stop) leaves the session as it was. Reads only bump the idle timer.
+    """
+
+    def __init__(self, path: str, max_sessions: int = 1000, ttl: float = 3600.0):
+        """
+        Args:
+            path: SQLite database file, the same for every worker
+            max_sessions: Sessions kept; the least recently used goes first
+            ttl: Seconds a session survives without being touched
+        """
+        super().__init__(max_sessions=max_sessions, ttl=ttl)
+        self.path = path
+        self._db = Connections(path, ROUTES_SCHEMA)
+
+    def __len__(self) -> int:
+        return self._db.get().execute('SELECT COUNT(*) FROM route_sessions WHERE touched_at >= ?',
+                                      (time.time() - self.ttl,)).fetchone()[0]
+
+    def _insert(self, route_id: str, session: RouteSession) -> None:
+        db = self._db.get()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('DELETE FROM route_sessions WHERE touched_at < ?', (time.time() - self.ttl,))
+            excess = db.execute('SELECT COUNT(*) FROM route_sessions').fetchone()[0] - self.max_sessions + 1
+            if excess > 0:
+                db.execute('DELETE FROM route_sessions WHERE id IN (SELECT id FROM route_sessions'
+                           ' ORDER BY touched_at LIMIT ?)', (excess,))
+            db.execute('INSERT INTO route_sessions VALUES (?, ?, ?)',
+                       (route_id, pickle.dumps(session), time.time()))
+
+    def get(self, route_id: str) -> Dict:
+        with self._session(route_id, modify=False) as session:
+            return dict(session.state(), route_id=route_id)
+
+    @contextmanager
+    def _session(self, route_id: str, modify: bool = True) -> Iterator[RouteSession]:
+        """The session, locked by a write transaction; only the idle timer is saved unless `modify`."""
+        db = self._db.get()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute('SELECT data, touched_at FROM route_sessions WHERE id = ?', (route_id,)).fetchone()
+            now = time.time()
+            if row is None or now - row[1] > self.ttl:
+                raise SessionNotFound(route_id)
+            session = pickle.loads(row[0])
+            yield session
+            if modify:
+                db.execute('UPDATE route_sessions SET data = ?, touched_at = ? WHERE id = ?',
+                           (pickle.dumps(session), now, route_id))
+            else:
+                db.execute('UPDATE route_sessions SET touched_at = ? WHERE id = ?', (now, route_id))
+
+    def delete(self, route_id: str) -> bool:
+        db = self._db.get()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            deleted = db.execute('DELETE FROM route_sessions WHERE id = ? AND touched_at >= ?',
+                                 (route_id, time.time() - self.ttl)).rowcount
+        return deleted > 0
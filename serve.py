@@ -0,0 +1,158 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('serve')
+
+# Seconds to wait before replacing a worker that died, so a crash loop does not spin
+RESPAWN_DELAY = 1.0
+
+
+def _parse_bind(bind: str):
+    host, _, port = bind.rpartition(':')
+    return host.strip('[]') or '127.0.0.1', int(port)
+
+
+def _load_app(config: Dict):
+    """Import the app and warm up the solvers in this (parent) process."""
+    import app as warehouse
+    application = warehouse.create_app(config)
+    start_time = time.perf_counter()
+    warehouse.warm_up()
+    logger.info('Solvers warmed up in %.2fs', time.perf_counter() - start_time)
+    return application
+
+
+def serve_gunicorn(bind: str, workers: int, threads: int, timeout: int, config: Dict) -> None:
+    """Run under gunicorn: preloaded app, threaded workers."""
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', [bind])
+            self.cfg.set('workers', workers)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('timeout', timeout)
+            self.cfg.set('preload_app', True)
+
+        def load(self):
+            return _load_app(config)
+
+    Server().run()
+
+
+def _run_worker(listener: socket.socket, application, host: str, port: int) -> None:
+    """Child process: serve requests from the shared listening socket until terminated."""
+    from werkzeug.serving import make_server
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = make_server(host, port, application, threaded=True, fd=listener.fileno())
+    server.serve_forever()
+
+
+def serve_prefork(bind: str, workers: int, config: Dict, backlog: int = 1024) -> None:
+    """
+    Fallback without gunicorn: fork workers that share one listening socket.
+
+    The parent loads the app and warms up the solvers, opens the socket,
+    then forks; the kernel spreads incoming connections over the workers'
+    accept() calls. Each worker runs werkzeug's threaded server, bounded
+    by the app's MAX_CONCURRENT_REQUESTS. Workers that die are replaced;
+    SIGTERM or SIGINT stops them all.
+    """
+    if not hasattr(os, 'fork'):
+        raise RuntimeError('The built-in prefork server needs os.fork(); install gunicorn or use app.py')
+    host, port = _parse_bind(bind)
+    application = _load_app(config)
+
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    listener = socket.socket(family, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    logger.info('Listening on http://%s:%d with %d workers', host, port, workers)
+
+    children: List[int] = []
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _run_worker(listener, application, host, port)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in children:
+            continue
+        children.remove(pid)
+        if not stopping:
+            logger.warning('Worker %d exited (code %d); starting a new one', pid, os.waitstatus_to_exitcode(status))
+            time.sleep(RESPAWN_DELAY)
+            if not stopping:
+                spawn()
+    listener.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run the warehouse path optimizer with pre-forked workers.')
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port to listen on')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker (gunicorn)')
+    parser.add_argument('--timeout', type=int, default=120, help='Seconds before gunicorn restarts a silent worker')
+    parser.add_argument('--max-body', type=int, help='Largest request body in bytes')
+    parser.add_argument('--max-concurrent', type=int, help='Requests served at once per worker (0 = no cap)')
+    parser.add_argument('--no-gunicorn', action='store_true', help='Use the built-in prefork server')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s[%(process)d]: %(message)s')
+    config = {}
+    if args.max_body is not None:
+        config['MAX_CONTENT_LENGTH'] = args.max_body
+    if args.max_concurrent is not None:
+        config['MAX_CONCURRENT_REQUESTS'] = args.max_concurrent
+
+    use_gunicorn = not args.no_gunicorn
+    if use_gunicorn:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            use_gunicorn = False
+            logger.info('gunicorn is not installed; using the built-in prefork server')
+    if use_gunicorn:
+        serve_gunicorn(args.bind, args.workers, args.threads, args.timeout, config)
+    else:
+        serve_prefork(args.bind, args.workers, config)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+# Rough per-entry bookkeeping cost (dict, key string, list headers) in bytes
+ENTRY_OVERHEAD = 512
+
+
+class CanonicalInstance(NamedTuple):
+    """A request mapped to its cache key; order[c] is the request index of canonical point c."""
+    key: str
+    order: np.ndarray
+    points: np.ndarray
+
+
+class SolutionCache:
+    """
+    LRU + TTL cache of solved tours, keyed on a canonical form of the instance.
+
+    Coordinates are quantized to a grid of `quantum` and sorted, so the same
+    pick list matches whatever order the points arrive in (and coordinates
+    that differ by less than the quantum match too). The algorithm options
+    are part of the key. Tours are stored over canonical indices and mapped
+    back onto the order of each request on a hit.
+
+    Memory is capped at roughly `max_bytes`: least recently used entries are
+    evicted first, and entries older than `ttl` seconds are dropped when
+    touched. Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = 3600.0,
+                 quantum: float = 1e-3):
+        """
+        Args:
+            max_bytes: Approximate memory cap for cached tours
+            ttl: Seconds an entry stays valid (None = until evicted)
+            quantum: Coordinate resolution used for matching
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.quantum = quantum
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def canonicalize(self, points: List[List[float]], **options) -> CanonicalInstance:
+        """
+        Args:
+            points: Request points, in request order
+            **options: Everything else that determines the answer (algorithm,
+                       metric, parameters); must be JSON serializable
+
+        Returns:
+            CanonicalInstance with the cache key and the canonical ordering
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        grid = np.round(points / self.quantum).astype(np.int64)
+        order = np.lexsort((grid[:, 1], grid[:, 0]))
+        digest = hashlib.blake2b(grid[order].tobytes(), digest_size=16)
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+        return CanonicalInstance(f'{len(points)}:{digest.hexdigest()}', order, points)
+
+    def get(self, instance: CanonicalInstance) -> Optional[Dict]:
+        """
+        Cached result remapped onto the request, or None on a miss.
+
+        Returns:
+            Dict like TSPSolver.solve(): 'path', 'tour' (closed, request
+            indices, starting at point 0), 'total_distance' plus any extra
+            fields that were stored
+        """
+        with self._lock:
+            entry = self._entries.get(instance.key)
+            if entry is not None and self.ttl is not None and time.monotonic() > entry['expires_at']:
+                self._remove(instance.key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(instance.key)
+            self.hits += 1
+
+        tour = instance.order[entry['tour']]
+        tour = np.roll(tour, -int(np.flatnonzero(tour == 0)[0])).tolist()
+        tour.append(tour[0])
+        result = dict(entry['info'])
+        result.update({
+            'path': instance.points[tour].tolist(),
+            'tour': tour,
+            'total_distance': entry['total_distance'],
+        })
+        return result
+
+    def put(self, instance: CanonicalInstance, result: Dict) -> None:
+        """
+        Store a solve result for the instance.
+
+        Args:
+            instance: From canonicalize() for the same request
+            result: TSPSolver.solve() output ('tour' over request indices)
+        """
+        rank = np.empty(len(instance.order), dtype=np.int32)
+        rank[instance.order] = np.arange(len(instance.order), dtype=np.int32)
+        tour = rank[np.asarray(result['tour'][:-1], dtype=np.intp)]
+        info = {k: v for k, v in result.items() if k not in ('path', 'tour', 'total_distance')}
+        nbytes = tour.nbytes + ENTRY_OVERHEAD
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if instance.key in self._entries:
+                self._remove(instance.key)
+            self._entries[instance.key] = {
+                'tour': tour,
+                'total_distance': result['total_distance'],
+                'info': info,
+                'nbytes': nbytes,
+                'expires_at': None if self.ttl is None else time.monotonic() + self.ttl,
+            }
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self.nbytes -= self._entries.pop(key)['nbytes']
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,298 @@
+import math
+import numpy as np
+from typing import List, Optional, Tuple
+from distance_engine import METRICS
+
+# Scalar distances from coordinate deltas for the built-in metrics. Applied to
+# the gap between a query and a node's bounding box they give an exact lower
+# bound for every point in the node, which is what makes pruning safe.
+_POINT_DISTANCE = {
+    'euclidean': lambda dx, dy: math.sqrt(dx * dx + dy * dy),
+    'manhattan': lambda dx, dy: abs(dx) + abs(dy),
+    'chebyshev': lambda dx, dy: max(abs(dx), abs(dy)),
+}
+
+
+class KDTree:
+    """
+    Bucketed 2D k-d tree with deletion and exact nearest-neighbor queries.
+
+    The tree is built once with NumPy (median splits on the wider axis) and
+    then stored as flat Python lists, which are much cheaper to walk from
+    Python than NumPy arrays. Every node keeps its bounding box and a count
+    of live points below it; deleting a point removes it from its leaf bucket
+    and decrements the counts on the way to the root, so empty subtrees are
+    skipped by later queries. Memory is O(n).
+    """
+
+    def __init__(self, points: np.ndarray, metric: str = 'euclidean',
+                 ids: Optional[np.ndarray] = None, leaf_size: int = 16):
+        """
+        Args:
+            points: (n, 2) array of coordinates
+            metric: Name of a built-in metric from distance_engine.METRICS
+            ids: Subset of point indices to index (default: all)
+            leaf_size: Maximum number of points per leaf bucket
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Spatial index does not support metric: {metric}")
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.metric_name = metric
+        self._distance = _POINT_DISTANCE[metric]
+        self.xs = self.points[:, 0].tolist()
+        self.ys = self.points[:, 1].tolist()
+        self.leaf_size = max(1, leaf_size)
+
+        if ids is None:
+            ids = np.arange(len(self.points))
+        ids = np.asarray(ids, dtype=np.intp)
+        self.alive_count = len(ids)
+
+        # Flat node storage
+        self.left: List[int] = []
+        self.right: List[int] = []
+        self.parent: List[int] = []
+        self.count: List[int] = []
+        self.box: List[Tuple[float, float, float, float]] = []
+        self.bucket: List[Optional[List[int]]] = []
+        self.leaf_of = [-1] * len(self.points)
+        if len(ids):
+            self._build(ids, -1)
+
+    def __len__(self) -> int:
+        return self.alive_count
+
+    def __contains__(self, index: int) -> bool:
+        return self.leaf_of[index] >= 0
+
+    def _build(self, ids: np.ndarray, parent: int) -> int:
+        """Recursively build the subtree over ids and return its node id."""
+        node = len(self.left)
+        coords = self.points[ids]
+        lo = coords.min(axis=0)
+        hi = coords.max(axis=0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.parent.append(parent)
+        self.count.append(len(ids))
+        self.box.append((float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])))
+
+        if len(ids) <= self.leaf_size:
+            bucket = ids.tolist()
+            self.bucket.append(bucket)
+            for i in bucket:
+                self.leaf_of[i] = node
+            return node
+
+        self.bucket.append(None)
+        axis = 0 if hi[0] - lo[0] >= hi[1] - lo[1] else 1
+        half = len(ids) // 2
+        order = np.argpartition(coords[:, axis], half)
+        self.left[node] = self._build(ids[order[:half]], node)
+        self.right[node] = self._build(ids[order[half:]], node)
+        return node
+
+    def remove(self, index: int) -> None:
+        """Delete a point from the index."""
+        node = self.leaf_of[index]
+        if node < 0:
+            return
+        self.leaf_of[index] = -1
+        self.bucket[node].remove(index)
+        self.alive_count -= 1
+        count = self.count
+        parent = self.parent
+        while node >= 0:
+            count[node] -= 1
+            node = parent[node]
+
+    def nearest(self, x: float, y: float, exclude: int = -1) -> Tuple[int, float]:
+        """
+        Find the nearest live point to (x, y).
+
+        Args:
+            x, y: Query location
+            exclude: Point index to skip (e.g. the query point itself)
+
+        Returns:
+            Tuple of (point index, distance), or (-1, inf) if nothing is left
+        """
+        best_index, best_distance = -1, float('inf')
+        if not self.count or self.count[0] == 0:
+            return best_index, best_distance
+
+        xs, ys, distance = self.xs, self.ys, self._distance
+        left, right, count, bucket, box = self.left, self.right, self.count, self.bucket, self.box
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if bound >= best_distance or count[node] == 0:
+                continue
+            points = bucket[node]
+            if points is not None:
+                for i in points:
+                    if i == exclude:
+                        continue
+                    d = distance(xs[i] - x, ys[i] - y)
+                    if d < best_distance:
+                        best_index, best_distance = i, d
+                continue
+            a, b = left[node], right[node]
+            ax0, ay0, ax1, ay1 = box[a]
+            bx0, by0, bx1, by1 = box[b]
+            da = distance(ax0 - x if x < ax0 else (x - ax1 if x > ax1 else 0.0),
+                          ay0 - y if y < ay0 else (y - ay1 if y > ay1 else 0.0))
+            db = distance(bx0 - x if x < bx0 else (x - bx1 if x > bx1 else 0.0),
+                          by0 - y if y < by0 else (y - by1 if y > by1 else 0.0))
+            # Push the farther child first so the nearer one is explored first
+            if da <= db:
+                stack.append((b, db))
+                stack.append((a, da))
+            else:
+                stack.append((a, da))
+                stack.append((b, db))
+        return best_index, best_distance
+
+    def k_nearest(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest neighbors of every indexed point (excluding itself).
+
+        Works one leaf bucket at a time: the leaf's points are compared with
+        the smallest enclosing subtree holding more than k points, which
+        bounds the k-th distance, and then with every leaf whose box lies
+        within that bound. Both steps are single NumPy blocks.
+
+        Returns:
+            Tuple of (n, k) int32 neighbor indices and (n, k) float64
+            distances, each row sorted by distance. Rows of points that are
+            not indexed are left at -1 / inf.
+        """
+        n = len(self.points)
+        k = max(1, min(k, self.alive_count - 1))
+        neighbors = np.full((n, k), -1, dtype=np.int32)
+        distances = np.full((n, k), np.inf)
+        if self.alive_count < 2:
+            return neighbors, distances
+
+        metric = METRICS[self.metric_name]
+        for leaf, members in enumerate(self.bucket):
+            if not members:
+                continue
+            members = np.asarray(members, dtype=np.intp)
+
+            # Upper bound on the k-th distance from the nearest big-enough subtree
+            node = leaf
+            while self.count[node] <= k and self.parent[node] >= 0:
+                node = self.parent[node]
+            candidates = self._collect(node)
+            block = metric(self.points[members][:, None, :], self.points[candidates][None, :, :])
+            block[candidates[None, :] == members[:, None]] = np.inf
+            kk = min(k, len(candidates) - 1)
+            bound = float(np.partition(block, kk - 1, axis=1)[:, kk - 1].max())
+
+            # Exact answer from every leaf that can hold a closer point
+            candidates = self._collect_within(leaf, bound)
+            block = metric(self.points[members][:, None, :], self.points[candidates][None, :, :])
+            block[candidates[None, :] == members[:, None]] = np.inf
+            part = np.argpartition(block, kk - 1, axis=1)[:, :kk]
+            part_d = np.take_along_axis(block, part, axis=1)
+            order = np.argsort(part_d, axis=1, kind='stable')
+            neighbors[members, :kk] = candidates[np.take_along_axis(part, order, axis=1)]
+            distances[members, :kk] = np.take_along_axis(part_d, order, axis=1)
+        return neighbors, distances
+
+    def _collect(self, node: int) -> np.ndarray:
+        """All live point ids below a node."""
+        ids: List[int] = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if self.bucket[node] is not None:
+                ids.extend(self.bucket[node])
+            elif self.count[node]:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+        return np.asarray(ids, dtype=np.intp)
+
+    def _collect_within(self, leaf: int, radius: float) -> np.ndarray:
+        """Live point ids in every leaf whose box is within radius of the given leaf's box."""
+        lx0, ly0, lx1, ly1 = self.box[leaf]
+        distance = self._distance
+        ids: List[int] = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if self.count[node] == 0:
+                continue
+            x0, y0, x1, y1 = self.box[node]
+            gap = distance(max(0.0, x0 - lx1, lx0 - x1), max(0.0, y0 - ly1, ly0 - y1))
+            if gap > radius:
+                continue
+            if self.bucket[node] is not None:
+                ids.extend(self.bucket[node])
+            else:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+        return np.asarray(ids, dtype=np.intp)
+
+
+def nearest_neighbor_tour(points: np.ndarray, start_index: int = 0, metric: str = 'euclidean') -> List[int]:
+    """
+    Nearest-neighbor construction backed by a KDTree.
+
+    Each visited point is deleted from the tree, so every step is a single
+    nearest-live-point query. No distance matrix is built.
+
+    Returns:
+        Open visiting order starting at start_index (without the return edge)
+    """
+    tree = KDTree(points, metric=metric)
+    xs, ys = tree.xs, tree.ys
+    tour = [start_index]
+    tree.remove(start_index)
+    current = start_index
+    for _ in range(len(tree.xs) - 1):
+        current, _ = tree.nearest(xs[current], ys[current])
+        tree.remove(current)
+        tour.append(current)
+    return tour
+
+
+def hilbert_order(points: np.ndarray, bits: int = 16) -> np.ndarray:
+    """
+    Order of the points along a Hilbert curve over their bounding box.
+
+    Coordinates are scaled onto a 2^bits x 2^bits grid and every point's
+    distance along the curve is computed bit by bit, vectorized over all
+    points. Points close on the curve are close in the plane, so
+    consecutive runs of the order make compact buckets. O(n log n).
+
+    Args:
+        points: (n, 2) array of coordinates
+        bits: Grid resolution per axis (at most 31)
+
+    Returns:
+        (n,) int64 array of point indices in curve order
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        return np.zeros(0, dtype=np.int64)
+    side = 1 << bits
+    low = points.min(axis=0)
+    span = float((points.max(axis=0) - low).max()) or 1.0
+    grid = np.minimum(((points - low) / span * side).astype(np.int64), side - 1)
+    x, y = grid[:, 0].copy(), grid[:, 1].copy()
+    d = np.zeros(len(points), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotate the quadrant so the sub-curve has the standard orientation
+        flip = ~ry & rx
+        x[flip] = side - 1 - x[flip]
+        y[flip] = side - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap].copy()
+        s >>= 1
+    return np.argsort(d, kind='stable')
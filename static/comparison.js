@@ -84,28 +84,40 @@ class AlgorithmComparisonApp {
         const results = {};
         const points = this.currentPoints.map(p => [p.x, p.y]);
 
-        for (let i = 0; i < this.algorithms.length; i++) {
-            const algorithm = this.algorithms[i];
-            this.updateProgress(i, this.algorithms.length);
+        // All algorithms run in parallel on the server against one shared distance matrix
+        for (const algorithm of this.algorithms) {
             this.updateComparisonTableRow(algorithm.id, 'running');
+        }
 
-            try {
-                const result = await this.runSingleAlgorithm(points, algorithm.id);
-                results[algorithm.id] = {
-                    ...result,
-                    name: algorithm.name,
-                    status: 'completed'
-                };
-            } catch (error) {
-                console.error(`Error running ${algorithm.name}:`, error);
+        try {
+            const comparison = await this.runAllAlgorithms(points, this.algorithms.map(a => a.id));
+            for (const algorithm of this.algorithms) {
+                const result = comparison.results[algorithm.id] || { error: 'No result returned' };
+                if (result.error) {
+                    results[algorithm.id] = {
+                        name: algorithm.name,
+                        status: 'failed',
+                        error: result.error
+                    };
+                } else {
+                    results[algorithm.id] = {
+                        ...result,
+                        name: algorithm.name,
+                        status: 'completed'
+                    };
+                }
+            }
+        } catch (error) {
+            console.error('Error running comparison:', error);
+            for (const algorithm of this.algorithms) {
                 results[algorithm.id] = {
                     name: algorithm.name,
                     status: 'failed',
                     error: error.message
                 };
             }
-            await this.sleep(200);
         }
+        this.updateProgress(this.algorithms.length, this.algorithms.length);
 
         this.comparisonResults = results;
         this.calculatePerformanceMetrics();
@@ -166,6 +178,8 @@ class AlgorithmComparisonApp {
                 <td>${data.name}</td>
                 <td>${data.total_distance.toFixed(2)}</td>
                 <td>${data.execution_time.toFixed(4)}</td>
+                <td>${data.cpu_time !== undefined ? data.cpu_time.toFixed(4) : 'N/A'}</td>
+                <td>${data.peak_memory != null ? (data.peak_memory / (1024 * 1024)).toFixed(2) : 'N/A'}</td>
                 <td>${data.efficiency_score}%</td>
                 <td>${performanceBadge}</td>
                 <td>${statusBadge}</td>
@@ -173,13 +187,13 @@ class AlgorithmComparisonApp {
         } else if (status === 'failed') {
             row.innerHTML = `
                 <td>${data.name}</td>
-                <td colspan="4">❌ ${data.error || 'Failed to run algorithm'}</td>
+                <td colspan="6">❌ ${data.error || 'Failed to run algorithm'}</td>
                 <td>${statusBadge}</td>
             `;
         } else {
             row.innerHTML = `
                 <td>${data.name || algorithmId}</td>
-                <td colspan="4">Running...</td>
+                <td colspan="6">Running...</td>
                 <td>${statusBadge}</td>
             `;
         }
@@ -245,15 +259,15 @@ class AlgorithmComparisonApp {
         this.updateLastUpdated();
     }
 
-    async runSingleAlgorithm(points, algorithm) {
-        const response = await fetch('/solve_tsp', {
+    async runAllAlgorithms(points, algorithms) {
+        const response = await fetch('/compare', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ points, algorithm })
+            body: JSON.stringify({ points, algorithms })
         });
 
         const result = await response.json();
-        if (!response.ok) throw new Error(result.error || 'Algorithm failed');
+        if (!response.ok) throw new Error(result.error || 'Comparison failed');
         return result;
     }
 
@@ -264,7 +278,7 @@ class AlgorithmComparisonApp {
     updateProgress(current, total) {
         const percent = Math.round((current / total) * 100);
         this.progressFill.style.width = `${percent}%`;
-        this.progressText.textContent = current === total ? 'Completed!' : `Running ${current + 1} of ${total}...`;
+        this.progressText.textContent = current === total ? 'Completed!' : `Running ${total} algorithms in parallel...`;
     }
 
     loadSampleData() {
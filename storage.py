@@ -0,0 +1,324 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+# Layout tags: how a maze arrived, so it can be handed back the same way
+CELLS, BOOL, NUMERIC = 'cells', 'bool', 'numeric'
+
+# Rough per-row cost (keys, JSON fields, index entries) in bytes
+ROW_OVERHEAD = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mazes (
+    id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    layout TEXT NOT NULL,
+    height INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    bits INTEGER NOT NULL,
+    grid BLOB NOT NULL,
+    robots TEXT,
+    deliveries TEXT,
+    timestamp TEXT NOT NULL,
+    accessed_at REAL NOT NULL,
+    nbytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS simulations (
+    id TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    accessed_at REAL NOT NULL,
+    nbytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mazes_accessed ON mazes (accessed_at);
+CREATE INDEX IF NOT EXISTS simulations_accessed ON simulations (accessed_at);
+"""
+
+
+def grid_values(maze) -> Tuple[str, np.ndarray]:
+    """
+    Reduce a maze from one of the frontends to small integers per cell.
+
+    maze.html cells keep their wall (bit 0) and delivery (bit 1) flags; the
+    other cell fields are runtime state. Boolean grids and multi.html's
+    numeric grids (0 blocked, 1 walkable, 2 node, ...) keep their values.
+
+    Returns:
+        Tuple of (layout tag, (height, width) uint8 array indexed [y, x])
+    """
+    if isinstance(maze, np.ndarray):
+        return BOOL, maze.astype(np.uint8)
+    if not maze or not maze[0]:
+        raise ValueError('Maze must be a non-empty 2D grid')
+    first = maze[0][0]
+    if isinstance(first, dict):
+        values = np.array([[bool(cell.get('wall')) | bool(cell.get('delivery')) << 1 for cell in column]
+                           for column in maze], dtype=np.uint8)
+        return CELLS, values.T
+    if isinstance(first, bool):
+        return BOOL, np.array(maze, dtype=np.uint8)
+    values = np.array(maze, dtype=np.float64)
+    if values.ndim != 2 or values.min() < 0 or values.max() > 255 or not np.all(values == np.round(values)):
+        raise ValueError('Numeric maze cells must be integers between 0 and 255')
+    return NUMERIC, values.astype(np.uint8)
+
+
+def blocked_cells(layout: str, values: np.ndarray) -> np.ndarray:
+    """Obstacle grid (True = blocked), matching grid_paths.occupancy_grid()."""
+    if layout == CELLS:
+        return (values & 1).astype(bool)
+    if layout == BOOL:
+        return values.astype(bool)
+    return values < 1
+
+
+def maze_layout(layout: str, values: np.ndarray):
+    """Rebuild the JSON maze in the layout it was saved in."""
+    if layout == CELLS:
+        return [[{'wall': bool(v & 1), 'robot': -1, 'start': -1, 'delivery': bool(v & 2),
+                  'visited': False, 'path': False} for v in column] for column in values.T.tolist()]
+    if layout == BOOL:
+        return values.astype(bool).tolist()
+    return values.tolist()
+
+
+def pack_grid(values: np.ndarray) -> Tuple[bytes, int]:
+    """
+    Bit-plane encode a uint8 grid, then deflate it.
+
+    A wall grid takes one bit per cell before compression; deflate then
+    collapses the long runs of open floor and solid racks.
+
+    Returns:
+        Tuple of (payload, bits per cell)
+    """
+    bits = max(1, int(values.max()).bit_length()) if values.size else 1
+    planes = np.stack([(values >> b) & 1 for b in range(bits)]).astype(bool)
+    return zlib.compress(np.packbits(planes).tobytes()), bits
+
+
+def unpack_grid(payload: bytes, bits: int, height: int, width: int) -> np.ndarray:
+    """Inverse of pack_grid()."""
+    flat = np.unpackbits(np.frombuffer(zlib.decompress(payload), dtype=np.uint8),
+                         count=bits * height * width)
+    planes = flat.reshape(bits, height, width)
+    values = np.zeros((height, width), dtype=np.uint8)
+    for b in range(bits):
+        values |= planes[b] << b
+    return values
+
+
+class Connections:
+    """
+    One SQLite connection per thread, reopened after a fork.
+
+    Connections run in autocommit mode with WAL journaling, so readers in
+    other processes never wait for a writer; writes group their statements
+    in ``with db: db.execute('BEGIN IMMEDIATE')``.
+    """
+
+    def __init__(self, path: str, schema: str):
+        """
+        Args:
+            path: SQLite database file
+            schema: CREATE ... IF NOT EXISTS statements run on every new connection
+        """
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(self.schema)
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+
+class Storage:
+    """
+    Persistent store for mazes and simulation results on SQLite.
+
+    Every process opens its own connections, so all workers of a prefork
+    server see the same mazes. Grids are stored bit-packed and deflated;
+    robots, deliveries and results as JSON. Each process keeps a small LRU
+    of decoded mazes, checked against the row's version on every lookup, so
+    a maze updated by another worker is reloaded. When the stored rows
+    exceed `max_bytes`, the least recently used mazes and simulations are
+    deleted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, cache_size: int = 32):
+        """
+        Args:
+            path: SQLite database file (':memory:' is per connection, so
+                  only suitable for a single-threaded process)
+            max_bytes: Approximate cap on stored mazes plus simulations
+            cache_size: Decoded mazes kept in memory per process
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.cache_size = cache_size
+        self._db = Connections(path, SCHEMA)
+        self._cache: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._connection()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connection for this thread, reopened after a fork."""
+        return self._db.get()
+
+    def save_maze(self, maze, robots=None, deliveries=None, maze_id: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Store a maze, or replace it when `maze_id` names an existing one.
+
+        Returns:
+            Tuple of (maze id, whether an existing maze was replaced)
+
+        Raises:
+            ValueError: The maze is not a grid this store can encode
+        """
+        layout, values = grid_values(maze)
+        payload, bits = pack_grid(values)
+        robots_json, deliveries_json = json.dumps(robots), json.dumps(deliveries)
+        nbytes = len(payload) + len(robots_json) + len(deliveries_json) + ROW_OVERHEAD
+        height, width = values.shape
+        now = time.time()
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = None
+            if maze_id is not None:
+                row = db.execute('SELECT version FROM mazes WHERE id = ?', (maze_id,)).fetchone()
+            if row is None:
+                maze_id = str(uuid.uuid4())
+            db.execute('INSERT OR REPLACE INTO mazes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                       (maze_id, row[0] + 1 if row else 1, layout, height, width, bits, payload,
+                        robots_json, deliveries_json, datetime.now().isoformat(), now, nbytes))
+            self._evict(db)
+        with self._lock:
+            self._cache.pop(maze_id, None)
+        return maze_id, row is not None
+
+    def get_maze(self, maze_id: str) -> Optional[Dict]:
+        """
+        A saved maze, decoded.
+
+        Returns:
+            Dict with 'id', 'version', 'layout', 'values' (uint8 grid [y, x]),
+            'blocked' (bool grid [y, x]), 'robots', 'deliveries' and
+            'timestamp', or None if unknown
+        """
+        db = self._connection()
+        row = db.execute('SELECT version FROM mazes WHERE id = ?', (maze_id,)).fetchone()
+        if row is None:
+            with self._lock:
+                self._cache.pop(maze_id, None)
+            return None
+        db.execute('UPDATE mazes SET accessed_at = ? WHERE id = ?', (time.time(), maze_id))
+        with self._lock:
+            entry = self._cache.get(maze_id)
+            if entry is not None and entry['version'] == row[0]:
+                self._cache.move_to_end(maze_id)
+                return entry
+
+        row = db.execute('SELECT version, layout, height, width, bits, grid, robots, deliveries, timestamp '
+                         'FROM mazes WHERE id = ?', (maze_id,)).fetchone()
+        if row is None:
+            return None
+        version, layout, height, width, bits, payload, robots, deliveries, timestamp = row
+        values = unpack_grid(payload, bits, height, width)
+        entry = {
+            'id': maze_id,
+            'version': version,
+            'layout': layout,
+            'values': values,
+            'blocked': blocked_cells(layout, values),
+            'robots': json.loads(robots),
+            'deliveries': json.loads(deliveries),
+            'timestamp': timestamp,
+        }
+        with self._lock:
+            self._cache[maze_id] = entry
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def export_maze(self, maze_id: str) -> Optional[Dict]:
+        """A saved maze as the JSON it was saved as (grid in its original layout)."""
+        entry = self.get_maze(maze_id)
+        if entry is None:
+            return None
+        return {
+            'id': maze_id,
+            'maze': maze_layout(entry['layout'], entry['values']),
+            'robots': entry['robots'],
+            'deliveries': entry['deliveries'],
+            'timestamp': entry['timestamp'],
+        }
+
+    def save_simulation(self, sim_id: str, results: Dict) -> None:
+        payload = zlib.compress(json.dumps(results).encode())
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute('INSERT OR REPLACE INTO simulations VALUES (?, ?, ?, ?)',
+                       (sim_id, payload, time.time(), len(payload) + ROW_OVERHEAD))
+            self._evict(db)
+
+    def get_simulation(self, sim_id: str) -> Optional[Dict]:
+        db = self._connection()
+        row = db.execute('SELECT data FROM simulations WHERE id = ?', (sim_id,)).fetchone()
+        if row is None:
+            return None
+        db.execute('UPDATE simulations SET accessed_at = ? WHERE id = ?', (time.time(), sim_id))
+        return json.loads(zlib.decompress(row[0]))
+
+    def _total_bytes(self, db: sqlite3.Connection) -> int:
+        return db.execute('SELECT (SELECT COALESCE(SUM(nbytes), 0) FROM mazes)'
+                          ' + (SELECT COALESCE(SUM(nbytes), 0) FROM simulations)').fetchone()[0]
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Delete least recently used rows until the store fits in max_bytes (inside a transaction)."""
+        excess = self._total_bytes(db) - self.max_bytes
+        while excess > 0:
+            row = db.execute('SELECT * FROM ('
+                             ' SELECT accessed_at, nbytes, id, \'mazes\' FROM mazes'
+                             ' UNION ALL SELECT accessed_at, nbytes, id, \'simulations\' FROM simulations)'
+                             ' ORDER BY accessed_at LIMIT 1').fetchone()
+            if row is None:
+                return
+            _, nbytes, row_id, table = row
+            db.execute(f'DELETE FROM {table} WHERE id = ?', (row_id,))
+            excess -= nbytes
+            self.evictions += 1
+
+    def ping(self) -> None:
+        """Round trip to the database; raises sqlite3.Error when it is unusable."""
+        self._connection().execute('SELECT 1 FROM mazes LIMIT 1').fetchall()
+
+    def stats(self) -> Dict:
+        db = self._connection()
+        mazes, maze_bytes = db.execute('SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM mazes').fetchone()
+        sims, sim_bytes = db.execute('SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM simulations').fetchone()
+        with self._lock:
+            cached = len(self._cache)
+        return {
+            'mazes': mazes,
+            'simulations': sims,
+            'bytes': maze_bytes + sim_bytes,
+            'max_bytes': self.max_bytes,
+            'cached_mazes': cached,
+            'evictions': self.evictions,
+        }
@@ -1,7 +1,56 @@
+import time
 import numpy as np
-import random
-import math
-from typing import List, Tuple, Dict
+from typing import Callable, List, Tuple, Dict, Optional, Union
+from distance_engine import DistanceEngine, MetricFunction
+from spatial_index import KDTree, hilbert_order, nearest_neighbor_tour
+from local_search import improve_tour
+from branch_and_bound import BranchAndBound
+from genetic import evolve, island_model, random_population
+from ant_colony import AntColony
+from construction import double_tree_tour, euler_tour, greedy_matching, insertion_tour, spanning_tree
+from decomposition import CLUSTER_SIZE, decompose
+
+# API name -> TSPSolver method
+ALGORITHMS = {
+    'nearest_neighbor': 'nearest_neighbor',
+    'greedy': 'greedy_algorithm',
+    'space_filling_curve': 'space_filling_curve',
+    'farthest_insertion': 'farthest_insertion',
+    'cheapest_insertion': 'cheapest_insertion',
+    'double_tree': 'double_tree',
+    'christofides': 'christofides',
+    'genetic': 'genetic_algorithm',
+    'dynamic': 'dynamic_programming',
+    'aco': 'ant_colony_optimization',
+    'branch_and_bound': 'branch_and_bound',
+    'decomposition': 'decomposition',
+}
+
+# Algorithms that search iteratively and accept time_limit / on_improve / should_stop
+ANYTIME_ALGORITHMS = {'genetic', 'aco', 'branch_and_bound', 'decomposition'}
+
+# Algorithms that work on the coordinates and a built-in metric, never on a given matrix
+COORDINATE_ALGORITHMS = {'decomposition'}
+
+# Progress callback: on_improve(closed tour as indices, total distance)
+ProgressCallback = Callable[[List[int], float], None]
+
+# Held-Karp limits: largest instance accepted and rows per vectorized block
+HELD_KARP_MAX_POINTS = 22
+HELD_KARP_CHUNK = 1 << 16
+
+# Largest instance accepted by branch and bound
+BRANCH_AND_BOUND_MAX_POINTS = 100
+
+# improve option -> local-search moves (None = no improvement stage)
+IMPROVE_MODES = {
+    False: None,
+    None: None,
+    'none': None,
+    True: 'or_opt',
+    'or_opt': 'or_opt',
+    'two_opt': 'two_opt',
+}
 
 class TSPSolver:
     """
@@ -9,254 +58,567 @@ class TSPSolver:
     Implements multiple heuristic algorithms to find optimal or near-optimal paths.
     """
     
-    def __init__(self, points: List[List[float]]):
+    def __init__(self, points: List[List[float]], metric: Union[str, MetricFunction] = 'euclidean',
+                 dtype: Union[str, np.dtype] = np.float64, max_matrix_points: Optional[int] = 4000,
+                 distance_matrix: Optional[np.ndarray] = None):
         """
         Initialize TSP solver with list of points.
         
         Args:
             points: List of [x, y] coordinates representing item locations
+            metric: Distance metric ('euclidean', 'manhattan', 'chebyshev' or a callable)
+            dtype: Storage type of the distance matrix (float64 or float32)
+            max_matrix_points: Above this many points distances are computed on demand
+                               instead of building the full n x n matrix
+            distance_matrix: Optional precomputed distance matrix
         """
-        self.points = np.array(points)
+        self.points = np.array(points, dtype=np.float64).reshape(-1, 2)
         self.n = len(points)
-        self.distance_matrix = self._calculate_distance_matrix()
+        self.engine = DistanceEngine(self.points, metric=metric, dtype=dtype,
+                                     max_matrix_points=max_matrix_points,
+                                     matrix=distance_matrix)
+        self._candidates: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self.last_tour: Optional[List[int]] = None
+        self.last_info: Dict = {}
     
-    def _calculate_distance_matrix(self) -> np.ndarray:
+    @property
+    def distance_matrix(self) -> np.ndarray:
         """
-        Calculate distance matrix between all pairs of points using Euclidean distance.
+        Full distance matrix, built on first use when the engine is running lazily.
         
         Returns:
             2D numpy array where matrix[i][j] = distance between point i and point j
         """
-        matrix = np.zeros((self.n, self.n))
+        return self.engine.materialize()
+    
+    def _indices_to_path(self, path_indices: List[int]) -> List[List[float]]:
+        """Convert a list of point indices into a list of coordinates."""
+        return self.points[np.asarray(path_indices, dtype=np.intp)].tolist()
+    
+    def _result(self, path_indices: List[int], total_distance: float) -> Tuple[List[List[float]], float]:
+        """
+        Record the closed tour an algorithm produced and convert it for the caller.
+        
+        The index form is kept in ``self.last_tour`` so later stages (local
+        search, caching) can work on it without mapping coordinates back.
+        """
+        self.last_tour = [int(i) for i in path_indices]
+        return self._indices_to_path(self.last_tour), float(total_distance)
+    
+    @staticmethod
+    def _reporter(on_improve: Optional[ProgressCallback]) -> Optional[Callable]:
+        """Adapt on_improve to the (open tour, length) callbacks of the search modules."""
+        if on_improve is None:
+            return None
+        
+        def report(tour, length) -> None:
+            tour = [int(i) for i in tour]
+            on_improve(tour + tour[:1], float(length))
+        return report
+    
+    def solve(self, algorithm: str, improve: Union[bool, str] = False,
+              time_limit: Optional[float] = None, on_improve: Optional[ProgressCallback] = None,
+              should_stop: Optional[Callable[[], bool]] = None, **params) -> Dict:
+        """
+        Run an algorithm by its API name, optionally followed by local search.
         
-        for i in range(self.n):
-            for j in range(self.n):
-                if i != j:
-                    # Euclidean distance formula: sqrt((x2-x1)^2 + (y2-y1)^2)
-                    dx = self.points[i][0] - self.points[j][0]
-                    dy = self.points[i][1] - self.points[j][1]
-                    matrix[i][j] = math.sqrt(dx*dx + dy*dy)
+        With a time limit the iterative algorithms (ANYTIME_ALGORITHMS) and
+        the local search stop when it runs out and keep the best tour found
+        so far. on_improve is called with every better tour as it is found.
+        should_stop is polled the same way as the time limit, so another
+        thread or process can cancel a running solve.
+        
+        Args:
+            algorithm: Key of ALGORITHMS (e.g. 'nearest_neighbor', 'greedy')
+            improve: False, True / 'or_opt' (2-opt + Or-opt) or 'two_opt'
+            time_limit: Seconds for the whole solve (None = no limit)
+            on_improve: Progress callback, on_improve(closed tour indices, distance)
+            should_stop: Cancellation check; returning True ends the search early
+            **params: Keyword arguments for the algorithm method
+            
+        Returns:
+            Dict with 'path', 'tour' (closed list of indices) and 'total_distance';
+            when improving also 'initial_distance', 'improvement' and 'improvement_pct';
+            plus any algorithm-specific details (e.g. 'lower_bound' and 'gap')
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        if improve not in IMPROVE_MODES:
+            raise ValueError(f"Unknown improve option: {improve}")
+        
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        if algorithm in ANYTIME_ALGORITHMS:
+            if time_limit is not None:
+                params['time_limit'] = time_limit
+            params['on_improve'] = on_improve
+            params['should_stop'] = should_stop
+        
+        self.last_info = {}
+        path, total_distance = getattr(self, ALGORITHMS[algorithm])(**params)
+        result = {'path': path, 'tour': self.last_tour, 'total_distance': total_distance}
+        result.update(self.last_info)
+        if on_improve is not None and algorithm not in ANYTIME_ALGORITHMS:
+            on_improve(self.last_tour, total_distance)
+        
+        if IMPROVE_MODES[improve]:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            tour = self.improve_tour(self.last_tour, or_opt=IMPROVE_MODES[improve] == 'or_opt',
+                                     time_limit=remaining, should_stop=should_stop)
+            improved_distance = self.engine.tour_length(tour)
+            if improved_distance < total_distance:
+                path, _ = self._result(tour, improved_distance)
+                result.update({'path': path, 'tour': tour, 'total_distance': improved_distance})
+                if on_improve is not None:
+                    on_improve(tour, improved_distance)
+            result['initial_distance'] = total_distance
+            result['improvement'] = total_distance - result['total_distance']
+            result['improvement_pct'] = 100.0 * result['improvement'] / total_distance if total_distance else 0.0
+        return result
+    
+    def improve_tour(self, path_indices: List[int], k: int = 10, or_opt: bool = True,
+                     time_limit: Optional[float] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> List[int]:
+        """
+        Local-search stage: 2-opt and Or-opt over k-nearest-neighbor lists.
         
-        return matrix
+        Args:
+            path_indices: Closed tour (first index repeated at the end)
+            k: Neighbor list size
+            or_opt: Also apply Or-opt segment moves
+            time_limit: Seconds before stopping with the moves applied so far
+            should_stop: Cancellation check, polled with the time limit
+            
+        Returns:
+            Improved closed tour starting at the same index
+        """
+        start = path_indices[0]
+        if self.n < 5:
+            return list(path_indices)
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        neighbors, _ = self.candidate_lists(k)
+        tour = improve_tour(path_indices[:-1], self.engine.scalar_function(),
+                            neighbors.tolist(), or_opt=or_opt, deadline=deadline,
+                            should_stop=should_stop)
+        offset = tour.index(start)
+        return tour[offset:] + tour[:offset] + [start]
     
-    def nearest_neighbor(self, start_index: int = 0) -> Tuple[List[List[float]], float]:
+    def nearest_neighbor(self, start_index: int = 0, num_starts: int = 1,
+                         seed: Optional[int] = None) -> Tuple[List[List[float]], float]:
         """
         Nearest Neighbor heuristic: Always visit the closest unvisited point.
         
+        With a built-in metric each step is a k-d tree query and visited points
+        are deleted from the tree, so no distance matrix is needed and large
+        pick lists (100k points) finish in seconds.
+        
         Args:
             start_index: Starting point index (default: 0)
+            num_starts: Number of start points to try; the best tour is kept
+            seed: Seed for choosing the additional start points
             
         Returns:
             Tuple of (path as list of coordinates, total distance)
         """
-        visited = [False] * self.n
-        path_indices = [start_index]
+        starts = [start_index]
+        if num_starts > 1 and self.n > 1:
+            rng = np.random.default_rng(seed)
+            others = np.delete(np.arange(self.n), start_index)
+            starts += rng.choice(others, size=min(num_starts - 1, len(others)), replace=False).tolist()
+        
+        best_tour = None
+        best_distance = float('inf')
+        for start in starts:
+            tour = self._nearest_neighbor_tour(start)
+            distance = self.engine.tour_length(tour, closed=True)
+            if distance < best_distance:
+                best_tour, best_distance = tour, distance
+        
+        # Rotate so the route still starts (and ends) at start_index
+        offset = best_tour.index(start_index)
+        path_indices = best_tour[offset:] + best_tour[:offset] + [start_index]
+        
+        return self._result(path_indices, best_distance)
+    
+    def _nearest_neighbor_tour(self, start_index: int) -> List[int]:
+        """Open nearest-neighbor visiting order from start_index."""
+        if self.engine.has_coordinate_metric:
+            return nearest_neighbor_tour(self.points, start_index, self.engine.metric_name)
+        
+        visited = np.zeros(self.n, dtype=bool)
+        tour = [start_index]
         visited[start_index] = True
         current = start_index
-        total_distance = 0.0
-        
-        # Visit all remaining points
         for _ in range(self.n - 1):
-            nearest_distance = float('inf')
-            nearest_index = -1
+            # Find nearest unvisited point from a single row of distances
+            row = np.where(visited, np.inf, self.engine.row(current))
+            current = int(np.argmin(row))
+            tour.append(current)
+            visited[current] = True
+        return tour
+    
+    def candidate_lists(self, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest neighbors of every point, used to restrict the edges an
+        algorithm looks at. Results are cached per k.
+        
+        Args:
+            k: Number of neighbors per point (capped at n - 1)
             
-            # Find nearest unvisited point
-            for i in range(self.n):
-                if not visited[i] and self.distance_matrix[current][i] < nearest_distance:
-                    nearest_distance = self.distance_matrix[current][i]
-                    nearest_index = i
+        Returns:
+            Tuple of (n, k) neighbor index array and (n, k) distance array,
+            each row sorted by increasing distance
+        """
+        k = max(1, min(k, self.n - 1))
+        if k not in self._candidates:
+            if self.engine.has_coordinate_metric:
+                neighbors, distances = KDTree(self.points, self.engine.metric_name).k_nearest(k)
+            else:
+                neighbors = np.empty((self.n, k), dtype=np.int32)
+                distances = np.empty((self.n, k))
+                block_size = self.engine.block_size
+                for start in range(0, self.n, block_size):
+                    rows = np.arange(start, min(start + block_size, self.n))
+                    block = self.engine.block(rows).astype(np.float64)
+                    block[np.arange(len(rows)), rows] = np.inf
+                    part = np.argpartition(block, k - 1, axis=1)[:, :k]
+                    part_d = np.take_along_axis(block, part, axis=1)
+                    order = np.argsort(part_d, axis=1, kind='stable')
+                    neighbors[rows] = np.take_along_axis(part, order, axis=1)
+                    distances[rows] = np.take_along_axis(part_d, order, axis=1)
+            self._candidates[k] = (neighbors, distances)
+        return self._candidates[k]
+    
+    def greedy_algorithm(self, k: int = 10) -> Tuple[List[List[float]], float]:
+        """
+        Greedy algorithm: Build path by always choosing the shortest available edge.
+        
+        Only the edges to each point's k nearest neighbors are considered, so
+        memory is O(nk) instead of O(n²). An edge is accepted when both ends
+        still have degree < 2 and a union-find check shows it does not close
+        a subtour. The resulting path fragments are then joined end to end
+        by nearest endpoint into one valid tour.
+        
+        Args:
+            k: Candidate neighbors per point
             
-            # Move to nearest point
-            path_indices.append(nearest_index)
-            visited[nearest_index] = True
-            total_distance += nearest_distance
-            current = nearest_index
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        if self.n < 2:
+            return self._result([0] * (self.n + 1), 0.0)
+        
+        # Candidate edges (i < j, deduplicated) sorted by distance
+        neighbors, distances = self.candidate_lists(k)
+        rows = np.repeat(np.arange(self.n), neighbors.shape[1])
+        cols = neighbors.ravel().astype(np.intp)
+        weights = distances.ravel()
+        lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+        _, unique = np.unique(lo * self.n + hi, return_index=True)
+        order = unique[np.argsort(weights[unique], kind='stable')]
+        
+        # Build path fragments using greedy matching
+        degree = [0] * self.n
+        parent = list(range(self.n))
+        adjacency = [[] for _ in range(self.n)]
+        edges_used = 0
         
-        # Return to start
-        path_indices.append(start_index)
-        total_distance += self.distance_matrix[current][start_index]
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
         
-        # Convert indices to coordinates
-        path = [self.points[i].tolist() for i in path_indices]
+        for i, j in zip(lo[order].tolist(), hi[order].tolist()):
+            if degree[i] < 2 and degree[j] < 2:
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j:
+                    continue  # would close a subtour
+                parent[root_i] = root_j
+                adjacency[i].append(j)
+                adjacency[j].append(i)
+                degree[i] += 1
+                degree[j] += 1
+                edges_used += 1
+                if edges_used == self.n - 1:
+                    break
+        
+        # Join fragments into one tour that starts and ends at point 0
+        tour = self._join_fragments(adjacency)
+        offset = tour.index(0)
+        path_indices = tour[offset:] + tour[:offset] + [0]
         
-        return path, total_distance
+        # Calculate total distance
+        total_distance = self.engine.tour_length(path_indices)
+        
+        return self._result(path_indices, total_distance)
     
-    def greedy_algorithm(self) -> Tuple[List[List[float]], float]:
+    def space_filling_curve(self) -> Tuple[List[List[float]], float]:
         """
-        Greedy algorithm: Build path by always choosing the shortest available edge.
+        Space-filling curve heuristic: visit the points in Hilbert curve order.
+        
+        A single vectorized sort, O(n log n), with no distances computed
+        until the tour is measured, so 100k points take a fraction of a
+        second. The tour is about 20-25% longer than greedy on open layouts
+        (much more on long aisles) and makes a quick start for local search.
         
         Returns:
             Tuple of (path as list of coordinates, total distance)
         """
-        # Create list of all edges with their distances
-        edges = []
-        for i in range(self.n):
-            for j in range(i + 1, self.n):
-                edges.append((self.distance_matrix[i][j], i, j))
+        if self.n < 2:
+            return self._result([0] * (self.n + 1), 0.0)
+        tour = hilbert_order(self.points).tolist()
+        offset = tour.index(0)
+        path_indices = tour[offset:] + tour[:offset] + [0]
+        return self._result(path_indices, self.engine.tour_length(path_indices))
+    
+    def farthest_insertion(self) -> Tuple[List[List[float]], float]:
+        """
+        Farthest insertion: repeatedly insert the point farthest from the
+        tour where it lengthens the tour least.
         
-        # Sort edges by distance
-        edges.sort()
+        Each step fetches one distance row and updates whole arrays in
+        NumPy, so memory is O(n) without a distance matrix. Time is O(n²),
+        about 3 seconds for 10,000 points. On open layouts the tours are a
+        few percent shorter than greedy's; along long aisles they are worse.
         
-        # Build path using greedy approach
-        used_edges = []
-        degree = [0] * self.n
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        return self._insertion(farthest=True)
+    
+    def cheapest_insertion(self) -> Tuple[List[List[float]], float]:
+        """
+        Cheapest insertion: repeatedly insert the point whose insertion
+        lengthens the tour least.
         
-        for distance, i, j in edges:
-            # Check if adding this edge would create a cycle (except for the last edge)
-            if degree[i] < 2 and degree[j] < 2:
-                if len(used_edges) < self.n - 1 or (degree[i] == 1 and degree[j] == 1):
-                    used_edges.append((i, j))
-                    degree[i] += 1
-                    degree[j] += 1
-                    
-                    if len(used_edges) == self.n:
-                        break
+        Like farthest_insertion(), O(n) memory and O(n²) time, but each step
+        also fetches the rows of the replaced edge's ends to update every
+        outside point's best insertion, so it is about three times slower.
+        Tours are close to greedy's in length.
         
-        # Build path from edges
-        path_indices = self._build_path_from_edges(used_edges)
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        return self._insertion(farthest=False)
+    
+    def _insertion(self, farthest: bool) -> Tuple[List[List[float]], float]:
+        if self.n < 2:
+            return self._result([0] * (self.n + 1), 0.0)
+        path_indices = insertion_tour(self.engine, farthest=farthest, start=0) + [0]
+        return self._result(path_indices, self.engine.tour_length(path_indices))
+    
+    def _spanning_tree(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Minimum spanning tree over the k-nearest-neighbor candidate edges.
         
-        # Calculate total distance
-        total_distance = 0.0
-        for i in range(len(path_indices) - 1):
-            total_distance += self.distance_matrix[path_indices[i]][path_indices[i + 1]]
+        The edges between consecutive points of the Hilbert curve order are
+        candidates too, so the graph stays connected when the neighbor
+        lists fall apart into separate clusters.
+        """
+        neighbors, distances = self.candidate_lists(k)
+        curve = hilbert_order(self.points)
+        rows = np.concatenate([np.repeat(np.arange(self.n), neighbors.shape[1]), curve[:-1]])
+        cols = np.concatenate([neighbors.ravel().astype(np.intp), curve[1:]])
+        weights = np.concatenate([distances.ravel(), self.engine.pairs(curve[:-1], curve[1:])])
+        return spanning_tree(self.n, rows, cols, weights)
+    
+    def double_tree(self, k: int = 10) -> Tuple[List[List[float]], float]:
+        """
+        Double-tree heuristic: walk around a minimum spanning tree and skip
+        points already visited.
         
-        # Convert indices to coordinates
-        path = [self.points[i].tolist() for i in path_indices]
+        The tree comes from the same k-nearest-neighbor lists as greedy and
+        the local search (cached, so improving afterwards reuses them) and
+        is built with vectorized Boruvka rounds; the walk is O(n). At most
+        twice the optimum under a metric, typically about 20% longer than
+        greedy.
         
-        return path, total_distance
+        Args:
+            k: Candidate neighbors per point
+            
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        if self.n < 3:
+            return self.nearest_neighbor()
+        tree_i, tree_j = self._spanning_tree(k)
+        path_indices = double_tree_tour(self.n, tree_i, tree_j, start=0) + [0]
+        return self._result(path_indices, self.engine.tour_length(path_indices))
     
-    def genetic_algorithm(self, population_size: int = 100, generations: int = 500) -> Tuple[List[List[float]], float]:
+    def christofides(self, k: int = 10) -> Tuple[List[List[float]], float]:
+        """
+        Christofides-style tour: minimum spanning tree plus a matching of
+        its odd-degree points, walked as an Euler circuit with shortcuts.
+        
+        The matching is greedy over nearest-neighbor and Hilbert curve
+        candidate edges instead of an exact minimum-weight perfect matching
+        (O(n³)), so the 1.5 approximation guarantee does not carry over; in
+        practice tours are about 5% longer than greedy, with a different
+        structure that local search often improves further.
+        
+        Args:
+            k: Candidate neighbors per point
+            
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        if self.n < 3:
+            return self.nearest_neighbor()
+        tree_i, tree_j = self._spanning_tree(k)
+        odd = np.bincount(np.concatenate([tree_i, tree_j]), minlength=self.n) % 2 == 1
+        neighbors, _ = self.candidate_lists(k)
+        rows = np.repeat(np.arange(self.n), neighbors.shape[1])
+        cols = neighbors.ravel().astype(np.intp)
+        both = odd[rows] & odd[cols]
+        match_a, match_b = greedy_matching(self.points, np.flatnonzero(odd), self.engine,
+                                           (rows[both], cols[both]))
+        path_indices = euler_tour(self.n, np.concatenate([tree_i, match_a]),
+                                  np.concatenate([tree_j, match_b]), start=0) + [0]
+        return self._result(path_indices, self.engine.tour_length(path_indices))
+    
+    def genetic_algorithm(self, population_size: int = 100, generations: int = 500,
+                          mutation_rate: float = 0.02, tournament_size: int = 5,
+                          elite_size: int = 2, seed: Optional[int] = None, islands: int = 1,
+                          migration_interval: int = 50, migrants: int = 2,
+                          time_limit: Optional[float] = None,
+                          on_improve: Optional[ProgressCallback] = None,
+                          should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[List[float]], float]:
         """
         Genetic Algorithm for TSP optimization.
         
+        The population is a single (population_size, n) int32 matrix and every
+        step of a generation (fitness, tournament selection, order crossover,
+        swap mutation) is a batched NumPy operation. The best tours survive
+        unchanged (elitism), and a seed makes runs reproducible.
+        
+        With ``islands > 1`` the island model is used instead: one population
+        of ``population_size`` per island, evolved in parallel worker
+        processes that share the distance matrix through shared memory, with
+        the best ``migrants`` tours passed around a ring every
+        ``migration_interval`` generations.
+        
         Args:
             population_size: Number of individuals in each generation
             generations: Number of generations to evolve
+            mutation_rate: Probability that a child gets a swap mutation
+            tournament_size: Entrants per tournament selection
+            elite_size: Best individuals copied into the next generation
+            seed: Seed for numpy.random.Generator
+            islands: Number of island populations (1 = single population)
+            migration_interval: Generations between migrations (island model)
+            migrants: Tours sent to the next island per migration (island model)
+            time_limit: Seconds before returning the best tour so far
+            on_improve: Called with every better tour found
+            should_stop: Cancellation check; True returns the best tour so far
             
         Returns:
             Tuple of (path as list of coordinates, total distance)
         """
-        # Initialize population with random tours
-        population = []
-        for _ in range(population_size):
-            tour = list(range(self.n))
-            random.shuffle(tour)
-            population.append(tour)
-        
-        for generation in range(generations):
-            # Evaluate fitness (inverse of distance)
-            fitness_scores = []
-            for tour in population:
-                distance = self._calculate_tour_distance(tour)
-                fitness_scores.append(1.0 / (1.0 + distance))
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        distance_matrix = self.distance_matrix
+        params = {'mutation_rate': mutation_rate, 'tournament_size': tournament_size,
+                  'elite_size': elite_size}
+        callback = self._reporter(on_improve)
+        
+        if islands > 1 and self.n >= 3:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            best_tour, best_distance = island_model(distance_matrix, islands, population_size, generations,
+                                                    migration_interval=max(1, migration_interval),
+                                                    migrants=migrants, seed=seed, time_limit=remaining,
+                                                    callback=callback, should_stop=should_stop, **params)
+            best_tour = best_tour.tolist()
+        else:
+            rng = np.random.default_rng(seed)
             
-            # Selection: Choose parents based on fitness
-            new_population = []
-            for _ in range(population_size):
-                parent1 = self._tournament_selection(population, fitness_scores)
-                parent2 = self._tournament_selection(population, fitness_scores)
-                
-                # Crossover
-                child = self._order_crossover(parent1, parent2)
-                
-                # Mutation
-                if random.random() < 0.02:  # 2% mutation rate
-                    child = self._swap_mutation(child)
-                
-                new_population.append(child)
+            # Initialize population with random tours
+            population = random_population(self.n, population_size, rng)
+            population, lengths = evolve(population, distance_matrix, generations, rng,
+                                         deadline=deadline, callback=callback, should_stop=should_stop,
+                                         **params)
             
-            population = new_population
-        
-        # Find best tour in final population
-        best_tour = min(population, key=lambda tour: self._calculate_tour_distance(tour))
-        best_distance = self._calculate_tour_distance(best_tour)
+            # Find best tour in final population
+            best = int(np.argmin(lengths))
+            best_tour = population[best].tolist()
+            best_distance = float(lengths[best])
         
         # Ensure tour starts and ends at same point
         best_tour.append(best_tour[0])
         
-        # Convert indices to coordinates
-        path = [self.points[i].tolist() for i in best_tour]
-        
-        return path, best_distance
+        return self._result(best_tour, best_distance)
     
-    def _build_path_from_edges(self, edges: List[Tuple[int, int]]) -> List[int]:
-        """Build a path from list of edges."""
-        if not edges:
-            return [0, 0]
-        
-        # Create adjacency list
-        adj = {i: [] for i in range(self.n)}
-        for i, j in edges:
-            adj[i].append(j)
-            adj[j].append(i)
-        
-        # Find a starting point (any point with degree 1, or point 0)
-        start = 0
-        for i in range(self.n):
-            if len(adj[i]) == 1:
-                start = i
-                break
-        
-        # Build path
-        path = [start]
-        current = start
-        prev = -1
-        
-        while len(path) <= self.n:
-            next_nodes = [node for node in adj[current] if node != prev]
-            if not next_nodes:
-                break
-            
-            next_node = next_nodes[0]
-            path.append(next_node)
-            prev = current
-            current = next_node
-        
-        return path
-    
-    def _calculate_tour_distance(self, tour: List[int]) -> float:
-        """Calculate total distance for a given tour."""
-        distance = 0.0
-        for i in range(len(tour)):
-            j = (i + 1) % len(tour)
-            distance += self.distance_matrix[tour[i]][tour[j]]
-        return distance
-    
-    def _tournament_selection(self, population: List[List[int]], fitness_scores: List[float]) -> List[int]:
-        """Tournament selection for genetic algorithm."""
-        tournament_size = 5
-        tournament_indices = random.sample(range(len(population)), min(tournament_size, len(population)))
-        best_index = max(tournament_indices, key=lambda i: fitness_scores[i])
-        return population[best_index][:]
-    
-    def _order_crossover(self, parent1: List[int], parent2: List[int]) -> List[int]:
-        """Order crossover (OX) for genetic algorithm."""
-        size = len(parent1)
-        start, end = sorted(random.sample(range(size), 2))
-        
-        child = [-1] * size
-        child[start:end] = parent1[start:end]
-        
-        pointer = end
-        for city in parent2[end:] + parent2[:end]:
-            if city not in child:
-                child[pointer % size] = city
-                pointer += 1
+    def _join_fragments(self, adjacency: List[List[int]]) -> List[int]:
+        """
+        Turn a set of vertex-disjoint path fragments into a single tour.
         
-        return child
-    
-    def _swap_mutation(self, tour: List[int]) -> List[int]:
-        """Swap mutation for genetic algorithm."""
-        mutated = tour[:]
-        i, j = random.sample(range(len(tour)), 2)
-        mutated[i], mutated[j] = mutated[j], mutated[i]
-        return mutated
+        Starting from the first fragment, repeatedly append the fragment whose
+        endpoint is nearest to the current tail (reversing it if needed).
+        """
+        # Walk each fragment from one of its endpoints
+        fragments = []
+        seen = [False] * self.n
+        for start in range(self.n):
+            if seen[start] or len(adjacency[start]) == 2:
+                continue
+            fragment = [start]
+            seen[start] = True
+            prev, current = -1, start
+            while True:
+                next_nodes = [node for node in adjacency[current] if node != prev]
+                if not next_nodes:
+                    break
+                prev, current = current, next_nodes[0]
+                fragment.append(current)
+                seen[current] = True
+            fragments.append(fragment)
+        if len(fragments) <= 1:
+            return fragments[0] if fragments else list(range(self.n))
+        
+        owner = {}
+        for f, fragment in enumerate(fragments):
+            owner[fragment[0]] = f
+            owner[fragment[-1]] = f
+        ends = np.fromiter(owner.keys(), dtype=np.intp)
+        
+        if self.engine.has_coordinate_metric:
+            tree = KDTree(self.points, self.engine.metric_name, ids=ends)
+            remove = tree.remove
+            nearest = lambda node: tree.nearest(self.points[node, 0], self.points[node, 1])[0]
+        else:
+            alive = np.ones(len(ends), dtype=bool)
+            position = {node: p for p, node in enumerate(ends.tolist())}
+            remove = lambda node: alive.__setitem__(position[node], False)
+            nearest = lambda node: int(ends[np.argmin(np.where(alive, self.engine.row(node, ends), np.inf))])
+        
+        tour = fragments[0]
+        remove(tour[0])
+        remove(tour[-1])
+        for _ in range(len(fragments) - 1):
+            node = nearest(tour[-1])
+            fragment = fragments[owner[node]]
+            if fragment[0] != node:
+                fragment = fragment[::-1]
+            remove(fragment[0])
+            remove(fragment[-1])
+            tour.extend(fragment)
+        return tour
     
     def dynamic_programming(self, start_index: int = 0) -> Tuple[List[List[float]], float]:
         """
         Dynamic Programming solution using Held-Karp algorithm.
         Provides optimal solution but with exponential time complexity O(n²2^n).
-        Recommended for problems with <= 15 points.
+        
+        The DP table lives in dense NumPy arrays indexed by subset bitmask
+        over the m = n - 1 non-start points. Subsets are processed one
+        popcount layer at a time with a vectorized min-reduction, and only
+        two layers of costs are ever held in memory. Parent pointers for all
+        subsets are kept as int8. Memory is about
+        
+            2^m * m                      bytes  (int8 parents)
+          + 2^m * 8                      bytes  (mask/rank lookup tables)
+          + 2 * C(m, m/2) * m * itemsize bytes  (two cost layers)
+        
+        plus block temporaries: measured peaks are ~70 MB for 20 points and
+        ~225 MB for 22 points at float64 (a few seconds of CPU for 22).
         
         Args:
             start_index: Starting point index (default: 0)
@@ -264,81 +626,78 @@ class TSPSolver:
         Returns:
             Tuple of (path as list of coordinates, total distance)
         """
-        if self.n > 20:
-            raise ValueError("Dynamic programming is not recommended for more than 20 points due to exponential complexity")
+        if self.n > HELD_KARP_MAX_POINTS:
+            raise ValueError(f"Dynamic programming supports at most {HELD_KARP_MAX_POINTS} points "
+                             f"due to exponential complexity (got {self.n})")
         
         if self.n <= 1:
-            path = [self.points[0].tolist(), self.points[0].tolist()]
-            return path, 0.0
-        
-        # DP table: dp[mask][i] = minimum cost to visit all cities in mask ending at city i
-        # mask is a bitmask representing which cities have been visited
-        dp = {}
-        parent = {}  # To reconstruct the path
-        
-        # Initialize: starting from start_index, visit only start_index
-        start_mask = 1 << start_index
-        dp[(start_mask, start_index)] = 0.0
-        
-        # Fill DP table for all possible subsets
-        for mask in range(1, 1 << self.n):
-            for u in range(self.n):
-                if not (mask & (1 << u)):  # u is not in the current subset
-                    continue
-                
-                if mask == (1 << u):  # Only u is in the subset
-                    if u == start_index:
-                        dp[(mask, u)] = 0.0
-                    else:
-                        dp[(mask, u)] = float('inf')
-                    continue
-                
-                # Try all possible previous cities
-                dp[(mask, u)] = float('inf')
-                prev_mask = mask ^ (1 << u)  # Remove u from mask
-                
-                for v in range(self.n):
-                    if not (prev_mask & (1 << v)):  # v is not in previous subset
-                        continue
-                    
-                    if (prev_mask, v) in dp:
-                        cost = dp[(prev_mask, v)] + self.distance_matrix[v][u]
-                        if cost < dp[(mask, u)]:
-                            dp[(mask, u)] = cost
-                            parent[(mask, u)] = v
-        
-        # Find the minimum cost to visit all cities and return to start
-        final_mask = (1 << self.n) - 1  # All cities visited
-        min_cost = float('inf')
-        last_city = -1
-        
-        for i in range(self.n):
-            if i != start_index and (final_mask, i) in dp:
-                cost = dp[(final_mask, i)] + self.distance_matrix[i][start_index]
-                if cost < min_cost:
-                    min_cost = cost
-                    last_city = i
+            return self._result([0, 0], 0.0)
+        
+        distance_matrix = self.distance_matrix
+        others = np.array([i for i in range(self.n) if i != start_index], dtype=np.intp)
+        m = len(others)
+        inner = distance_matrix[np.ix_(others, others)]    # inner[v, u] = d(v -> u)
+        from_start = distance_matrix[start_index, others]
+        to_start = distance_matrix[others, start_index]
+        
+        # Group subset masks into popcount layers and remember each mask's row in its layer
+        masks = np.arange(1 << m, dtype=np.int32)
+        popcount = np.zeros(1 << m, dtype=np.int8)
+        for bit in range(m):
+            popcount += ((masks >> bit) & 1).astype(np.int8)
+        by_layer = np.argsort(popcount, kind='stable').astype(np.int32)
+        layer_bounds = np.searchsorted(popcount[by_layer], np.arange(m + 2))
+        rank = np.empty(1 << m, dtype=np.int32)
+        for k in range(m + 1):
+            layer = by_layer[layer_bounds[k]:layer_bounds[k + 1]]
+            rank[layer] = np.arange(len(layer), dtype=np.int32)
+        
+        # parent[mask, u] = previous point before ending at u having visited mask
+        parent = np.full((1 << m, m), -1, dtype=np.int8)
+        
+        # Layer 1: go straight from the start to u
+        costs = np.full((m, m), np.inf, dtype=inner.dtype)
+        layer = by_layer[layer_bounds[1]:layer_bounds[2]]
+        for u in range(m):
+            costs[rank[1 << u], u] = from_start[u]
+        
+        # Layer k from layer k - 1: cost[mask, u] = min_v cost[mask - u, v] + d(v, u)
+        for k in range(2, m + 1):
+            layer = by_layer[layer_bounds[k]:layer_bounds[k + 1]]
+            next_costs = np.full((len(layer), m), np.inf, dtype=inner.dtype)
+            for u in range(m):
+                bit = np.int32(1 << u)
+                subsets = layer[(layer & bit) != 0]
+                for chunk in range(0, len(subsets), HELD_KARP_CHUNK):
+                    sel = subsets[chunk:chunk + HELD_KARP_CHUNK]
+                    candidates = costs[rank[sel ^ bit]] + inner[:, u]
+                    best = np.argmin(candidates, axis=1)
+                    next_costs[rank[sel], u] = candidates[np.arange(len(sel)), best]
+                    parent[sel, u] = best
+            costs = next_costs
+        
+        # Close the tour back to the start
+        final_mask = (1 << m) - 1
+        totals = costs[rank[final_mask]] + to_start
+        last_city = int(np.argmin(totals))
+        min_cost = float(totals[last_city])
         
         # Reconstruct path
-        path_indices = self._reconstruct_dp_path(parent, final_mask, last_city, start_index)
+        path_indices = self._reconstruct_dp_path(parent, final_mask, last_city, others, start_index)
         path_indices.append(start_index)  # Return to start
         
-        # Convert indices to coordinates
-        path = [self.points[i].tolist() for i in path_indices]
-        
-        return path, min_cost
+        return self._result(path_indices, min_cost)
 
-    def _reconstruct_dp_path(self, parent: Dict, mask: int, last_city: int, start_index: int) -> List[int]:
+    def _reconstruct_dp_path(self, parent: np.ndarray, mask: int, last_city: int,
+                             others: np.ndarray, start_index: int) -> List[int]:
         """Reconstruct the optimal path from DP parent table."""
         path = []
         current_city = last_city
         current_mask = mask
         
-        while current_city != start_index:
-            path.append(current_city)
-            next_city = parent.get((current_mask, current_city), -1)
-            if next_city == -1:
-                break
+        while current_city != -1:
+            path.append(int(others[current_city]))
+            next_city = int(parent[current_mask, current_city])
             current_mask ^= (1 << current_city)  # Remove current city from mask
             current_city = next_city
         
@@ -347,12 +706,78 @@ class TSPSolver:
         return path
       
       
+    def branch_and_bound(self, time_limit: Optional[float] = 10.0, start_index: int = 0,
+                         on_improve: Optional[ProgressCallback] = None,
+                         should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[List[float]], float]:
+        """
+        Exact branch-and-bound with Held-Karp 1-tree lower bounds.
+        
+        The starting upper bound is the best of multi-start nearest neighbor
+        and greedy, each improved by local search. When the time limit runs
+        out the best tour found so far is returned; ``self.last_info`` holds
+        the proven lower bound, the optimality gap and whether the tour is
+        proven optimal. Intended for 20-60 points.
+        
+        Args:
+            time_limit: Seconds to search (None = until optimal)
+            start_index: Point the route starts and ends at
+            on_improve: Called with the heuristic tour and every better tour found
+            should_stop: Cancellation check; True ends the search like a timeout
+            
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        if self.n > BRANCH_AND_BOUND_MAX_POINTS:
+            raise ValueError(f"Branch and bound supports at most {BRANCH_AND_BOUND_MAX_POINTS} points (got {self.n})")
+        
+        started = time.perf_counter()
+        
+        # Upper bound from the heuristics
+        candidates = []
+        for algorithm, params in (('nearest_neighbor', {'num_starts': 5, 'seed': 0}), ('greedy', {})):
+            getattr(self, ALGORITHMS[algorithm])(**params)
+            candidates.append(self.improve_tour(self.last_tour))
+        initial = min(candidates, key=self.engine.tour_length)
+        if on_improve is not None:
+            on_improve(initial, self.engine.tour_length(initial))
+        
+        # The heuristics count against the time limit too
+        if time_limit is not None:
+            time_limit = max(0.0, time_limit - (time.perf_counter() - started))
+        result = BranchAndBound(self.distance_matrix, time_limit=time_limit).solve(
+            initial[:-1], callback=self._reporter(on_improve), should_stop=should_stop)
+        tour = result['tour']
+        offset = tour.index(start_index)
+        path_indices = tour[offset:] + tour[:offset] + [start_index]
+        
+        self.last_info = {
+            'lower_bound': result['lower_bound'],
+            'gap': result['gap'],
+            'optimal': result['optimal'],
+            'nodes_explored': result['nodes'],
+        }
+        return self._result(path_indices, result['cost'])
+    
     def ant_colony_optimization(self, num_ants: int = 10, num_iterations: int = 100, 
                            alpha: float = 1.0, beta: float = 2.0, 
-                           evaporation_rate: float = 0.5, q: float = 100.0) -> Tuple[List[List[float]], float]:
+                           evaporation_rate: float = 0.5, q: float = 100.0,
+                           candidates: int = 15, max_min: bool = False,
+                           seed: Optional[int] = None, time_limit: Optional[float] = None,
+                           on_improve: Optional[ProgressCallback] = None,
+                           should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[List[float]], float]:
         """
         Ant Colony Optimization algorithm for TSP.
         
+        All ants build their tours together: the choice matrix
+        (pheromone^alpha * heuristic^beta) is computed once per iteration and
+        each construction step samples the next city of every ant at once,
+        restricted to the candidate lists (falling back to all unvisited
+        cities when the candidates are used up).
+        
+        With ``max_min`` the MAX-MIN Ant System is used: only the best tour
+        deposits pheromone and trails stay within [tau_min, tau_max], with
+        tau_max initialized from a nearest neighbor tour.
+        
         Args:
             num_ants: Number of ants in the colony
             num_iterations: Number of iterations to run
@@ -360,105 +785,105 @@ class TSPSolver:
             beta: Heuristic importance factor (1/distance)
             evaporation_rate: Pheromone evaporation rate (0-1)
             q: Pheromone deposit factor
+            candidates: Candidate list size per city
+            max_min: Use the MAX-MIN Ant System
+            seed: Seed for numpy.random.Generator
+            time_limit: Seconds before returning the best tour so far
+            on_improve: Called with every better tour found
+            should_stop: Cancellation check; True returns the best tour so far
             
         Returns:
             Tuple of (path as list of coordinates, total distance)
         """
-        # Initialize pheromone matrix
-        pheromone = np.ones((self.n, self.n)) * 0.1
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        if self.n < 3:
+            path, total_distance = self.nearest_neighbor()
+            if on_improve is not None:
+                on_improve(self.last_tour, total_distance)
+            return path, total_distance
+        
+        neighbors, _ = self.candidate_lists(candidates)
+        colony = AntColony(self.distance_matrix, neighbors, alpha=alpha, beta=beta,
+                           evaporation_rate=evaporation_rate, q=q, max_min=max_min, seed=seed)
+        if max_min:
+            colony.initialize_max_min(self.engine.tour_length(self._nearest_neighbor_tour(0), closed=True))
+        best_tour, best_distance = colony.run(max(1, num_ants), max(1, num_iterations),
+                                              deadline=deadline, callback=self._reporter(on_improve),
+                                              should_stop=should_stop)
+        
+        # Rotate to start at city 0 and close the tour
+        best_tour = np.roll(best_tour, -int(np.flatnonzero(best_tour == 0)[0])).tolist()
+        best_tour.append(best_tour[0])
         
-        # Heuristic information (1/distance)
-        heuristic = np.zeros((self.n, self.n))
-        for i in range(self.n):
-            for j in range(self.n):
-                if i != j:
-                    heuristic[i][j] = 1.0 / self.distance_matrix[i][j]
+        return self._result(best_tour, best_distance)
+
+    def decomposition(self, cluster_size: int = CLUSTER_SIZE, partition: str = 'hilbert',
+                      cluster_algorithm: str = 'greedy', cluster_improve: Union[bool, str] = 'or_opt',
+                      workers: int = 1, time_limit: Optional[float] = None,
+                      on_improve: Optional[ProgressCallback] = None,
+                      should_stop: Optional[Callable[[], bool]] = None) -> Tuple[List[List[float]], float]:
+        """
+        Decomposition for very large instances: cluster, solve the clusters
+        in parallel, stitch.
         
-        best_path = None
-        best_distance = float('inf')
+        The points are split into spatially compact clusters (Hilbert curve
+        runs or k-means), each cluster is solved on its own with an existing
+        algorithm in `workers` processes, the clusters are chained in the
+        order of a small tour over their centroids, and 2-opt / Or-opt
+        repairs the seams. No n x n matrix is built; see decomposition.py.
         
-        for iteration in range(num_iterations):
-            # Store paths and distances for all ants
-            ant_paths = []
-            ant_distances = []
-            
-            # Each ant constructs a solution
-            for ant in range(num_ants):
-                # Start from random city
-                current_city = random.randint(0, self.n - 1)
-                visited = [False] * self.n
-                path = [current_city]
-                visited[current_city] = True
-                total_distance = 0.0
-                
-                # Construct path
-                for _ in range(self.n - 1):
-                    # Calculate probabilities for unvisited cities
-                    probabilities = []
-                    unvisited_cities = []
-                    
-                    for next_city in range(self.n):
-                        if not visited[next_city]:
-                            # Probability = (pheromone^alpha) * (heuristic^beta)
-                            prob = (pheromone[current_city][next_city] ** alpha) * \
-                                (heuristic[current_city][next_city] ** beta)
-                            probabilities.append(prob)
-                            unvisited_cities.append(next_city)
-                    
-                    # Select next city based on probabilities
-                    if probabilities:
-                        # Normalize probabilities
-                        total_prob = sum(probabilities)
-                        if total_prob > 0:
-                            probabilities = [p / total_prob for p in probabilities]
-                            
-                            # Roulette wheel selection
-                            rand = random.random()
-                            cumulative_prob = 0.0
-                            selected_city = unvisited_cities[0]  # fallback
-                            
-                            for i, prob in enumerate(probabilities):
-                                cumulative_prob += prob
-                                if rand <= cumulative_prob:
-                                    selected_city = unvisited_cities[i]
-                                    break
-                        else:
-                            selected_city = unvisited_cities[0]
-                        
-                        # Move to selected city
-                        path.append(selected_city)
-                        visited[selected_city] = True
-                        total_distance += self.distance_matrix[current_city][selected_city]
-                        current_city = selected_city
-                
-                # Return to start
-                path.append(path[0])
-                total_distance += self.distance_matrix[current_city][path[0]]
-                
-                ant_paths.append(path)
-                ant_distances.append(total_distance)
-                
-                # Update best solution
-                if total_distance < best_distance:
-                    best_distance = total_distance
-                    best_path = path[:]
-            
-            # Evaporate pheromones
-            pheromone *= (1.0 - evaporation_rate)
+        Args:
+            cluster_size: Target points per cluster
+            partition: 'hilbert' or 'kmeans'
+            cluster_algorithm: Algorithm for each cluster (key of ALGORITHMS)
+            cluster_improve: Local-search option for each cluster
+            workers: Worker processes for the clusters
+            time_limit: Seconds for the whole decomposition; every cluster is
+                        still constructed, only local search and repair are cut short
+            on_improve: Called with the final tour
+            should_stop: Cancellation check; unsolved clusters keep their partition order
             
-            # Deposit pheromones
-            for ant_idx in range(num_ants):
-                path = ant_paths[ant_idx]
-                distance = ant_distances[ant_idx]
-                pheromone_deposit = q / distance
-                
-                # Deposit pheromone on edges used by this ant
-                for i in range(len(path) - 1):
-                    city1, city2 = path[i], path[i + 1]
-                    pheromone[city1][city2] += pheromone_deposit
-                    pheromone[city2][city1] += pheromone_deposit
-        
-        # Convert indices to coordinates
-        path_coords = [self.points[i].tolist() for i in best_path]
-        
-        return path_coords, best_distance  
\ No newline at end of file
+        Returns:
+            Tuple of (path as list of coordinates, total distance)
+        """
+        if cluster_algorithm not in ALGORITHMS or cluster_algorithm == 'decomposition':
+            raise ValueError(f"Unknown cluster algorithm: {cluster_algorithm}")
+        if cluster_improve not in IMPROVE_MODES:
+            raise ValueError(f"Unknown improve option: {cluster_improve}")
+        if not self.engine.has_coordinate_metric:
+            raise ValueError("Decomposition needs coordinates with a built-in metric")
+        if self.n < 3:
+            return self.nearest_neighbor()
+        
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        tour, info = decompose(self.points, _solve_cluster, metric=self.engine.metric_name,
+                               cluster_size=cluster_size, method=partition, algorithm=cluster_algorithm,
+                               improve=cluster_improve, workers=workers, deadline=deadline,
+                               should_stop=should_stop)
+        self.last_info = info
+        
+        offset = tour.index(0)
+        tour = tour[offset:] + tour[:offset] + [0]
+        total_distance = self.engine.tour_length(tour)
+        if on_improve is not None:
+            on_improve(tour, total_distance)
+        return self._result(tour, total_distance)
+
+
+def _solve_cluster(points: np.ndarray, metric: str, algorithm: str, improve: Union[bool, str],
+                   time_limit: Optional[float], ends: Optional[Tuple[int, int]] = None) -> List[int]:
+    """
+    Decomposition worker task: visiting order (local indices, not closed) of one cluster.
+    
+    With ends = (entry, exit) the edge between them costs nothing, so the
+    solvers keep it and the tour minus that edge is the path from entry to exit.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+    if ends is not None and ends[0] != ends[1]:
+        matrix = TSPSolver(points, metric=metric, max_matrix_points=None).distance_matrix.copy()
+        matrix[ends[0], ends[1]] = matrix[ends[1], ends[0]] = 0.0
+        solver = TSPSolver(points, distance_matrix=matrix)
+    else:
+        solver = TSPSolver(points, metric=metric)
+    return solver.solve(algorithm, improve=improve, time_limit=time_limit)['tour'][:-1]
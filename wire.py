@@ -0,0 +1,151 @@
+import io
+import json
+from typing import Dict, Optional, Sequence
+import numpy as np
+from flask import Request, Response, jsonify
+
+try:
+    import msgpack
+except ImportError:   # optional: MessagePack is offered only when installed
+    msgpack = None
+
+JSON_TYPE = 'application/json'
+RAW_TYPE = 'application/octet-stream'
+NPY_TYPE = 'application/x-npy'
+MSGPACK_TYPE = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK_TYPE, 'application/x-msgpack')
+
+# What the solve endpoints return besides the scalars: the coordinates in
+# visiting order, or only the visiting order as indices into the request
+OUTPUTS = ('path', 'tour')
+
+# Response header carrying the scalar fields of a binary (raw / .npy) response
+INFO_HEADER = 'X-Solve-Info'
+
+
+class UnsupportedFormat(Exception):
+    """The request body or the Accept header names a format this server cannot handle."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+
+def _query_options(args) -> Dict:
+    """Options from the query string; 'true' / 'false' become booleans."""
+    options = {}
+    for key, value in args.items():
+        options[key] = {'true': True, 'false': False}.get(value.lower(), value)
+    return options
+
+
+def _points_from_buffer(buffer: bytes) -> np.ndarray:
+    """Little-endian float32 x, y pairs."""
+    if len(buffer) % 8:
+        raise ValueError('Raw points must be little-endian float32 x, y pairs')
+    return np.frombuffer(buffer, dtype='<f4').reshape(-1, 2).astype(np.float64)
+
+
+def decode_request(request: Request) -> Dict:
+    """
+    Request body as a solve-request dict, whatever its Content-Type.
+
+    - application/json: the usual body
+    - application/octet-stream: raw little-endian float32 x, y pairs; the
+      other options go in the query string (?algorithm=greedy&improve=true)
+    - application/x-npy: a .npy array of shape (n, 2); options as above
+    - application/msgpack: the JSON fields; "points" may also be raw float32
+      bytes as above
+
+    Binary formats hand the points over as an (n, 2) float64 array.
+
+    Raises:
+        UnsupportedFormat: Unknown content type, or MessagePack is not installed
+        ValueError: The body does not decode
+    """
+    content_type = request.mimetype
+    if content_type in ('', JSON_TYPE):
+        return request.get_json()
+    if content_type == RAW_TYPE:
+        data = _query_options(request.args)
+        data['points'] = _points_from_buffer(request.get_data())
+        return data
+    if content_type == NPY_TYPE:
+        data = _query_options(request.args)
+        points = np.load(io.BytesIO(request.get_data()), allow_pickle=False)
+        if points.ndim != 2 or points.shape[1] != 2 or points.dtype.kind not in 'iuf':
+            raise ValueError('The .npy body must be a numeric (n, 2) array')
+        data['points'] = points.astype(np.float64)
+        return data
+    if content_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise UnsupportedFormat('MessagePack support is not installed', 415)
+        data = msgpack.unpackb(request.get_data(), raw=False)
+        if isinstance(data, dict) and isinstance(data.get('points'), bytes):
+            data['points'] = _points_from_buffer(data['points'])
+        return data
+    raise UnsupportedFormat(f'Unsupported Content-Type: {content_type}', 415)
+
+
+def response_format(request: Request) -> str:
+    """
+    Media type to answer in, from the Accept header (JSON when indifferent).
+
+    Raises:
+        UnsupportedFormat: Nothing acceptable can be produced
+    """
+    offered = [JSON_TYPE, RAW_TYPE, NPY_TYPE]
+    if msgpack is not None:
+        offered.extend(MSGPACK_TYPES)
+    if not request.accept_mimetypes:
+        return JSON_TYPE
+    best = request.accept_mimetypes.best_match(offered)
+    if best is None:
+        raise UnsupportedFormat(f'Cannot produce any of: {request.headers.get("Accept")}', 406)
+    return best
+
+
+def encode_solution(body: Dict, points, tour: Sequence[int], output: str, media_type: str,
+                    extra: Optional[Dict] = None) -> Response:
+    """
+    Serialize a solve response.
+
+    JSON and MessagePack carry every field. MessagePack packs the route as
+    raw little-endian bytes: 'path' as float32 x, y pairs or 'tour' as
+    int32 indices. Raw and .npy bodies hold only that array; the scalar
+    fields travel as JSON in the X-Solve-Info header.
+
+    Args:
+        body: Response fields other than the route
+        points: Request points, indexable by tour position
+        tour: Closed tour (point indices)
+        output: 'path' (coordinates) or 'tour' (indices only)
+        media_type: From response_format()
+        extra: Additional fields for JSON / MessagePack only (e.g. 'grid_path', 'profile')
+    """
+    if output == 'tour':
+        route = np.asarray(tour, dtype='<i4')
+    else:
+        route = np.asarray(points, dtype=np.float64).reshape(-1, 2)[np.asarray(tour, dtype=np.intp)]
+
+    if media_type == JSON_TYPE:
+        response = dict(body)
+        response[output] = route.tolist()
+        response.update(extra or {})
+        return jsonify(response)
+    if output == 'path':
+        route = route.astype('<f4')
+    if media_type in MSGPACK_TYPES:
+        response = dict(body)
+        response[output] = route.tobytes()
+        response.update(extra or {})
+        return Response(msgpack.packb(response, use_bin_type=True), mimetype=media_type)
+
+    if media_type == NPY_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, route, allow_pickle=False)
+        payload = buffer.getvalue()
+    else:
+        payload = route.tobytes()
+    return Response(payload, mimetype=media_type,
+                    headers={INFO_HEADER: json.dumps(dict(body, output=output), separators=(',', ':'))})